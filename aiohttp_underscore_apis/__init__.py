@@ -1,4 +1,12 @@
 from aiohttp_underscore_apis.core import AiohttpUnderscoreApis
+from aiohttp_underscore_apis.monitor import LoopMonitor
+from aiohttp_underscore_apis.shared import SharedSettings, SharedStats
 from aiohttp_underscore_apis.types import SiteFactory
 
-__all__ = ["AiohttpUnderscoreApis", "SiteFactory"]
+__all__ = [
+    "AiohttpUnderscoreApis",
+    "LoopMonitor",
+    "SharedSettings",
+    "SharedStats",
+    "SiteFactory",
+]
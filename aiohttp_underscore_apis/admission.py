@@ -0,0 +1,306 @@
+from asyncio import Future, get_running_loop, timeout
+from collections import deque
+from contextlib import suppress
+from enum import Enum
+from time import monotonic
+
+
+class ConcurrencyLimiter:
+    """Limit the number of active requests and queue the excess in FIFO
+
+    A request is admitted right away by try_acquire() if the limit allows,
+    otherwise it can wait() in the bounded queue until another request
+    release()s its place or the queue timeout expires.
+    """
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.max_active = 0
+        self.max_queue = 0
+        self.queue_timeout: float | None = None
+        self._waiters: deque[Future[None]] = deque()
+
+    def configure(
+        self, max_active: int, max_queue: int, queue_timeout: float | None
+    ) -> None:
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        while self.active < self.max_active and self._wake_next():
+            self.active += 1
+
+    def try_acquire(self) -> bool:
+        if self.active < self.max_active and not self._waiters:
+            self.active += 1
+            return True
+
+        return False
+
+    async def wait(self) -> bool:
+        """Wait in the queue and return whether or not it has been admitted"""
+
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with timeout(self.queue_timeout):
+                await waiter
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # It has been admitted at the very last moment, so the place
+                # shall be passed on to the next one.
+                self.release()
+            else:
+                with suppress(ValueError):
+                    self._waiters.remove(waiter)
+
+            if isinstance(e, TimeoutError):
+                return False
+            raise
+
+        return True
+
+    def release(self) -> None:
+        # Hand over the place to the first one in the queue if any
+        if self.active > self.max_active or not self._wake_next():
+            self.active -= 1
+
+    def _wake_next(self) -> bool:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return True
+
+        return False
+
+
+class TokenBucket:
+    """Admit `rate` requests per second on average and `burst` at once
+
+    The bucket is refilled lazily when a token is taken, so that it costs
+    O(1) per request without any timer.
+    """
+
+    def __init__(self) -> None:
+        self.rate = 0.0
+        self.burst = 0.0
+        self._tokens = float("inf")
+        self._updated_at = monotonic()
+
+    @property
+    def tokens(self) -> float:
+        elapsed = monotonic() - self._updated_at
+        return min(self.burst, self._tokens + elapsed * self.rate)
+
+    def configure(self, rate: float, burst: float | None) -> None:
+        if self.rate:  # Bring the tokens up to date under the old settings
+            self._tokens = self.tokens
+        self._updated_at = monotonic()
+
+        self.rate = rate
+        self.burst = max(rate, 1.0) if burst is None else burst
+        self._tokens = min(self._tokens, self.burst)
+
+    def try_acquire(self) -> float:
+        """Take a token and return 0, or return seconds until it's available"""
+
+        now = monotonic()
+        tokens = self._tokens + (now - self._updated_at) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        self._updated_at = now
+
+        if tokens >= 1.0:
+            self._tokens = tokens - 1.0
+            return 0.0
+
+        self._tokens = tokens
+        return (1.0 - tokens) / self.rate
+
+
+class LoadShedder:
+    """Shed a growing fraction of requests while the latency stays high
+
+    Like CoDel, it tracks the minimum latency over each interval. If even the
+    minimum exceeds the target, the route is considered to be overloaded and
+    the drop rate grows by `step` up to `max_drop_rate`; otherwise the drop
+    rate is halved. Requests are shed evenly according to the drop rate.
+    """
+
+    def __init__(self) -> None:
+        self.target = float("inf")
+        self.interval = 1.0
+        self.step = 0.1
+        self.max_drop_rate = 1.0
+        self.drop_rate = 0.0
+        self._min_latency = float("inf")
+        self._interval_end = monotonic() + self.interval
+        self._credit = 0.0
+
+    def configure(
+        self, target: float, interval: float, step: float, max_drop_rate: float
+    ) -> None:
+        self.target = target
+        self.interval = interval
+        self.step = step
+        self.max_drop_rate = max_drop_rate
+        self.drop_rate = min(self.drop_rate, max_drop_rate)
+        self._interval_end = min(self._interval_end, monotonic() + interval)
+
+    def observe(self, latency: float) -> None:
+        if latency < self._min_latency:
+            self._min_latency = latency
+
+    def should_shed(self) -> bool:
+        now = monotonic()
+        if now >= self._interval_end:
+            self._next_interval(now)
+
+        if not self.drop_rate:
+            return False
+
+        self._credit += self.drop_rate
+        if self._credit >= 1.0:
+            self._credit -= 1.0
+            return True
+
+        return False
+
+    def _next_interval(self, now: float) -> None:
+        if self.target < self._min_latency < float("inf"):
+            self.drop_rate = min(
+                self.drop_rate + self.step, self.max_drop_rate
+            )
+        elif self.drop_rate >= self.step / 8:
+            self.drop_rate /= 2
+        else:
+            self.drop_rate = 0.0
+            self._credit = 0.0
+
+        self._min_latency = float("inf")
+        self._interval_end = now + self.interval
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fail fast while the requests keep failing
+
+    While closed, the failures are counted over fixed windows and the breaker
+    opens once the error rate reaches the threshold with at least
+    `min_requests` requests. A request fails if it ends with an exception or a
+    5xx status, or if it takes longer than `latency` if any. After staying
+    open for `open_duration`, the breaker turns half-open and lets
+    `half_open_probes` requests through: it closes if all of them succeed and
+    opens again as soon as one of them fails.
+    """
+
+    def __init__(self) -> None:
+        self.error_rate = 1.0
+        self.latency: float | None = None
+        self.min_requests = 1
+        self.window = 10.0
+        self.open_duration = 30.0
+        self.half_open_probes = 1
+        self.state = BreakerState.CLOSED
+        self.trips = 0
+        self._requests = 0
+        self._failures = 0
+        self._window_end = monotonic() + self.window
+        self._opened_at = float("-inf")
+        self._probes = 0
+        self._successes = 0
+
+    def configure(
+        self,
+        error_rate: float,
+        latency: float | None,
+        min_requests: int,
+        window: float,
+        open_duration: float,
+        half_open_probes: int,
+    ) -> None:
+        self.error_rate = error_rate
+        self.latency = latency
+        self.min_requests = min_requests
+        self.window = window
+        self.open_duration = open_duration
+        self.half_open_probes = half_open_probes
+        self._window_end = min(self._window_end, monotonic() + window)
+
+    @property
+    def current_error_rate(self) -> float:
+        if not self._requests:
+            return 0.0
+        return self._failures / self._requests
+
+    def allow(self) -> bool | None:
+        """Return None to reject, otherwise whether or not it is a probe"""
+
+        if self.state is BreakerState.CLOSED:
+            return False
+
+        if self.state is BreakerState.OPEN:
+            if monotonic() - self._opened_at < self.open_duration:
+                return None
+
+            self.state = BreakerState.HALF_OPEN
+            self._probes = self._successes = 0
+
+        if self._probes >= self.half_open_probes:
+            return None
+
+        self._probes += 1
+        return True
+
+    def record(self, probe: bool, failed: bool) -> None:
+        if probe:
+            if self.state is not BreakerState.HALF_OPEN:
+                return  # The outcome of a stale probe
+            elif failed:
+                self._open()
+            else:
+                self._successes += 1
+                if self._successes >= self.half_open_probes:
+                    self._close()
+            return
+
+        if self.state is not BreakerState.CLOSED:
+            return
+
+        now = monotonic()
+        if now >= self._window_end:
+            self._requests = self._failures = 0
+            self._window_end = now + self.window
+
+        self._requests += 1
+        self._failures += failed
+        if (
+            self._requests >= self.min_requests
+            and self._failures >= self.error_rate * self._requests
+        ):
+            self._open()
+
+    def cancel(self, probe: bool) -> None:
+        """Give back the place of a request which ended without outcome"""
+
+        if probe and self.state is BreakerState.HALF_OPEN:
+            self._probes -= 1
+
+    def _open(self) -> None:
+        self.state = BreakerState.OPEN
+        self.trips += 1
+        self._opened_at = monotonic()
+
+    def _close(self) -> None:
+        self.state = BreakerState.CLOSED
+        self._requests = self._failures = 0
+        self._window_end = monotonic() + self.window
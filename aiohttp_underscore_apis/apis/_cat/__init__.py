@@ -3,6 +3,13 @@ from textwrap import dedent
 
 from aiohttp import web
 
+from aiohttp_underscore_apis.apis._cat.handlers import (
+    host_routes as _cat_host_routes,
+)
+from aiohttp_underscore_apis.apis._cat.handlers import (
+    hot_tasks as _cat_hot_tasks,
+)
+from aiohttp_underscore_apis.apis._cat.handlers import loop as _cat_loop
 from aiohttp_underscore_apis.apis._cat.handlers import routes as _cat_routes
 from aiohttp_underscore_apis.apis._cat.handlers import tasks as _cat_tasks
 
@@ -20,8 +27,12 @@ def setup_routes(app: web.Application) -> None:
                     =^.^=
                     /routes
                     /routes/{route_id}
+                    /host/routes
+                    /host/routes/{route_id}
                     /tasks
                     /tasks/{task_id}
+                    /hot_tasks
+                    /loop
                 """
             )
         )
@@ -30,8 +41,18 @@ def setup_routes(app: web.Application) -> None:
     routes_get("/routes/")(_cat_routes)
     routes_get("/routes/{ids:[0-9]+(,[0-9]+)*}")(_cat_routes)
 
+    routes_get("/host/routes")(_cat_host_routes)
+    routes_get("/host/routes/")(_cat_host_routes)
+    routes_get("/host/routes/{ids:[0-9]+(,[0-9]+)*}")(_cat_host_routes)
+
     routes_get("/tasks")(_cat_tasks)
     routes_get("/tasks/")(_cat_tasks)
     routes_get("/tasks/{ids:[0-9]+(,[0-9]+)*}")(_cat_tasks)
 
+    routes_get("/hot_tasks")(_cat_hot_tasks)
+    routes_get("/hot_tasks/")(_cat_hot_tasks)
+
+    routes_get("/loop")(_cat_loop)
+    routes_get("/loop/")(_cat_loop)
+
     app.add_routes(routes)
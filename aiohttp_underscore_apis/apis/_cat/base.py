@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from collections.abc import Awaitable, Iterable, Sequence, Set
+from collections.abc import Awaitable, Iterable, Iterator, Sequence, Set
 from enum import StrEnum
 from fnmatch import fnmatch
 from itertools import chain
@@ -41,6 +41,17 @@ class CatBase(StrEnum):
     def iter_rows(cls, context: Context) -> Iterable[Mapping["CatBase", Any]]:
         pass
 
+    @classmethod
+    def iter_rows_of(
+        cls, context: Context, ids: Set[int]
+    ) -> Iterable[Mapping["CatBase", Any]]:
+        """Yield the rows of the given IDs, which subclasses may look up"""
+
+        id_column = cls.__members__["ID"]
+        for row in cls.iter_rows(context):
+            if row[id_column] in ids:
+                yield row
+
     @classmethod
     def _help_response(cls) -> web.Response:
         text = tabulate(cls.helps().items())
@@ -118,41 +129,94 @@ class CatBase(StrEnum):
             if help:
                 return cls._help_response()
 
-            table: list[Mapping["CatBase", Any]] = []
-            for row in cls.iter_rows(context):
-                if ids and row[cls.__members__["ID"]] not in ids:
-                    continue
-                table.append(row)
+            table: list[Mapping["CatBase", Any]] = list(
+                cls.iter_rows_of(context, ids)
+                if ids
+                else cls.iter_rows(context)
+            )
 
-            for header, order in reversed(s):
-                table.sort(
-                    key=SortKeyWithNanSupport(header),
-                    reverse=order == Order.DESC,
-                )
+            return cls.render(
+                table, cls._include_headers(h), s=s, format=format, v=v
+            )
 
-            headers = cls._include_headers(h)
-            rows: Iterable[Any]
-            if len(headers) > 1:
-                rows = map(itemgetter(*headers), table)
-            else:
-                rows = ((row[headers[0]],) for row in table)
+        return _handler
 
-            if format == Format.JSON:
-                return cls._json_response(rows, headers)
+    @classmethod
+    def render(
+        cls,
+        table: list[Mapping[str, Any]],
+        headers: Sequence[str],
+        *,
+        s: Sequence[tuple["CatBase", Order]] = [],
+        format: Format = Format.TEXT,
+        v: bool = False,
+    ) -> web.Response:
+        """Sort the table and respond with the given columns of it"""
 
-            elif format == Format.YAML:
-                return cls._yaml_response(rows, headers)
+        for header, order in reversed(s):
+            table.sort(
+                key=SortKeyWithNanSupport(header),
+                reverse=order == Order.DESC,
+            )
 
-            return cls._text_response(rows, headers if v else [])
+        rows: Iterable[Any]
+        if len(headers) > 1:
+            rows = map(itemgetter(*headers), table)
+        else:
+            rows = ((row[headers[0]],) for row in table)
 
-        return _handler
+        if format == Format.JSON:
+            return cls._json_response(rows, headers)
+
+        elif format == Format.YAML:
+            return cls._yaml_response(rows, headers)
+
+        return cls._text_response(rows, headers if v else [])
+
+
+class LazyRow(Mapping["CatBase", Any]):
+    """Row of which the costly columns are computed only once requested
+
+    Each group of columns is computed at once by its function, when any of
+    the columns is looked up for the first time, e.g. to be sorted by or
+    rendered. The other columns are given as they are.
+    """
+
+    __slots__ = ("_columns", "_values", "_groups")
+
+    def __init__(
+        self,
+        columns: type["CatBase"],
+        values: dict["CatBase", Any],
+        groups: Iterable[
+            tuple[Sequence["CatBase"], Callable[[], Iterable[Any]]]
+        ],
+    ) -> None:
+        self._columns = columns
+        self._values = values
+        self._groups = {
+            column: group for group in groups for column in group[0]
+        }
+
+    def __getitem__(self, column: "CatBase") -> Any:
+        if column not in self._values:
+            columns, compute = self._groups[column]
+            self._values.update(zip(columns, compute()))
+
+        return self._values[column]
+
+    def __iter__(self) -> Iterator["CatBase"]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
 
 
 class SortKeyWithNanSupport:
-    def __init__(self, header: CatBase):
+    def __init__(self, header: str):
         self.header = header
 
-    def __call__(self, row: Mapping[CatBase, Any]) -> Any:
+    def __call__(self, row: Mapping[str, Any]) -> Any:
         value = row[self.header]
         if value != value:  # NaN check
             return float("-inf")
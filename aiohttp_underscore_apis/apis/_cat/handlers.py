@@ -1,7 +1,37 @@
-from asyncio import all_tasks
+from asyncio import Task, all_tasks, get_running_loop, sleep
+from collections.abc import Callable, Iterable, Mapping, Sequence, Set
+from functools import lru_cache, partial
+from heapq import nlargest
+from itertools import chain
+from operator import itemgetter
+from time import perf_counter, time
+from typing import Any
 
-from aiohttp_underscore_apis.apis._cat.base import CatBase
+from aiohttp import web
+from marshmallow.validate import Range
+from webargs import fields
+from webargs.aiohttpparser import use_kwargs
+
+from aiohttp_underscore_apis.apis._cat.base import CatBase, LazyRow
+from aiohttp_underscore_apis.apis._cat.options import (
+    Header,
+    Help,
+    Order,
+    Sort,
+    TimeValue,
+    Verbose,
+)
+from aiohttp_underscore_apis.apis._loop.handlers import monitor_of
+from aiohttp_underscore_apis.apis._routes.handlers import _check_ids
+from aiohttp_underscore_apis.apis.common import Format, dissect_request
 from aiohttp_underscore_apis.context import Context
+from aiohttp_underscore_apis.profiling import TimingTaskFactory
+from aiohttp_underscore_apis.shared import (
+    SharedRouteStats,
+    host_totals,
+    read_workers,
+)
+from aiohttp_underscore_apis.stats import Outcomes, RouteStats
 
 
 class CatRoutes(CatBase):
@@ -11,10 +41,55 @@ class CatRoutes(CatBase):
     METHOD = "method"
     PATH = "path"
     REQ_ACTIVE_COUNT = "stats.req.active"
+    REQ_OLDEST_AGE = "stats.req.oldest_age"
     REQ_TOTAL_COUNT = "stats.req.total"
+    REQ_QUEUED_COUNT = "stats.req.queued"
+    REQ_REJECTED_COUNT = "stats.req.rejected"
+    REQ_THROTTLED_COUNT = "stats.req.throttled"
+    REQ_SHED_COUNT = "stats.req.shed"
+    REQ_DROP_RATE = "stats.req.drop_rate"
+    REQ_COALESCED_COUNT = "stats.req.coalesced"
+    REQ_TIMEOUTS_COUNT = "stats.req.timeouts"
+    REQ_SHORT_CIRCUITED_COUNT = "stats.req.short_circuited"
+    BREAKER_STATE = "breaker.state"
+    CACHE_ENTRIES = "stats.cache.entries"
+    CACHE_HITS = "stats.cache.hit"
+    CACHE_MISSES = "stats.cache.miss"
+    CACHE_EVICTIONS = "stats.cache.evict"
     RESP_TIME_AVG_1M = "stats.resp.time_avg_1m"
     RESP_TIME_AVG_5M = "stats.resp.time_avg_5m"
     RESP_TIME_AVG_15M = "stats.resp.time_avg_15m"
+    RESP_P50_1M = "stats.resp.p50_1m"
+    RESP_P90_1M = "stats.resp.p90_1m"
+    RESP_P99_1M = "stats.resp.p99_1m"
+    RESP_MAX_1M = "stats.resp.max_1m"
+    RESP_P50_5M = "stats.resp.p50_5m"
+    RESP_P90_5M = "stats.resp.p90_5m"
+    RESP_P99_5M = "stats.resp.p99_5m"
+    RESP_MAX_5M = "stats.resp.max_5m"
+    RESP_P50_15M = "stats.resp.p50_15m"
+    RESP_P90_15M = "stats.resp.p90_15m"
+    RESP_P99_15M = "stats.resp.p99_15m"
+    RESP_MAX_15M = "stats.resp.max_15m"
+    STATUS_1XX_COUNT = "stats.status.1xx"
+    STATUS_2XX_COUNT = "stats.status.2xx"
+    STATUS_3XX_COUNT = "stats.status.3xx"
+    STATUS_4XX_COUNT = "stats.status.4xx"
+    STATUS_5XX_COUNT = "stats.status.5xx"
+    STATUS_UNHANDLED_COUNT = "stats.status.unhandled"
+    STATUS_CANCELLED_COUNT = "stats.status.cancelled"
+    STATUS_HTTP_EXC_COUNT = "stats.status.http_exc"
+    STATUS_ERROR_RATE_1M = "stats.status.error_rate_1m"
+    STATUS_ERROR_RATE_5M = "stats.status.error_rate_5m"
+    STATUS_ERROR_RATE_15M = "stats.status.error_rate_15m"
+    BYTES_IN = "stats.bytes.in"
+    BYTES_OUT = "stats.bytes.out"
+    BYTES_IN_RATE_1M = "stats.bytes.in_rate_1m"
+    BYTES_OUT_RATE_1M = "stats.bytes.out_rate_1m"
+    BYTES_IN_RATE_5M = "stats.bytes.in_rate_5m"
+    BYTES_OUT_RATE_5M = "stats.bytes.out_rate_5m"
+    BYTES_IN_RATE_15M = "stats.bytes.in_rate_15m"
+    BYTES_OUT_RATE_15M = "stats.bytes.out_rate_15m"
 
     @classmethod
     def defaults(cls):
@@ -35,38 +110,332 @@ class CatRoutes(CatBase):
             cls.METHOD: "Route HTTP method",
             cls.PATH: "Route path",
             cls.REQ_ACTIVE_COUNT: "Number of active requests",
+            cls.REQ_OLDEST_AGE: "Seconds since oldest active request started",
             cls.REQ_TOTAL_COUNT: "Total number of requests",
+            cls.REQ_QUEUED_COUNT: "Number of requests queued for admission",
+            cls.REQ_REJECTED_COUNT: "Number of requests rejected by limit",
+            cls.REQ_THROTTLED_COUNT: "Number of requests throttled by rate",
+            cls.REQ_SHED_COUNT: "Number of requests shed by overload",
+            cls.REQ_DROP_RATE: "Current rate of shedding requests",
+            cls.REQ_COALESCED_COUNT: "Number of requests sharing a response",
+            cls.REQ_TIMEOUTS_COUNT: "Number of requests timed out",
+            cls.REQ_SHORT_CIRCUITED_COUNT: "Number of requests failed fast",
+            cls.BREAKER_STATE: "State of circuit breaker if enabled",
+            cls.CACHE_ENTRIES: "Number of cached responses",
+            cls.CACHE_HITS: "Number of requests served from cache",
+            cls.CACHE_MISSES: "Number of requests missing cache",
+            cls.CACHE_EVICTIONS: "Number of cached responses evicted",
             cls.RESP_TIME_AVG_1M: "Average response time over last 1 min",
             cls.RESP_TIME_AVG_5M: "Average response time over last 5 min",
             cls.RESP_TIME_AVG_15M: "Average response time over last 15 min",
+            cls.RESP_P50_1M: "Median response time over last 1 min",
+            cls.RESP_P90_1M: "90th percentile response time over last 1 min",
+            cls.RESP_P99_1M: "99th percentile response time over last 1 min",
+            cls.RESP_MAX_1M: "Maximum response time over last 1 min",
+            cls.RESP_P50_5M: "Median response time over last 5 min",
+            cls.RESP_P90_5M: "90th percentile response time over last 5 min",
+            cls.RESP_P99_5M: "99th percentile response time over last 5 min",
+            cls.RESP_MAX_5M: "Maximum response time over last 5 min",
+            cls.RESP_P50_15M: "Median response time over last 15 min",
+            cls.RESP_P90_15M: "90th percentile response time over last 15 min",
+            cls.RESP_P99_15M: "99th percentile response time over last 15 min",
+            cls.RESP_MAX_15M: "Maximum response time over last 15 min",
+            cls.STATUS_1XX_COUNT: "Number of 1xx responses",
+            cls.STATUS_2XX_COUNT: "Number of 2xx responses",
+            cls.STATUS_3XX_COUNT: "Number of 3xx responses",
+            cls.STATUS_4XX_COUNT: "Number of 4xx responses",
+            cls.STATUS_5XX_COUNT: "Number of 5xx responses",
+            cls.STATUS_UNHANDLED_COUNT: "Number of unhandled exceptions",
+            cls.STATUS_CANCELLED_COUNT: "Number of cancelled requests",
+            cls.STATUS_HTTP_EXC_COUNT: "Number of HTTPExceptions raised",
+            cls.STATUS_ERROR_RATE_1M: "Errors per second over last 1 min",
+            cls.STATUS_ERROR_RATE_5M: "Errors per second over last 5 min",
+            cls.STATUS_ERROR_RATE_15M: "Errors per second over last 15 min",
+            cls.BYTES_IN: "Total bytes of request bodies",
+            cls.BYTES_OUT: "Total bytes of response bodies",
+            cls.BYTES_IN_RATE_1M: "Bytes per second in over last 1 min",
+            cls.BYTES_OUT_RATE_1M: "Bytes per second out over last 1 min",
+            cls.BYTES_IN_RATE_5M: "Bytes per second in over last 5 min",
+            cls.BYTES_OUT_RATE_5M: "Bytes per second out over last 5 min",
+            cls.BYTES_IN_RATE_15M: "Bytes per second in over last 15 min",
+            cls.BYTES_OUT_RATE_15M: "Bytes per second out over last 15 min",
         }
 
+    @classmethod
+    def iter_rows_of(cls, context: Context, ids: Set[int]):
+        _check_ids(context, ids)  # Before the rows are iterated
+        return super().iter_rows_of(context, ids)
+
     @classmethod
     def iter_rows(cls, context: Context):
 
-        for route in context.core_app.router.routes():
+        registry = context.registry
+        now = perf_counter()
+        # Computed once for all the routes, and only if the column is asked
+        oldest_started = lru_cache(maxsize=None)(registry.oldest_started)
+        for route_id, route in enumerate(registry.routes):
 
-            route_id = id(route)
             handler = f"{route.handler.__module__}.{route.handler.__name__}"
             info = route.get_info()
             path = info.get("path") or info.get("formatter", "<unknown>")
-            stats = context.route_stats[route_id]
+            stats = registry.stats[route_id]
+            settings = registry.settings[route_id]
+            shedding = settings.shedding
+            breaker = settings.circuit_breaker
+            cache = settings.response_cache
 
-            yield dict(
-                zip(
-                    cls,
+            # The columns over the time windows are computed only if requested
+            yield LazyRow(
+                cls,
+                {
+                    cls.ID: route_id,
+                    cls.HANDLER: handler,
+                    cls.NAME: route.name or "",
+                    cls.METHOD: route.method,
+                    cls.PATH: path,
+                    cls.REQ_ACTIVE_COUNT: stats.counter.active,
+                    cls.REQ_TOTAL_COUNT: stats.counter.total,
+                    cls.REQ_QUEUED_COUNT: stats.counter.queued,
+                    cls.REQ_REJECTED_COUNT: stats.counter.rejected,
+                    cls.REQ_THROTTLED_COUNT: stats.counter.throttled,
+                    cls.REQ_SHED_COUNT: stats.counter.shed,
+                    cls.REQ_DROP_RATE: shedding.drop_rate if shedding else 0.0,
+                    cls.REQ_COALESCED_COUNT: settings.single_flight.followers,
+                    cls.REQ_TIMEOUTS_COUNT: stats.counter.timeouts,
+                    cls.REQ_SHORT_CIRCUITED_COUNT: (
+                        stats.counter.short_circuited
+                    ),
+                    cls.BREAKER_STATE: breaker.state.value if breaker else "",
+                    cls.CACHE_ENTRIES: len(cache),
+                    cls.CACHE_HITS: cache.hits,
+                    cls.CACHE_MISSES: cache.misses,
+                    cls.CACHE_EVICTIONS: cache.evictions,
+                    **dict(zip(_STATUS_COUNTS, stats.outcomes.totals)),
+                    cls.STATUS_HTTP_EXC_COUNT: stats.counter.http_exceptions,
+                    cls.BYTES_IN: stats.throughput.total_in,
+                    cls.BYTES_OUT: stats.throughput.total_out,
+                },
+                (
                     (
-                        route_id,
-                        handler,
-                        route.name or "",
-                        route.method,
-                        path,
-                        stats.counter.active,
-                        stats.counter.total,
-                        *stats.time_avg.calculate(),
+                        (cls.REQ_OLDEST_AGE,),
+                        partial(_oldest_age, oldest_started, route_id, now),
                     ),
-                )
+                    (_TIME_AVGS, stats.time_avg.calculate),
+                    (_LATENCIES, partial(_latencies, stats)),
+                    (_ERROR_RATES, partial(_error_rates, stats)),
+                    (_BYTES_RATES, partial(_bytes_rates, stats)),
+                ),
+            )
+
+
+_STATUS_COUNTS = (
+    CatRoutes.STATUS_1XX_COUNT,
+    CatRoutes.STATUS_2XX_COUNT,
+    CatRoutes.STATUS_3XX_COUNT,
+    CatRoutes.STATUS_4XX_COUNT,
+    CatRoutes.STATUS_5XX_COUNT,
+    CatRoutes.STATUS_UNHANDLED_COUNT,
+    CatRoutes.STATUS_CANCELLED_COUNT,
+)
+_TIME_AVGS = (
+    CatRoutes.RESP_TIME_AVG_1M,
+    CatRoutes.RESP_TIME_AVG_5M,
+    CatRoutes.RESP_TIME_AVG_15M,
+)
+_LATENCIES = (
+    CatRoutes.RESP_P50_1M,
+    CatRoutes.RESP_P90_1M,
+    CatRoutes.RESP_P99_1M,
+    CatRoutes.RESP_MAX_1M,
+    CatRoutes.RESP_P50_5M,
+    CatRoutes.RESP_P90_5M,
+    CatRoutes.RESP_P99_5M,
+    CatRoutes.RESP_MAX_5M,
+    CatRoutes.RESP_P50_15M,
+    CatRoutes.RESP_P90_15M,
+    CatRoutes.RESP_P99_15M,
+    CatRoutes.RESP_MAX_15M,
+)
+_ERROR_RATES = (
+    CatRoutes.STATUS_ERROR_RATE_1M,
+    CatRoutes.STATUS_ERROR_RATE_5M,
+    CatRoutes.STATUS_ERROR_RATE_15M,
+)
+_BYTES_RATES = (
+    CatRoutes.BYTES_IN_RATE_1M,
+    CatRoutes.BYTES_OUT_RATE_1M,
+    CatRoutes.BYTES_IN_RATE_5M,
+    CatRoutes.BYTES_OUT_RATE_5M,
+    CatRoutes.BYTES_IN_RATE_15M,
+    CatRoutes.BYTES_OUT_RATE_15M,
+)
+
+
+def _oldest_age(
+    oldest_started: Callable[[], dict[int, float]], route_id: int, now: float
+):
+    started = oldest_started().get(route_id)
+    return (float("nan") if started is None else now - started,)
+
+
+def _latencies(stats: RouteStats):
+    return chain.from_iterable(
+        (
+            histogram.quantile(0.5),
+            histogram.quantile(0.9),
+            histogram.quantile(0.99),
+            histogram.max,
+        )
+        for histogram in stats.latency.calculate()
+    )
+
+
+def _error_rates(stats: RouteStats):
+    return (
+        rates[4] + rates[Outcomes.UNHANDLED]
+        for rates in stats.outcomes.calculate()
+    )
+
+
+def _bytes_rates(stats: RouteStats):
+    return chain.from_iterable(stats.throughput.calculate())
+
+
+class CatHostRoutes(CatBase):
+    WORKER = "worker"
+    ID = "id"
+    METHOD = "method"
+    PATH = "path"
+    REQ_ACTIVE_COUNT = "stats.req.active"
+    REQ_TOTAL_COUNT = "stats.req.total"
+    REQ_QUEUED_COUNT = "stats.req.queued"
+    REQ_REJECTED_COUNT = "stats.req.rejected"
+    REQ_THROTTLED_COUNT = "stats.req.throttled"
+    REQ_SHED_COUNT = "stats.req.shed"
+    REQ_TIMEOUTS_COUNT = "stats.req.timeouts"
+    REQ_SHORT_CIRCUITED_COUNT = "stats.req.short_circuited"
+    STATUS_1XX_COUNT = "stats.status.1xx"
+    STATUS_2XX_COUNT = "stats.status.2xx"
+    STATUS_3XX_COUNT = "stats.status.3xx"
+    STATUS_4XX_COUNT = "stats.status.4xx"
+    STATUS_5XX_COUNT = "stats.status.5xx"
+    STATUS_UNHANDLED_COUNT = "stats.status.unhandled"
+    STATUS_CANCELLED_COUNT = "stats.status.cancelled"
+    BYTES_IN = "stats.bytes.in"
+    BYTES_OUT = "stats.bytes.out"
+    RESP_COUNT = "stats.resp.count"
+    RESP_TIME_AVG = "stats.resp.time_avg"
+    RESP_P50 = "stats.resp.p50"
+    RESP_P90 = "stats.resp.p90"
+    RESP_P99 = "stats.resp.p99"
+    RESP_MAX = "stats.resp.max"
+
+    @classmethod
+    def defaults(cls):
+        return [
+            cls.WORKER.value,
+            cls.ID.value,
+            cls.METHOD.value,
+            cls.PATH.value,
+            cls.REQ_ACTIVE_COUNT.value,
+            cls.REQ_TOTAL_COUNT.value,
+        ]
+
+    @classmethod
+    def helps(cls):
+        return {
+            cls.WORKER: "PID of worker process or * for all workers",
+            cls.ID: "Internal identifier",
+            cls.METHOD: "HTTP method",
+            cls.PATH: "Path",
+            cls.REQ_ACTIVE_COUNT: "Number of active requests",
+            cls.REQ_TOTAL_COUNT: "Total number of requests",
+            cls.REQ_QUEUED_COUNT: "Number of requests queued for admission",
+            cls.REQ_REJECTED_COUNT: "Number of requests rejected by limit",
+            cls.REQ_THROTTLED_COUNT: "Number of requests throttled by rate",
+            cls.REQ_SHED_COUNT: "Number of requests shed by overload",
+            cls.REQ_TIMEOUTS_COUNT: "Number of requests timed out",
+            cls.REQ_SHORT_CIRCUITED_COUNT: "Number of requests failed fast",
+            cls.STATUS_1XX_COUNT: "Number of 1xx responses",
+            cls.STATUS_2XX_COUNT: "Number of 2xx responses",
+            cls.STATUS_3XX_COUNT: "Number of 3xx responses",
+            cls.STATUS_4XX_COUNT: "Number of 4xx responses",
+            cls.STATUS_5XX_COUNT: "Number of 5xx responses",
+            cls.STATUS_UNHANDLED_COUNT: "Number of unhandled exceptions",
+            cls.STATUS_CANCELLED_COUNT: "Number of cancelled requests",
+            cls.BYTES_IN: "Total bytes of request bodies",
+            cls.BYTES_OUT: "Total bytes of response bodies",
+            cls.RESP_COUNT: "Number of timed responses",
+            cls.RESP_TIME_AVG: "Average response time since start",
+            cls.RESP_P50: "Median response time since start",
+            cls.RESP_P90: "90th percentile response time since start",
+            cls.RESP_P99: "99th percentile response time since start",
+            cls.RESP_MAX: "Maximum response time since start",
+        }
+
+    @classmethod
+    def iter_rows_of(cls, context: Context, ids: Set[int]):
+        _check_ids(context, ids)  # Before the rows are iterated
+        return super().iter_rows_of(context, ids)
+
+    @classmethod
+    def iter_rows(cls, context: Context):
+
+        registry = context.registry
+        workers = read_workers(context.shared_stats, registry)
+        totals = host_totals(workers, len(registry))
+
+        for route_id, route in enumerate(registry.routes):
+            info = route.get_info()
+            path = info.get("path") or info.get("formatter", "<unknown>")
+
+            yield cls._row("*", route_id, route.method, path, totals[route_id])
+            for worker in workers:
+                if route_id < len(worker.routes):
+                    if (stats := worker.routes[route_id]) is not None:
+                        yield cls._row(
+                            str(worker.pid),
+                            route_id,
+                            route.method,
+                            path,
+                            stats,
+                        )
+
+    @classmethod
+    def _row(cls, worker, route_id, method, path, stats: SharedRouteStats):
+        latency = stats.latency
+        return dict(
+            zip(
+                cls,
+                (
+                    worker,
+                    route_id,
+                    method,
+                    path,
+                    stats.counter.active,
+                    stats.counter.total,
+                    stats.counter.queued,
+                    stats.counter.rejected,
+                    stats.counter.throttled,
+                    stats.counter.shed,
+                    stats.counter.timeouts,
+                    stats.counter.short_circuited,
+                    *stats.outcomes,
+                    stats.bytes_in,
+                    stats.bytes_out,
+                    latency.count,
+                    (
+                        latency.sum / latency.count
+                        if latency.count
+                        else float("nan")
+                    ),
+                    latency.quantile(0.5),
+                    latency.quantile(0.9),
+                    latency.quantile(0.99),
+                    latency.max,
+                ),
             )
+        )
 
 
 class CatTasks(CatBase):
@@ -77,6 +446,7 @@ class CatTasks(CatBase):
     CANCELLED = "cancelled"
     CANCELLING = "cancelling"
     ROUTE_ID = "route_id"
+    AGE = "age"
 
     @classmethod
     def defaults(cls):
@@ -92,19 +462,143 @@ class CatTasks(CatBase):
             cls.CANCELLED: "Number of pending cancellation requests",
             cls.CANCELLING: "Whether or not task is cancelling",
             cls.ROUTE_ID: "Route ID associated with the task",
+            cls.AGE: "Seconds since request served by the task started",
         }
 
+    @classmethod
+    def _row(cls, task: Task, context: Context, now: float):
+        registry = context.registry
+        coro = task.get_coro()
+        route_id, started = registry.tasks.get(task, (-1, None))
+
+        return dict(
+            zip(
+                cls,
+                (
+                    id(task),
+                    task.get_name(),
+                    coro
+                    and getattr(coro, "__qualname__", type(coro).__qualname__),
+                    task.done(),
+                    task.cancelled(),
+                    task.cancelling(),
+                    route_id,
+                    float("nan") if started is None else now - started,
+                ),
+            )
+        )
+
     @classmethod
     def iter_rows(cls, context: Context):
+        now = perf_counter()
+        for task in all_tasks(context.core_app.loop):
+            yield cls._row(task, context, now)
+
+    @classmethod
+    def iter_rows_of(cls, context: Context, ids: Set[int]):
+        now = perf_counter()
+        for task in all_tasks(context.core_app.loop):
+            if id(task) in ids:
+                yield cls._row(task, context, now)
 
-        id_map = {
-            id(task): route_id
-            for route_id, tasks in context.task_refs.items()
-            for task in tasks
+
+HOT_TASKS_INTERVAL = 0.5
+HOT_TASKS_MAX_INTERVAL = 60.0
+HOT_TASKS_SIZE = 10
+
+
+class CatHotTasks(CatBase):
+    """Tasks holding the loop the longest, like hot_threads of Elasticsearch
+
+    The tasks are timed by TimingTaskFactory, which is installed by the
+    listener if `instrument_tasks` is enabled. The time of a task is the one
+    it has held the loop for during the interval, or since it started if the
+    interval is zero.
+    """
+
+    ID = "id"
+    NAME = "name"
+    CORO = "coro"
+    ROUTE_ID = "route_id"
+    TIME = "time"
+    SHARE = "share"
+    STEPS = "steps"
+    MAX_STEP = "max_step"
+    TOTAL_TIME = "total_time"
+
+    @classmethod
+    def defaults(cls):
+        return [
+            cls.ID.value,
+            cls.CORO.value,
+            cls.ROUTE_ID.value,
+            cls.TIME.value,
+            cls.SHARE.value,
+            cls.STEPS.value,
+            cls.MAX_STEP.value,
+        ]
+
+    @classmethod
+    def helps(cls):
+        return {
+            cls.ID: "Internal identifier",
+            cls.NAME: "Task name",
+            cls.CORO: "Coroutine object wrapped by task",
+            cls.ROUTE_ID: "Route ID associated with the task",
+            cls.TIME: "Seconds the task held the loop for during interval",
+            cls.SHARE: "Percentage of interval the task held the loop for",
+            cls.STEPS: "Number of steps the task took during interval",
+            cls.MAX_STEP: "Seconds of longest step since task started",
+            cls.TOTAL_TIME: "Seconds the task held the loop for in total",
         }
 
-        for task in all_tasks(context.core_app.loop):
-            coro = task.get_coro()
+    @staticmethod
+    def _sample() -> dict[Task, tuple[float, int]]:
+        samples: dict[Task, tuple[float, int]] = {}
+        for task in all_tasks():
+            if timing := TimingTaskFactory.timing_of(task):
+                samples[task] = (timing.time, timing.steps)
+
+        return samples
+
+    @staticmethod
+    def _routes_of(context: Context) -> dict[Task, int]:
+        """Return the routes of the tasks serving requests
+
+        aiohttp may handle each request of a connection in a task awaited by
+        the task of the connection, which is the one tracked, hence the task
+        awaited by it is attributed to the same route.
+        """
+
+        routes = {
+            task: route_id
+            for task, (route_id, _) in context.registry.tasks.items()
+        }
+        for task, route_id in list(routes.items()):
+            awaited = getattr(task, "_fut_waiter", None)
+            if isinstance(awaited, Task):
+                routes.setdefault(awaited, route_id)
+
+        return routes
+
+    @classmethod
+    def iter_rows(
+        cls,
+        context: Context,
+        since: Mapping[Task, tuple[float, int]] = {},
+        interval: float = 0.0,
+        routes: Mapping[Task, int] | None = None,
+    ):
+        if routes is None:
+            routes = cls._routes_of(context)
+
+        # The tasks done during the interval are still counted
+        for task in since.keys() | all_tasks():
+            if (timing := TimingTaskFactory.timing_of(task)) is None:
+                continue
+
+            time, steps = since.get(task, (0.0, 0))
+            time = timing.time - time
 
             yield dict(
                 zip(
@@ -112,16 +606,165 @@ class CatTasks(CatBase):
                     (
                         id(task),
                         task.get_name(),
-                        coro and coro.__qualname__,
-                        task.done(),
-                        task.cancelled(),
-                        task.cancelling(),
-                        id_map.get(id(task), -1),
+                        timing.__qualname__,
+                        routes.get(task, -1),
+                        time,
+                        time / interval * 100 if interval else float("nan"),
+                        timing.steps - steps,
+                        timing.longest,
+                        timing.time,
                     ),
                 )
             )
 
+    @classmethod
+    def handler(cls):
+
+        @dissect_request
+        @use_kwargs(
+            {
+                "help": Help(),
+                "v": Verbose(),
+                "s": Sort(cls),
+                "h": Header(cls),
+                "interval": TimeValue(
+                    validate=Range(max=HOT_TASKS_MAX_INTERVAL)
+                ),
+                "size": fields.Int(validate=Range(min=1)),
+            },
+            location="querystring",
+        )
+        async def _handler(
+            request: web.Request,
+            context: Context,
+            *,
+            help: bool = False,
+            format: Format = Format.TEXT,
+            v: bool = False,
+            s: Sequence[tuple[CatBase, Order]] = [],
+            h: Iterable[str] = cls.defaults(),
+            interval: float = HOT_TASKS_INTERVAL,
+            size: int = HOT_TASKS_SIZE,
+            **_: Any,
+        ) -> web.Response:
+
+            if help:
+                return cls._help_response()
+
+            if not TimingTaskFactory.installed(get_running_loop()):
+                raise web.HTTPConflict(text="Tasks are not instrumented\n")
+
+            # Served by aiohttp the same way as the other requests, hence
+            # untimed if aiohttp creates the tasks bypassing the task factory,
+            # e.g. eagerly with asyncio.Task() on Python 3.12 and 3.13.
+            if TimingTaskFactory.timing_of(request.task) is None:
+                raise web.HTTPConflict(
+                    text="Request tasks are not instrumented as they are "
+                    "created bypassing the task factory\n"
+                )
+
+            since: dict[Task, tuple[float, int]] = {}
+            routes: dict[Task, int] = {}
+            if interval:
+                since, routes = cls._sample(), cls._routes_of(context)
+                start = perf_counter()
+                await sleep(interval)
+                interval = perf_counter() - start  # Late if the loop is busy
+            routes.update(cls._routes_of(context))
+
+            table = nlargest(
+                size,
+                cls.iter_rows(context, since, interval, routes),
+                key=itemgetter(cls.TIME),
+            )
+
+            return cls.render(
+                table, cls._include_headers(h), s=s, format=format, v=v
+            )
+
+        return _handler
+
+
+class CatLoop(CatBase):
+    TASKS = "tasks"
+    LAG_AVG_1M = "lag.avg_1m"
+    LAG_AVG_5M = "lag.avg_5m"
+    LAG_AVG_15M = "lag.avg_15m"
+    LAG_P50_1M = "lag.p50_1m"
+    LAG_P99_1M = "lag.p99_1m"
+    LAG_MAX_1M = "lag.max_1m"
+    LAG_P50_5M = "lag.p50_5m"
+    LAG_P99_5M = "lag.p99_5m"
+    LAG_MAX_5M = "lag.max_5m"
+    LAG_P50_15M = "lag.p50_15m"
+    LAG_P99_15M = "lag.p99_15m"
+    LAG_MAX_15M = "lag.max_15m"
+    LAG_MAX = "lag.max"
+    BLOCKED_COUNT = "blocked.count"
+    BLOCKED_LAST = "blocked.last"
+
+    @classmethod
+    def defaults(cls):
+        return [
+            cls.TASKS.value,
+            cls.LAG_AVG_1M.value,
+            cls.LAG_P99_1M.value,
+            cls.LAG_MAX_1M.value,
+            cls.LAG_MAX.value,
+            cls.BLOCKED_COUNT.value,
+        ]
+
+    @classmethod
+    def helps(cls):
+        return {
+            cls.TASKS: "Number of tasks",
+            cls.LAG_AVG_1M: "Average scheduling lag over last 1 min",
+            cls.LAG_AVG_5M: "Average scheduling lag over last 5 min",
+            cls.LAG_AVG_15M: "Average scheduling lag over last 15 min",
+            cls.LAG_P50_1M: "Median scheduling lag over last 1 min",
+            cls.LAG_P99_1M: "99th percentile scheduling lag over last 1 min",
+            cls.LAG_MAX_1M: "Maximum scheduling lag over last 1 min",
+            cls.LAG_P50_5M: "Median scheduling lag over last 5 min",
+            cls.LAG_P99_5M: "99th percentile scheduling lag over last 5 min",
+            cls.LAG_MAX_5M: "Maximum scheduling lag over last 5 min",
+            cls.LAG_P50_15M: "Median scheduling lag over last 15 min",
+            cls.LAG_P99_15M: "99th percentile scheduling lag over last 15 min",
+            cls.LAG_MAX_15M: "Maximum scheduling lag over last 15 min",
+            cls.LAG_MAX: "Maximum scheduling lag since start",
+            cls.BLOCKED_COUNT: "Number of times loop was blocked",
+            cls.BLOCKED_LAST: "Seconds since loop was last blocked",
+        }
+
+    @classmethod
+    def iter_rows(cls, context: Context):
+        monitor = monitor_of(context)
+        last = monitor.events[-1].at if monitor.events else float("nan")
+
+        yield dict(
+            zip(
+                cls,
+                (
+                    len(all_tasks()),
+                    *monitor.time_avg.calculate(),
+                    *chain.from_iterable(
+                        (
+                            histogram.quantile(0.5),
+                            histogram.quantile(0.99),
+                            histogram.max,
+                        )
+                        for histogram in monitor.latency.calculate()
+                    ),
+                    monitor.max_lag,
+                    monitor.blocked,
+                    time() - last,
+                ),
+            )
+        )
+
 
 routes = CatRoutes.handler()
+host_routes = CatHostRoutes.handler()
 tasks = CatTasks.handler()
-__all__ = ["routes", "tasks"]
+hot_tasks = CatHotTasks.handler()
+loop = CatLoop.handler()
+__all__ = ["routes", "host_routes", "tasks", "hot_tasks", "loop"]
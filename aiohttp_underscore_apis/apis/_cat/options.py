@@ -1,3 +1,4 @@
+import re
 from enum import StrEnum
 from fnmatch import fnmatch
 from typing import Type
@@ -64,3 +65,17 @@ class FnmatchAnyNames(validate.Validator):
 class Header(fields.DelimitedList):
     def __init__(self, column: Type[StrEnum]):
         super().__init__(fields.Str(validate=FnmatchAnyNames(*column)))
+
+
+class TimeValue(fields.Field):
+    """Seconds given with a unit like `500ms`, `5s` or `1m`, or without one"""
+
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0}
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        match = re.fullmatch(r"([0-9]+(?:\.[0-9]*)?)(ms|s|m)?", str(value))
+        if match is None:
+            raise ValidationError(f"{value!r} is not a time value")
+
+        number, unit = match.groups()
+        return float(number) * self.units[unit or "s"]
@@ -1,9 +1,9 @@
 import json
-from unittest import IsolatedAsyncioTestCase
+from unittest import IsolatedAsyncioTestCase, TestCase
 
 from aiohttp.test_utils import make_mocked_request
 
-from aiohttp_underscore_apis.apis._cat.base import CatBase
+from aiohttp_underscore_apis.apis._cat.base import CatBase, LazyRow
 from aiohttp_underscore_apis.context import Context
 
 
@@ -57,3 +57,26 @@ class CatBaseTest(IsolatedAsyncioTestCase):
         self.assertSequenceEqual(
             json.loads(resp.text), [{"apple": 10, "banana": 20}]
         )
+
+
+class LazyRowTest(TestCase):
+    def test_lazy_groups(self):
+        computed = []
+
+        def fruits():
+            computed.append("fruits")
+            return 20, 30
+
+        row = LazyRow(
+            CatNone,
+            {CatNone.ID: 1, CatNone.APPLE: 10},
+            [((CatNone.BANANA, CatNone.CHERRY), fruits)],
+        )
+        self.assertEqual(list(row), list(CatNone))
+        self.assertEqual(len(row), 4)
+        self.assertEqual(row[CatNone.APPLE], 10)
+        self.assertEqual(computed, [])
+
+        self.assertEqual(row[CatNone.CHERRY], 30)
+        self.assertEqual(row[CatNone.BANANA], 20)
+        self.assertEqual(computed, ["fruits"])  # Computed only once
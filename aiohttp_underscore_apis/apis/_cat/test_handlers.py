@@ -0,0 +1,156 @@
+import asyncio
+import os
+import sys
+from functools import partial
+from tempfile import TemporaryDirectory
+from unittest import IsolatedAsyncioTestCase, skipIf
+from unittest.mock import patch
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from aiohttp_underscore_apis import AiohttpUnderscoreApis
+from aiohttp_underscore_apis.profiling import TimingTaskFactory
+from aiohttp_underscore_apis.stats import LatencySketch
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response()
+
+
+class CatRoutesTest(IsolatedAsyncioTestCase):
+    async def test_lazy_columns(self):
+        apis = AiohttpUnderscoreApis()
+        app = web.Application(middlewares=apis.middlewares)
+        app.router.add_get("/", handler, allow_head=False)
+        for name, subapp in apis.init_subapps(app).items():
+            app.add_subapp(f"/{name}", subapp)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+        await client.get("/")
+
+        with patch.object(
+            LatencySketch, "calculate", autospec=True
+        ) as calculate:
+            response = await client.get("/_cat/routes", params={"v": ""})
+            self.assertEqual(response.status, 200)
+            calculate.assert_not_called()
+
+        response = await client.get(
+            "/_cat/routes/0",
+            params={
+                "format": "json",
+                "h": "id,stats.req.total,stats.resp.max_1m",
+                "s": "stats.resp.p50_1m",
+            },
+        )
+        (row,) = await response.json()
+        self.assertEqual(row["id"], 0)
+        self.assertEqual(row["stats.req.total"], 1)
+        self.assertGreater(row["stats.resp.max_1m"], 0)
+
+    async def test_unknown_ids(self):
+        apis = AiohttpUnderscoreApis()
+        app = web.Application(middlewares=apis.middlewares)
+        app.router.add_get("/", handler, allow_head=False)
+        for name, subapp in apis.init_subapps(app).items():
+            app.add_subapp(f"/{name}", subapp)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+
+        for path in (
+            "/_cat/routes/0,999",
+            "/_cat/host/routes/999",
+            "/_routes/999/stats",
+        ):
+            with self.subTest(path=path):
+                response = await client.get(path)
+                self.assertEqual(response.status, 404)
+                self.assertEqual(
+                    await response.json(),
+                    {"error": "Unknown route IDs: [999]"},
+                )
+
+
+class CatHostRoutesTest(IsolatedAsyncioTestCase):
+    async def test_sort_by_worker(self):
+        apis = AiohttpUnderscoreApis()
+        app = web.Application(middlewares=apis.middlewares)
+        app.router.add_get("/", handler, allow_head=False)
+        for name, subapp in apis.init_subapps(app).items():
+            app.add_subapp(f"/{name}", subapp)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+
+        for sort, reverse in (("worker", False), ("worker:desc", True)):
+            with self.subTest(sort=sort):
+                response = await client.get(
+                    "/_cat/host/routes",
+                    params={"format": "json", "h": "worker", "s": sort},
+                )
+                self.assertEqual(response.status, 200)
+                workers = [row["worker"] for row in await response.json()]
+                self.assertEqual(workers, sorted(workers, reverse=reverse))
+                self.assertEqual(set(workers), {"*", str(os.getpid())})
+
+
+class CatHotTasksTest(IsolatedAsyncioTestCase):
+    @skipIf(
+        (3, 12) <= sys.version_info < (3, 14),
+        "aiohttp creates the request tasks bypassing the task factory",
+    )
+    async def test_instrumented(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, "apis.sock")
+
+        apis = AiohttpUnderscoreApis(
+            site_factories=[partial(web.UnixSite, path=path)],
+            instrument_tasks=True,
+        )
+        app = web.Application(middlewares=apis.middlewares)
+        app.router.add_get("/", handler, allow_head=False)
+        app.cleanup_ctx.append(apis.listener)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+
+        connector = aiohttp.UnixConnector(path=path)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async with session.get(
+                "http://localhost/_cat/hot_tasks",
+                params={"format": "json", "interval": "0.01s", "h": "id"},
+            ) as response:
+                self.assertEqual(response.status, 200)
+                self.assertIsInstance(await response.json(), list)
+
+    async def test_not_instrumented(self):
+        apis = AiohttpUnderscoreApis()
+        app = web.Application(middlewares=apis.middlewares)
+        for name, subapp in apis.init_subapps(app).items():
+            app.add_subapp(f"/{name}", subapp)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+
+        response = await client.get("/_cat/hot_tasks")
+        self.assertEqual(response.status, 409)
+        self.assertEqual(await response.text(), "Tasks are not instrumented\n")
+
+        # Installed after the connection has been made, so that its task is
+        # left untimed as if aiohttp created it bypassing the task factory
+        loop = asyncio.get_running_loop()
+        self.addCleanup(TimingTaskFactory.install(loop).uninstall, loop)
+
+        response = await client.get("/_cat/hot_tasks")
+        self.assertEqual(response.status, 409)
+        self.assertIn("bypassing the task factory", await response.text())
@@ -9,6 +9,7 @@ from aiohttp_underscore_apis.apis._cat.options import (
     Header,
     Help,
     Sort,
+    TimeValue,
     Verbose,
 )
 
@@ -97,3 +98,16 @@ class FieldsTest(TestCase):
         for invalid_value in ("APPLE", "apple,foo", "ba*,", ",*rry", "a*,,c*"):
             with self.assertRaises(ValidationError):
                 Header(Column).deserialize(invalid_value)
+
+    def test_TimeValue(self):
+        for value, expected in (
+            ("500ms", 0.5),
+            ("5s", 5.0),
+            ("1.5m", 90.0),
+            ("2", 2.0),
+        ):
+            self.assertEqual(TimeValue().deserialize(value), expected)
+
+        for value in ("", "5h", "-1s", "s"):
+            with self.assertRaises(ValidationError):
+                TimeValue().deserialize(value)
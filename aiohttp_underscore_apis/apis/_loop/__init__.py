@@ -0,0 +1,14 @@
+from functools import partial
+
+from aiohttp import web
+
+from aiohttp_underscore_apis.apis._loop.handlers import _blocking_events
+
+
+def setup_routes(app: web.Application) -> None:
+    routes = web.RouteTableDef()
+    routes_get = partial(routes.get, allow_head=False)
+
+    routes_get("/blocking_events")(_blocking_events)
+
+    app.add_routes(routes)
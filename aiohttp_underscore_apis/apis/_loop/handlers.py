@@ -0,0 +1,40 @@
+import json
+from dataclasses import asdict
+from typing import Any
+
+from aiohttp import web
+
+from aiohttp_underscore_apis.apis._routes.handlers import _response
+from aiohttp_underscore_apis.apis.common import Format, dissect_request
+from aiohttp_underscore_apis.context import Context
+from aiohttp_underscore_apis.monitor import LoopMonitor
+
+
+def monitor_of(context: Context) -> LoopMonitor:
+    if context.loop_monitor is None:
+        raise web.HTTPConflict(
+            text=json.dumps({"error": "Loop monitor is not enabled"}),
+            content_type="application/json",
+        )
+
+    return context.loop_monitor
+
+
+@dissect_request
+async def _blocking_events(
+    request: web.Request,
+    context: Context,
+    *,
+    format: Format = Format.JSON,
+    pretty: bool = False,
+    filter_path: list[str] = [],
+    **_: Any,
+) -> web.Response:
+
+    monitor = monitor_of(context)
+    events = {
+        "total": monitor.blocked,
+        "events": [asdict(event) for event in list(monitor.events)],
+    }
+
+    return _response(events, filter_path, format, pretty)
@@ -0,0 +1,49 @@
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from aiohttp_underscore_apis import AiohttpUnderscoreApis, LoopMonitor
+
+
+class LoopTest(IsolatedAsyncioTestCase):
+    async def client_of(self, apis: AiohttpUnderscoreApis) -> TestClient:
+        app = web.Application(middlewares=apis.middlewares)
+        for name, subapp in apis.init_subapps(app).items():
+            app.add_subapp(f"/{name}", subapp)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_blocking_events(self):
+        monitor = LoopMonitor(interval=0.01, threshold=0.05)
+        client = await self.client_of(
+            AiohttpUnderscoreApis(loop_monitor=monitor)
+        )
+
+        time.sleep(0.2)
+        response = await client.get("/_loop/blocking_events")
+        self.assertEqual(response.status, 200)
+        result = await response.json()
+        self.assertEqual(result["total"], 1)
+        self.assertEqual(len(result["events"]), 1)
+        self.assertIn("time.sleep", "".join(result["events"][0]["stack"]))
+
+        response = await client.get(
+            "/_cat/loop", params={"h": "lag.max,blocked.count"}
+        )
+        ((lag, count),) = [
+            line.split() for line in (await response.text()).splitlines()
+        ]
+        self.assertGreaterEqual(float(lag), 0.15)
+        self.assertEqual(count, "1")
+
+    async def test_not_monitored(self):
+        client = await self.client_of(AiohttpUnderscoreApis())
+
+        for path in ("/_loop/blocking_events", "/_cat/loop"):
+            response = await client.get(path)
+            self.assertEqual(response.status, 409)
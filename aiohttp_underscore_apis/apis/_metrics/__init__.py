@@ -0,0 +1,15 @@
+from functools import partial
+
+from aiohttp import web
+
+from aiohttp_underscore_apis.apis._metrics.handlers import metrics
+
+
+def setup_routes(app: web.Application) -> None:
+    routes = web.RouteTableDef()
+    routes_get = partial(routes.get, allow_head=False)
+
+    routes_get("")(metrics)
+    routes_get("/")(metrics)
+
+    app.add_routes(routes)
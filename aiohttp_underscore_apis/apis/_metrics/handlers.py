@@ -0,0 +1,137 @@
+from asyncio import sleep
+from collections.abc import Callable, Iterable, Iterator
+from itertools import accumulate, repeat
+
+from aiohttp import hdrs, web
+from aiohttp.web_urldispatcher import AbstractRoute
+
+from aiohttp_underscore_apis.context import Context
+from aiohttp_underscore_apis.registry import RouteRegistry
+from aiohttp_underscore_apis.stats import Histogram, Outcomes, RouteStats
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# The output is flushed to the client and the loop gets a chance to serve
+# other requests whenever this many bytes have been rendered.
+FLUSH_SIZE = 64 * 1024
+
+# Upper bounds of the buckets, the same as the defaults of Prometheus clients.
+# The log-bucketed bins are summed up to the one including the upper bound,
+# hence the buckets are accurate within Histogram.accuracy.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_BUCKET_ENDS = (*(Histogram.index(le) + 1 for le in BUCKETS), Histogram.size)
+_BUCKET_LABELS = (*(f'le="{le}"' for le in BUCKETS), 'le="+Inf"')
+
+_COUNTERS: tuple[tuple[str, str, Callable[[RouteStats], int]], ...] = (
+    ("requests", "Requests received", lambda s: s.counter.total),
+    ("rejected", "Requests rejected by limit", lambda s: s.counter.rejected),
+    ("throttled", "Requests throttled by rate", lambda s: s.counter.throttled),
+    ("shed", "Requests shed by overload", lambda s: s.counter.shed),
+    ("timeouts", "Requests timed out", lambda s: s.counter.timeouts),
+    (
+        "short_circuited",
+        "Requests failed fast by circuit breaker",
+        lambda s: s.counter.short_circuited,
+    ),
+    (
+        "http_exceptions",
+        "HTTPExceptions raised",
+        lambda s: s.counter.http_exceptions,
+    ),
+    ("received_bytes", "Bytes received", lambda s: s.throughput.total_in),
+    ("sent_bytes", "Bytes sent", lambda s: s.throughput.total_out),
+)
+_GAUGES: tuple[tuple[str, str, Callable[[RouteStats], int]], ...] = (
+    ("active", "Requests in progress", lambda s: s.counter.active),
+    ("queued", "Requests queued for admission", lambda s: s.counter.queued),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(route_id: int, route: AbstractRoute) -> str:
+    info = route.get_info()
+    path = info.get("path") or info.get("formatter", "<unknown>")
+    return (
+        f'route_id="{route_id}",'
+        f'method="{_escape(route.method)}",'
+        f'path="{_escape(path)}"'
+    )
+
+
+def iter_lines(registry: RouteRegistry) -> Iterator[str]:
+    """Yield the lines of the OpenMetrics text of the stats of the routes
+
+    The samples of each metric family are contiguous as required by the
+    format, hence the routes are iterated over once per family.
+    """
+
+    labels = [_labels(i, route) for i, route in enumerate(registry.routes)]
+    stats = registry.stats
+
+    for name, help, get in _COUNTERS:
+        yield f"# TYPE aiohttp_route_{name} counter\n"
+        yield f"# HELP aiohttp_route_{name} {help}\n"
+        for label, route_stats in zip(labels, stats):
+            yield f"aiohttp_route_{name}_total{{{label}}} {get(route_stats)}\n"
+
+    for name, help, get in _GAUGES:
+        yield f"# TYPE aiohttp_route_{name} gauge\n"
+        yield f"# HELP aiohttp_route_{name} {help}\n"
+        for label, route_stats in zip(labels, stats):
+            yield f"aiohttp_route_{name}{{{label}}} {get(route_stats)}\n"
+
+    yield "# TYPE aiohttp_route_outcomes counter\n"
+    yield "# HELP aiohttp_route_outcomes Outcomes of requests\n"
+    for label, route_stats in zip(labels, stats):
+        for outcome, total in zip(
+            Outcomes.labels, route_stats.outcomes.totals
+        ):
+            yield (
+                f'aiohttp_route_outcomes_total{{{label},outcome="{outcome}"}}'
+                f" {total}\n"
+            )
+
+    name = "aiohttp_route_request_duration_seconds"
+    yield f"# TYPE {name} histogram\n"
+    yield f"# HELP {name} Response time of requests\n"
+    for label, route_stats in zip(labels, stats):
+        histogram = route_stats.lifetime
+        counts: Iterable[int] = repeat(0)
+        if histogram.count:
+            counts = accumulate(
+                sum(histogram.bins[start:end])
+                for start, end in zip((0, *_BUCKET_ENDS), _BUCKET_ENDS)
+            )
+        for le, count in zip(_BUCKET_LABELS, counts):
+            yield f"{name}_bucket{{{label},{le}}} {count}\n"
+        yield f"{name}_count{{{label}}} {histogram.count}\n"
+        yield f"{name}_sum{{{label}}} {histogram.sum}\n"
+
+    yield "# EOF\n"
+
+
+async def metrics(request: web.Request) -> web.StreamResponse:
+    context = Context.get_from(request.app)
+
+    response = web.StreamResponse(headers={hdrs.CONTENT_TYPE: CONTENT_TYPE})
+    await response.prepare(request)
+
+    # A single buffer is reused for the whole output rather than building up
+    # a string as large as the output.
+    buffer = bytearray()
+    for line in iter_lines(context.registry):
+        buffer += line.encode()
+        if len(buffer) >= FLUSH_SIZE:
+            await response.write(bytes(buffer))
+            buffer.clear()
+            await sleep(0)
+
+    await response.write(bytes(buffer))
+    await response.write_eof()
+    return response
+
+
+__all__ = ["metrics"]
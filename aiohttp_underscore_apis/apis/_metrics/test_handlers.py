@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from aiohttp import web
+
+from aiohttp_underscore_apis.apis._metrics.handlers import iter_lines
+from aiohttp_underscore_apis.registry import RouteRegistry
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response()
+
+
+class IterLinesTest(TestCase):
+    def test_iter_lines(self):
+        app = web.Application()
+        app.router.add_get('/"foo"', handler, allow_head=False)
+        registry = RouteRegistry()
+        registry.register(app.router.routes())
+
+        registry.stats[0].counter.total = 3
+        for duration in (0.003, 0.2, 20.0):
+            registry.stats[0].record(duration)
+
+        lines = list(iter_lines(registry))
+        label = 'route_id="0",method="GET",path="/\\"foo\\""'
+
+        self.assertEqual(lines[-1], "# EOF\n")
+        self.assertIn(f"aiohttp_route_requests_total{{{label}}} 3\n", lines)
+        self.assertIn(f"aiohttp_route_active{{{label}}} 0\n", lines)
+        self.assertIn(
+            f'aiohttp_route_outcomes_total{{{label},outcome="5xx"}} 0\n',
+            lines,
+        )
+
+        name = "aiohttp_route_request_duration_seconds"
+        for le, count in (("0.005", 1), ("0.25", 2), ("10.0", 2), ("+Inf", 3)):
+            self.assertIn(
+                f'{name}_bucket{{{label},le="{le}"}} {count}\n', lines
+            )
+        self.assertIn(f"{name}_count{{{label}}} 3\n", lines)
@@ -4,8 +4,10 @@ from aiohttp import web
 
 from aiohttp_underscore_apis.apis._routes.handlers import (
     _routes,
+    _routes_cache_clear,
     _routes_interrupt,
     _routes_settings,
+    _routes_stats,
     _set_route_settings,
 )
 
@@ -19,10 +21,14 @@ def setup_routes(app: web.Application) -> None:
     routes_get("/{ids:[0-9]+(,[0-9]+)*}")(_routes)
 
     routes.post("/{ids:[0-9]+(,[0-9]+)*}/interrupt")(_routes_interrupt)
+    routes.post("/{ids:[0-9]+(,[0-9]+)*}/cache/clear")(_routes_cache_clear)
 
     routes_get("/settings")(_routes_settings)
     routes_get("/{ids:[0-9]+(,[0-9]+)*}/settings")(_routes_settings)
 
+    routes_get("/stats")(_routes_stats)
+    routes_get("/{ids:[0-9]+(,[0-9]+)*}/stats")(_routes_stats)
+
     routes.put("/{ids:[0-9]+(,[0-9]+)*}/settings")(_set_route_settings)
 
     app.add_routes(routes)
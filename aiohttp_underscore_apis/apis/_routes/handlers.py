@@ -1,4 +1,5 @@
 import json
+from enum import StrEnum
 from functools import partial
 from typing import Any, NotRequired, TypedDict
 
@@ -12,7 +13,22 @@ from aiohttp_underscore_apis.apis.filter_path import (
     filter_path as _filter_path,
 )
 from aiohttp_underscore_apis.context import Context
-from aiohttp_underscore_apis.settings import RouteSettingsSchema
+from aiohttp_underscore_apis.settings import (
+    RouteSettings,
+    RouteSettingsSchema,
+)
+from aiohttp_underscore_apis.shared import (
+    COUNTER_FIELDS,
+    SharedRouteStats,
+    host_totals,
+    read_workers,
+)
+from aiohttp_underscore_apis.stats import (
+    Histogram,
+    Outcomes,
+    RouteStats,
+    TimeRing,
+)
 
 
 def _response(
@@ -31,6 +47,92 @@ def _response(
     )
 
 
+def _check_ids(context: Context, ids: set[int]) -> None:
+    if unknown := sorted(i for i in ids if i not in context.registry):
+        raise web.HTTPNotFound(
+            text=json.dumps({"error": f"Unknown route IDs: {unknown}"}),
+            content_type="application/json",
+        )
+
+
+def _nan_to_none(value: float) -> float | None:
+    return None if value != value else value
+
+
+def _route_stats(stats: RouteStats) -> dict[str, Any]:
+    return {
+        "requests": {
+            "active": stats.counter.active,
+            "total": stats.counter.total,
+            "queued": stats.counter.queued,
+            "rejected": stats.counter.rejected,
+            "throttled": stats.counter.throttled,
+            "shed": stats.counter.shed,
+            "timeouts": stats.counter.timeouts,
+            "short_circuited": stats.counter.short_circuited,
+        },
+        "latency": {
+            f"{window // 60}m": _histogram(histogram, avg)
+            for window, histogram, avg in zip(
+                TimeRing.windows,
+                stats.latency.calculate(),
+                stats.time_avg.calculate(),
+            )
+        },
+        "outcomes": {
+            **dict(zip(Outcomes.labels, stats.outcomes.totals)),
+            "http_exceptions": stats.counter.http_exceptions,
+            "rates": {
+                f"{window // 60}m": dict(zip(Outcomes.labels, rates))
+                for window, rates in zip(
+                    TimeRing.windows, stats.outcomes.calculate()
+                )
+            },
+        },
+        "bytes": {
+            "in": stats.throughput.total_in,
+            "out": stats.throughput.total_out,
+            "rates": {
+                f"{window // 60}m": {"in": rate_in, "out": rate_out}
+                for window, (rate_in, rate_out) in zip(
+                    TimeRing.windows, stats.throughput.calculate()
+                )
+            },
+        },
+    }
+
+
+def _shared_route_stats(stats: SharedRouteStats) -> dict[str, Any]:
+    latency = stats.latency
+    return {
+        "requests": {
+            name: getattr(stats.counter, name) for name in COUNTER_FIELDS
+        },
+        "outcomes": dict(zip(Outcomes.labels, stats.outcomes)),
+        "bytes": {"in": stats.bytes_in, "out": stats.bytes_out},
+        "latency": {
+            "lifetime": _histogram(
+                latency,
+                latency.sum / latency.count if latency.count else float("nan"),
+            ),
+        },
+    }
+
+
+def _histogram(histogram: Histogram, avg: float) -> dict[str, Any]:
+    return {
+        "count": histogram.count,
+        "avg": _nan_to_none(avg),
+        "p50": _nan_to_none(histogram.quantile(0.5)),
+        "p90": _nan_to_none(histogram.quantile(0.9)),
+        "p99": _nan_to_none(histogram.quantile(0.99)),
+        "max": _nan_to_none(histogram.max),
+        "bins": {
+            index: count for index, count in enumerate(histogram.bins) if count
+        },
+    }
+
+
 @dissect_request
 async def _routes(
     request: web.Request,
@@ -43,9 +145,10 @@ async def _routes(
     **_: Any,
 ) -> web.Response:
 
+    _check_ids(context, ids)
+
     routes: dict[int, dict[str, Any]] = {}
-    for route in context.core_app.router.routes():
-        route_id = id(route)
+    for route_id, route in enumerate(context.registry.routes):
         if ids and route_id not in ids:
             continue
 
@@ -63,6 +166,65 @@ async def _routes(
     return _response(routes, filter_path, format, pretty)
 
 
+class Scope(StrEnum):
+    WORKER = "worker"
+    HOST = "host"
+
+
+def _host_stats(context: Context) -> dict[int, dict[str, Any]]:
+    """Return the totals of all workers with the breakdown by worker"""
+
+    registry = context.registry
+    workers = read_workers(context.shared_stats, registry)
+
+    stats: dict[int, dict[str, Any]] = {}
+    for route_id, total in enumerate(host_totals(workers, len(registry))):
+        stats[route_id] = _shared_route_stats(total)
+        stats[route_id]["workers"] = {
+            worker.pid: _shared_route_stats(worker.routes[route_id])
+            for worker in workers
+            if route_id < len(worker.routes)
+            and worker.routes[route_id] is not None
+        }
+
+    return stats
+
+
+@dissect_request
+@use_kwargs(
+    {"scope": fields.Enum(Scope, by_value=True)}, location="querystring"
+)
+async def _routes_stats(
+    request: web.Request,
+    context: Context,
+    *,
+    ids: set[int] = set(),
+    format: Format = Format.JSON,
+    pretty: bool = False,
+    filter_path: list[str] = [],
+    scope: Scope = Scope.WORKER,
+    **_: Any,
+) -> web.Response:
+
+    _check_ids(context, ids)
+
+    def build() -> dict[int, dict[str, Any]]:
+        return dict(enumerate(map(_route_stats, context.registry.stats)))
+
+    if scope == Scope.HOST:
+        stats = _host_stats(context)
+    else:
+        stats = context.stats_snapshot.get(build)
+    if ids:
+        stats = {
+            route_id: route_stats
+            for route_id, route_stats in stats.items()
+            if route_id in ids
+        }
+
+    return _response(stats, filter_path, format, pretty)
+
+
 @dissect_request
 async def _routes_interrupt(
     request: web.Request,
@@ -72,9 +234,68 @@ async def _routes_interrupt(
     **_: Any,
 ) -> web.Response:
 
+    _check_ids(context, ids)
+
+    for task in context.registry.tasks_of(ids):
+        task.cancel()
+
+    return web.Response(status=204)
+
+
+def _settings_state(
+    settings: RouteSettings, stats: RouteStats
+) -> dict[str, Any]:
+    """Return the runtime state of the settings in effect"""
+
+    state: dict[str, Any] = {}
+
+    if settings.rate_limit is not None:
+        state["rate_limit"] = {
+            "tokens": settings.rate_limit.tokens,
+            "throttled": stats.counter.throttled,
+        }
+
+    if settings.shedding is not None:
+        state["adaptive_shedding"] = {
+            "drop_rate": settings.shedding.drop_rate,
+            "shed": stats.counter.shed,
+        }
+
+    if settings.circuit_breaker is not None:
+        state["circuit_breaker"] = {
+            "state": settings.circuit_breaker.state.value,
+            "error_rate": settings.circuit_breaker.current_error_rate,
+            "trips": settings.circuit_breaker.trips,
+            "short_circuited": stats.counter.short_circuited,
+        }
+
+    if settings.coalesce is not None:
+        state["coalesce"] = {"followers": settings.coalesce.followers}
+
+    if settings.cache is not None:
+        state["cache"] = {
+            "entries": len(settings.cache),
+            "hits": settings.cache.hits,
+            "misses": settings.cache.misses,
+            "evictions": settings.cache.evictions,
+        }
+
+    return state
+
+
+@dissect_request
+async def _routes_cache_clear(
+    request: web.Request,
+    context: Context,
+    *,
+    ids: set[int] = set(),
+    **_: Any,
+) -> web.Response:
+
+    _check_ids(context, ids)
+
     for route_id in ids:
-        for task in context.task_refs[route_id]:
-            task.cancel()
+        context.registry.settings[route_id].response_cache.clear()
 
     return web.Response(status=204)
 
@@ -100,20 +321,28 @@ async def _routes_settings(
     class RouteSettings(TypedDict):
         transient: dict[str, Any]
         defaults: NotRequired[dict[str, Any]]
+        state: NotRequired[dict[str, Any]]
+        version: NotRequired[int]
 
+    _check_ids(context, ids)
+
+    registry = context.registry
     settings: dict[int, RouteSettings] = {}
-    for route in context.core_app.router.routes():
-        route_id = id(route)
+    for route_id, route_settings in enumerate(registry.settings):
         if ids and route_id not in ids:
             continue
 
-        route_settings = context.route_settings[route_id]
-
         settings[route_id] = {"transient": route_settings.transient}
 
+        if state := _settings_state(route_settings, registry.stats[route_id]):
+            settings[route_id]["state"] = state
+
         if include_defaults:
             settings[route_id]["defaults"] = route_settings.defaults
 
+        if context.shared_settings is not None:
+            settings[route_id]["version"] = context.shared_settings.version
+
     return _response(settings, filter_path, format, pretty)
 
 
@@ -128,18 +357,12 @@ async def _set_route_settings(
     **_: Any,
 ) -> web.Response:
 
-    for route_id in ids:
-        settings = context.route_settings[route_id]
-
-        if transient and transient.get("preempt"):
-            for key in ("status", "reason", "text"):
-                value = transient["preempt"].get(key)
-                if value is None:
-                    settings.transient.setdefault("preempt", {}).pop(key, None)
-                else:
-                    settings.transient.setdefault("preempt", {})[key] = value
-
-        if not settings.transient.get("preempt"):
-            settings.transient.pop("preempt", None)
+    _check_ids(context, ids)
+
+    if context.shared_settings is not None:
+        context.shared_settings.update(ids, transient or {})
+    else:
+        for route_id in ids:
+            context.registry.settings[route_id].update(transient or {})
 
     return await _routes_settings(request)
@@ -0,0 +1,25 @@
+from functools import partial
+
+from aiohttp import web
+
+from aiohttp_underscore_apis.apis._tasks.handlers import (
+    _tasks,
+    _tasks_cancel,
+    _tasks_print_stack,
+)
+
+
+def setup_routes(app: web.Application) -> None:
+    routes = web.RouteTableDef()
+    routes_get = partial(routes.get, allow_head=False)
+
+    routes_get("")(_tasks)
+    routes_get("/")(_tasks)
+    routes_get("/{ids:[0-9]+(,[0-9]+)*}")(_tasks)
+
+    routes.post("/_cancel")(_tasks_cancel)
+    routes.post("/{ids:[0-9]+(,[0-9]+)*}/_cancel")(_tasks_cancel)
+
+    routes_get("/{ids:[0-9]+(,[0-9]+)*}/print_stack")(_tasks_print_stack)
+
+    app.add_routes(routes)
@@ -0,0 +1,275 @@
+import json
+from asyncio import Task, all_tasks, current_task
+from collections.abc import Iterable, Iterator, Set
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from heapq import nsmallest
+from io import StringIO
+from time import perf_counter
+from traceback import StackSummary, print_list
+from types import FrameType
+from typing import Any, TextIO
+
+from aiohttp import web
+from marshmallow.validate import Range
+from webargs import fields
+from webargs.aiohttpparser import use_kwargs
+
+from aiohttp_underscore_apis.apis._routes.handlers import _check_ids, _response
+from aiohttp_underscore_apis.apis.common import Format, Ids, dissect_request
+from aiohttp_underscore_apis.context import Context
+from aiohttp_underscore_apis.registry import RouteRegistry
+
+DEFAULT_SIZE = 1000
+MAX_SIZE = 10000
+
+
+class Cancelling(fields.Boolean):
+    truthy = {"", *fields.Boolean.truthy}
+
+
+_FILTERS = {
+    "route_id": Ids(),
+    "name": fields.Str(),
+    "coro": fields.Str(),
+    "min_age": fields.Float(validate=Range(min=0)),
+    "cancelling": Cancelling(),
+}
+
+
+@dataclass(frozen=True)
+class TaskFilter:
+    """Criteria all of which the selected tasks meet
+
+    The names and the qualified names of the coroutines are matched against
+    glob patterns. Only the tasks serving requests have ages, hence the
+    others never meet the minimum age.
+    """
+
+    route_ids: Set[int] = frozenset()
+    name: str | None = None
+    coro: str | None = None
+    min_age: float | None = None
+    cancelling: bool | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.route_ids) or any(
+            value is not None
+            for value in (self.name, self.coro, self.min_age, self.cancelling)
+        )
+
+    def select(
+        self, registry: RouteRegistry, tasks: Iterable[Task]
+    ) -> Iterator[Task]:
+        now = perf_counter()
+        for task in tasks:
+            tracked = registry.tasks.get(task)
+            if self.route_ids and (
+                tracked is None or tracked[0] not in self.route_ids
+            ):
+                continue
+
+            if self.name is not None and not fnmatchcase(
+                task.get_name(), self.name
+            ):
+                continue
+
+            if self.coro is not None and not fnmatchcase(
+                _qualname(task) or "", self.coro
+            ):
+                continue
+
+            if self.min_age is not None:
+                if tracked is None or now - tracked[1] < self.min_age:
+                    continue
+
+            if (
+                self.cancelling is not None
+                and bool(task.cancelling()) != self.cancelling
+            ):
+                continue
+
+            yield task
+
+
+def _qualname(task: Task) -> str | None:
+    coro = task.get_coro()
+    return coro and getattr(coro, "__qualname__", type(coro).__qualname__)
+
+
+def _lookup(context: Context, ids: Set[int]) -> list[Task]:
+    """Return the tasks of the IDs, which are looked for among all tasks"""
+
+    found = {id(task): task for task in all_tasks() if id(task) in ids}
+    if unknown := sorted(ids - found.keys()):
+        raise web.HTTPNotFound(
+            text=json.dumps({"error": f"Unknown task IDs: {unknown}"}),
+            content_type="application/json",
+        )
+
+    return list(found.values())
+
+
+def _print_stack(task: Task, file: TextIO) -> None:
+    """Print the frames of the coroutines awaited by one another
+
+    Unlike Task.print_stack(), which stops at the coroutine of the task while
+    it is suspended, the frames are followed down to where it is suspended.
+    """
+
+    frames: list[tuple[FrameType, int]] = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(
+            awaitable, "gi_frame", None
+        )
+        if frame is None:
+            break
+        frames.append((frame, frame.f_lineno))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(
+            awaitable, "gi_yieldfrom", None
+        )
+
+    print(f"Stack for {task!r} (most recent call last):", file=file)
+    print_list(StackSummary.extract(frames), file=file)
+
+
+def _candidates(
+    context: Context, ids: Set[int], route_ids: Set[int]
+) -> Iterable[Task]:
+    if ids:
+        return _lookup(context, ids)
+
+    if route_ids:
+        # Taken from the tracked tasks rather than filtered out of all tasks
+        return context.registry.tasks_of(route_ids)
+
+    return all_tasks()
+
+
+def _task(registry: RouteRegistry, task: Task, now: float) -> dict[str, Any]:
+    slot, started = registry.tasks.get(task, (None, None))
+    return {
+        "id": id(task),
+        "name": task.get_name(),
+        "coro": _qualname(task),
+        "done": task.done(),
+        "cancelled": task.cancelled(),
+        "cancelling": task.cancelling(),
+        "route_id": slot,
+        "age": None if started is None else now - started,
+    }
+
+
+@dissect_request
+@use_kwargs(
+    {
+        **_FILTERS,
+        "size": fields.Int(validate=Range(min=1, max=MAX_SIZE)),
+        "after": fields.Int(),
+    },
+    location="querystring",
+)
+async def _tasks(
+    request: web.Request,
+    context: Context,
+    *,
+    ids: set[int] = set(),
+    format: Format = Format.JSON,
+    pretty: bool = False,
+    filter_path: list[str] = [],
+    route_id: set[int] = set(),
+    name: str | None = None,
+    coro: str | None = None,
+    min_age: float | None = None,
+    cancelling: bool | None = None,
+    size: int = DEFAULT_SIZE,
+    after: int | None = None,
+    **_: Any,
+) -> web.Response:
+    """List the tasks in the order of their IDs a page at a time
+
+    Only the page is kept in memory while the tasks are selected, and the
+    ID of its last task is the cursor to pass as `after` for the next page.
+    """
+
+    _check_ids(context, route_id)
+
+    registry = context.registry
+    selected = TaskFilter(route_id, name, coro, min_age, cancelling).select(
+        registry, _candidates(context, ids, route_id)
+    )
+    if after is not None:
+        selected = (task for task in selected if id(task) > after)
+
+    page = nsmallest(size, selected, key=id)
+
+    now = perf_counter()
+    return _response(
+        {
+            "tasks": [_task(registry, task, now) for task in page],
+            "next": id(page[-1]) if len(page) == size else None,
+        },
+        filter_path,
+        format,
+        pretty,
+    )
+
+
+@dissect_request
+@use_kwargs(_FILTERS, location="querystring")
+async def _tasks_cancel(
+    request: web.Request,
+    context: Context,
+    *,
+    ids: set[int] = set(),
+    format: Format = Format.JSON,
+    pretty: bool = False,
+    filter_path: list[str] = [],
+    route_id: set[int] = set(),
+    name: str | None = None,
+    coro: str | None = None,
+    min_age: float | None = None,
+    cancelling: bool | None = None,
+    **_: Any,
+) -> web.Response:
+
+    _check_ids(context, route_id)
+
+    task_filter = TaskFilter(route_id, name, coro, min_age, cancelling)
+    if not ids and not task_filter:
+        raise web.HTTPBadRequest(
+            text=json.dumps({"error": "Either task IDs or filters required"}),
+            content_type="application/json",
+        )
+
+    this = current_task()
+    cancelled = 0
+    for task in task_filter.select(
+        context.registry, _candidates(context, ids, route_id)
+    ):
+        if task is not this and task.cancel():
+            cancelled += 1
+
+    return _response({"cancelled": cancelled}, filter_path, format, pretty)
+
+
+@dissect_request
+async def _tasks_print_stack(
+    request: web.Request,
+    context: Context,
+    *,
+    ids: set[int] = set(),
+    **_: Any,
+) -> web.Response:
+
+    buffer = StringIO()
+    for task in _lookup(context, ids):
+        # Followed by the tasks awaited by it, e.g. the one aiohttp spawns to
+        # handle each request of the connection.
+        awaited: Any = task
+        while isinstance(awaited, Task):
+            _print_stack(awaited, buffer)
+            awaited = getattr(awaited, "_fut_waiter", None)
+
+    return web.Response(text=buffer.getvalue())
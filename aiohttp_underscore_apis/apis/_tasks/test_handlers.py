@@ -0,0 +1,89 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from aiohttp_underscore_apis import AiohttpUnderscoreApis
+
+
+class TasksTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.started = asyncio.Event()
+
+        async def slow(request: web.Request) -> web.Response:
+            self.started.set()
+            await asyncio.sleep(10)
+            return web.Response()
+
+        apis = AiohttpUnderscoreApis()
+        app = web.Application(middlewares=apis.middlewares)
+        app.router.add_get("/slow", slow, allow_head=False)
+        for name, subapp in apis.init_subapps(app).items():
+            app.add_subapp(f"/{name}", subapp)
+
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+        self.requests = []
+        for _ in range(3):
+            self.started.clear()
+            self.requests.append(asyncio.create_task(self.client.get("/slow")))
+            await self.started.wait()
+
+    async def asyncTearDown(self):
+        for request in self.requests:
+            request.cancel()
+        await asyncio.gather(*self.requests, return_exceptions=True)
+
+    async def get(self, path: str, **params) -> dict:
+        response = await self.client.get(path, params=params)
+        self.assertEqual(response.status, 200)
+        return await response.json()
+
+    async def test_filter_and_paginate(self):
+        result = await self.get("/_tasks", route_id="0", coro="*.start")
+        self.assertEqual(len(result["tasks"]), 3)
+        self.assertEqual({task["route_id"] for task in result["tasks"]}, {0})
+        self.assertIsNone(result["next"])
+
+        result = await self.get("/_tasks", min_age="60")
+        self.assertEqual(result["tasks"], [])
+
+        ids = []
+        after = None
+        while True:
+            params = (
+                {"size": "2"} if after is None else {"size": 2, "after": after}
+            )
+            result = await self.get("/_tasks", route_id="0", **params)
+            ids.extend(task["id"] for task in result["tasks"])
+            if (after := result["next"]) is None:
+                break
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids, sorted(ids))
+
+        response = await self.client.get("/_tasks", params={"route_id": "99"})
+        self.assertEqual(response.status, 404)
+
+    async def test_cancel(self):
+        response = await self.client.post("/_tasks/_cancel")
+        self.assertEqual(response.status, 400)
+
+        (task, *_) = (await self.get("/_tasks", route_id="0"))["tasks"]
+        response = await self.client.post(f"/_tasks/{task['id']}/_cancel")
+        self.assertEqual(await response.json(), {"cancelled": 1})
+
+        response = await self.client.post(
+            "/_tasks/_cancel", params={"route_id": "0", "min_age": "0"}
+        )
+        self.assertEqual(await response.json(), {"cancelled": 2})
+
+    async def test_print_stack(self):
+        (task, *_) = (await self.get("/_tasks", route_id="0"))["tasks"]
+        response = await self.client.get(f"/_tasks/{task['id']}/print_stack")
+        self.assertIn("slow", await response.text())
+
+        response = await self.client.get("/_tasks/1/print_stack")
+        self.assertEqual(response.status, 404)
@@ -48,7 +48,7 @@ def _(dct: dict, *matchers: Callable, path: str = "") -> dict:
     for key in dct:
         with suppress(_UnnecessaryPath):
             filtered[key] = _filter_path(
-                dct[key], *matchers, path=f"{path}.{key}" if path else key
+                dct[key], *matchers, path=f"{path}.{key}" if path else str(key)
             )
 
     if not filtered and not _is_necessary_path(*matchers, path=path):
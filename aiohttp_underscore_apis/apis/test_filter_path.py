@@ -229,3 +229,10 @@ class FilterPathTest(TestCase):
                 "cofaxTools": "/tools/*",
             },
         )
+
+    def test_filter_path_with_int_keys(self):
+        source = {0: {"path": "/foo"}, 1: {"path": "/bar"}}
+
+        self.assertDictEqual(filter_path(source, "1"), {1: {"path": "/bar"}})
+        self.assertDictEqual(filter_path(source, "2"), {})
+        self.assertDictEqual(filter_path(source, "-0"), {1: {"path": "/bar"}})
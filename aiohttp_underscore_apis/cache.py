@@ -0,0 +1,280 @@
+from asyncio import CancelledError, Future, get_running_loop, shield
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from copy import copy
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any
+
+from aiohttp import hdrs, web
+from multidict import CIMultiDict, CIMultiDictProxy
+
+_UNCACHEABLE_HEADERS = frozenset(
+    (hdrs.CONTENT_LENGTH, hdrs.TRANSFER_ENCODING, hdrs.SET_COOKIE)
+)
+# Headers identifying the user, whose responses mustn't be shared
+_CREDENTIAL_HEADERS = (hdrs.AUTHORIZATION, hdrs.COOKIE)
+
+
+@dataclass(frozen=True)
+class CapturedResponse:
+    """Copy of a response that can be replayed to any number of requests"""
+
+    status: int
+    reason: str
+    headers: CIMultiDictProxy[str]
+    body: bytes
+
+    @classmethod
+    def capture(
+        cls, response: web.StreamResponse
+    ) -> "CapturedResponse | None":
+        """Capture the response, or return None if it can't be replayed
+
+        Only unprepared web.Response with a body of bytes can be captured,
+        since a StreamResponse has already been written by the handler.
+        """
+
+        if not isinstance(response, web.Response) or response.prepared:
+            return None
+
+        body = response.body
+        if not isinstance(body, bytes):
+            return None
+
+        return cls(
+            status=response.status,
+            reason=response.reason,
+            headers=CIMultiDictProxy(
+                CIMultiDict(
+                    (key, value)
+                    for key, value in response.headers.items()
+                    if key not in _UNCACHEABLE_HEADERS
+                )
+            ),
+            body=body,
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(
+            len(key) + len(value) for key, value in self.headers.items()
+        )
+
+    def response(self) -> web.Response:
+        return web.Response(
+            status=self.status,
+            reason=self.reason,
+            headers=self.headers,
+            body=self.body,
+        )
+
+
+class CacheBudget:
+    """Byte cap shared by the response caches of all routes
+
+    It keeps all the entries of all the caches in LRU order, so that the
+    least recently used entry of any route is evicted first on overflow.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._lru: OrderedDict[tuple[ResponseCache, Hashable], int] = (
+            OrderedDict()
+        )
+
+    def _touch(self, cache: "ResponseCache", key: Hashable) -> None:
+        self._lru.move_to_end((cache, key))
+
+    def _add(self, cache: "ResponseCache", key: Hashable, size: int) -> None:
+        self._lru[(cache, key)] = size
+        self.used_bytes += size
+
+        while self.used_bytes > self.max_bytes:
+            (victim, victim_key), victim_size = self._lru.popitem(last=False)
+            self.used_bytes -= victim_size
+            victim._evict(victim_key)
+
+    def _remove(self, cache: "ResponseCache", key: Hashable) -> None:
+        self.used_bytes -= self._lru.pop((cache, key))
+
+
+@dataclass(eq=False)
+class _Entry:
+    expires_at: float
+    response: CapturedResponse
+
+
+class ResponseCache:
+    """LRU cache of the responses of a route for `ttl` seconds"""
+
+    def __init__(self, budget: CacheBudget) -> None:
+        self.budget = budget
+        self.ttl = 0.0
+        self.max_entries = 0
+        self.vary: tuple[str, ...] = ()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(
+        self, ttl: float, max_entries: int, vary: Sequence[str]
+    ) -> None:
+        if tuple(vary) != self.vary:
+            self.clear()
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.vary = tuple(vary)
+
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def key(self, request: web.Request) -> Hashable:
+        """Return the key of the request, varying on its credentials
+
+        The Authorization and Cookie headers are always part of the key, so
+        that a response is never replayed to another user.
+        """
+
+        return (
+            request.path_qs,
+            *map(request.headers.get, (*_CREDENTIAL_HEADERS, *self.vary)),
+        )
+
+    def get(self, key: Hashable) -> web.Response | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= monotonic():
+            self._discard(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.budget._touch(self, key)
+        self.hits += 1
+        return entry.response.response()
+
+    def put(self, key: Hashable, response: CapturedResponse) -> None:
+        size = response.size
+        if size > self.budget.max_bytes or not self.max_entries:
+            return
+
+        if key in self._entries:
+            self._discard(key)
+
+        self._entries[key] = _Entry(monotonic() + self.ttl, response)
+        self.budget._add(self, key, size)
+
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._discard(key)
+
+    def _discard(self, key: Hashable) -> None:
+        del self._entries[key]
+        self.budget._remove(self, key)
+
+    def _evict(self, key: Hashable) -> None:
+        """Remove the entry already removed from the budget on its overflow"""
+
+        del self._entries[key]
+        self.evictions += 1
+
+
+# Outcomes of a flight that the followers can't replay
+_CANCELLED = object()
+_UNCAPTURABLE = object()
+
+
+class SingleFlight:
+    """Share a single execution among identical concurrent requests
+
+    The first request of a key becomes the leader and executes the call in
+    its own request task, so that it stays subject to the task tracking. The
+    followers arriving meanwhile await the outcome and replay a copy of the
+    response, or re-raise a copy of the exception. If the leader gets
+    cancelled, one of the followers takes over as a new leader.
+
+    Only requests of the same key share a flight, so the key must tell apart
+    everything the response depends on; see key().
+    """
+
+    def __init__(self) -> None:
+        self.followers = 0
+        self._flights: dict[Hashable, Future[Any]] = {}
+
+    @staticmethod
+    def key(request: web.Request, vary: Sequence[str] = ()) -> Hashable:
+        """Return the key of the request, varying on its credentials
+
+        The Authorization and Cookie headers are always part of the key, so
+        that a follower never receives the response of another user. The
+        `vary` headers are the ones the response cache of the route varies on.
+        """
+
+        return (
+            request.method,
+            request.path_qs,
+            *map(request.headers.get, (*_CREDENTIAL_HEADERS, *vary)),
+        )
+
+    async def run(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        while (flight := self._flights.get(key)) is not None:
+            self.followers += 1
+            outcome = await shield(flight)
+
+            if isinstance(outcome, CapturedResponse):
+                return outcome.response()
+            elif isinstance(outcome, BaseException):
+                raise _copy_exception(outcome) from outcome
+            elif outcome is _UNCAPTURABLE:
+                return await call()
+
+        flight = self._flights[key] = get_running_loop().create_future()
+        try:
+            response = await call()
+        except web.HTTPException as e:
+            flight.set_result(CapturedResponse.capture(e) or _UNCAPTURABLE)
+            raise
+        except CancelledError:
+            flight.set_result(_CANCELLED)
+            raise
+        except BaseException as e:
+            flight.set_result(e)
+            raise
+        else:
+            captured = CapturedResponse.capture(response)
+            flight.set_result(captured or _UNCAPTURABLE)
+            return response
+        finally:
+            del self._flights[key]
+
+
+def _copy_exception(e: BaseException) -> BaseException:
+    """Copy the exception of the leader to be raised by a follower
+
+    Raising the same instance from several tasks would make them all mutate
+    its __traceback__, hence a copy without the traceback is raised instead.
+    """
+
+    try:
+        return copy(e)
+    except Exception:  # The exception can't be rebuilt from its args
+        return RuntimeError(f"Coalesced request failed: {e!r}")
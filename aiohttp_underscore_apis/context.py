@@ -1,15 +1,14 @@
-from asyncio import Task
-from collections import defaultdict
 from collections.abc import Awaitable
 from dataclasses import dataclass, field
-from functools import partial, wraps
-from typing import Callable, Concatenate, DefaultDict, ParamSpec
-from weakref import WeakSet
+from functools import wraps
+from typing import Callable, Concatenate, ParamSpec
 
 from aiohttp import web
 
-from aiohttp_underscore_apis.settings import RouteSettings
-from aiohttp_underscore_apis.stats import RouteStats
+from aiohttp_underscore_apis.monitor import LoopMonitor
+from aiohttp_underscore_apis.registry import RouteRegistry
+from aiohttp_underscore_apis.shared import SharedSettings, SharedStats
+from aiohttp_underscore_apis.stats import StatsSnapshot
 
 APP_CONTEXT_KEY = "_aiohttp_underscore_apis_context_"
 P = ParamSpec("P")
@@ -18,15 +17,11 @@ P = ParamSpec("P")
 @dataclass(frozen=True)
 class Context:
     core_app: web.Application
-    route_stats: DefaultDict[int, RouteStats] = field(
-        default_factory=partial(defaultdict, RouteStats)
-    )
-    route_settings: DefaultDict[int, RouteSettings] = field(
-        default_factory=partial(defaultdict, RouteSettings)
-    )
-    task_refs: DefaultDict[int, WeakSet[Task]] = field(
-        default_factory=partial(defaultdict, WeakSet)
-    )
+    registry: RouteRegistry = field(default_factory=RouteRegistry)
+    stats_snapshot: StatsSnapshot = field(default_factory=StatsSnapshot)
+    shared_stats: SharedStats | None = None
+    shared_settings: SharedSettings | None = None
+    loop_monitor: LoopMonitor | None = None
 
     def set_to(self, app: web.Application) -> None:
         app[APP_CONTEXT_KEY] = self
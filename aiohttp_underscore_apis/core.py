@@ -1,33 +1,100 @@
 import asyncio
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 from typing import ClassVar
 
 from aiohttp import web
 from aiohttp.typedefs import Middleware
 
-from aiohttp_underscore_apis.apis import _cat, _routes
+from aiohttp_underscore_apis.apis import (
+    _cat,
+    _loop,
+    _metrics,
+    _routes,
+    _tasks,
+)
+from aiohttp_underscore_apis.cache import CacheBudget
 from aiohttp_underscore_apis.context import Context
+from aiohttp_underscore_apis.gateway import Gateway
 from aiohttp_underscore_apis.middlewares import (
+    fused_middleware,
     request_inspector,
     request_interceptor,
     task_tracker,
 )
+from aiohttp_underscore_apis.monitor import LoopMonitor
+from aiohttp_underscore_apis.profiling import TimingTaskFactory
+from aiohttp_underscore_apis.registry import RouteRegistry
+from aiohttp_underscore_apis.settings import DEFAULT_CACHE_MAX_BYTES
+from aiohttp_underscore_apis.shared import SharedSettings, SharedStats
+from aiohttp_underscore_apis.stats import StatsSnapshot
 from aiohttp_underscore_apis.types import SiteFactory
 
 
 @dataclass(frozen=True)
 class AiohttpUnderscoreApis:
-    _apis: ClassVar[list] = [_cat, _routes]
+    _apis: ClassVar[list] = [_cat, _routes, _tasks, _loop, _metrics]
 
     site_factories: list[SiteFactory] = field(default_factory=list)
+    stats_snapshot_interval: float = 1.0
+    fuse_middlewares: bool = False
+    sample_every: int = 1
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    shared_stats: SharedStats | None = None
+    shared_settings: SharedSettings | None = None
+    instrument_tasks: bool = False
+    loop_monitor: LoopMonitor | None = None
+
+    @property
+    def _shared(self) -> list[SharedStats | SharedSettings]:
+        return [
+            shared
+            for shared in (self.shared_stats, self.shared_settings)
+            if shared is not None
+        ]
+
+    @property
+    def _services(self) -> list[SharedStats | SharedSettings | LoopMonitor]:
+        """Return what runs on the loop while the core app is running"""
+
+        if self.loop_monitor is None:
+            return [*self._shared]
+        return [*self._shared, self.loop_monitor]
 
     def init_subapps(
         self, core_app: web.Application
     ) -> dict[str, web.Application]:
 
-        ctx = Context(core_app=core_app)
+        ctx = Context(
+            core_app=core_app,
+            registry=RouteRegistry(
+                defaults={"sampling": {"every": self.sample_every}},
+                cache_budget=CacheBudget(self.cache_max_bytes),
+            ),
+            stats_snapshot=StatsSnapshot(self.stats_snapshot_interval),
+            shared_stats=self.shared_stats,
+            shared_settings=self.shared_settings,
+            loop_monitor=self.loop_monitor,
+        )
         ctx.set_to(core_app)
 
+        for shared in self._shared:
+            shared.bind(ctx.registry)
+
+        # The routes are registered once the core app gets started, so that the
+        # routes added after this point, e.g. of the subapps, are included.
+        # The startup may be already in progress, e.g. if called from the
+        # cleanup context, and then the routes are complete by now.
+        if core_app.frozen or core_app.on_startup.frozen:
+            ctx.registry.register(core_app.router.routes())
+            for service in self._services:
+                service.start()
+        else:
+            core_app.on_startup.append(ctx.registry.on_startup)
+            for service in self._services:
+                core_app.on_startup.append(service.on_startup)
+                core_app.on_cleanup.append(service.on_cleanup)
+
         subapps: dict[str, web.Application] = {}
         for mod in type(self)._apis:
             *_, name = mod.__name__.rsplit(".", 1)
@@ -40,6 +107,12 @@ class AiohttpUnderscoreApis:
         return subapps
 
     async def listener(self, main_app: web.Application):
+        # Installed first so that the tasks started hereafter are timed
+        loop = asyncio.get_running_loop()
+        factory = None
+        if self.instrument_tasks:
+            factory = TimingTaskFactory.install(loop)
+
         app = web.Application()
         for name, subapp in self.init_subapps(main_app).items():
             app.add_subapp(f"/{name}", subapp)
@@ -52,8 +125,30 @@ class AiohttpUnderscoreApis:
         yield
         await asyncio.gather(*[site.stop() for site in sites])
 
+        for service in self._services:
+            service.close()
+
+        if factory is not None:
+            factory.uninstall(loop)
+
+    @staticmethod
+    def gateway(
+        sockets: Sequence[str], timeout: float = 1.0
+    ) -> web.Application:
+        """Return an app serving the merged underscore APIs of the workers
+
+        Each of the sockets is a UNIX domain socket on which a worker
+        publishes the underscore APIs, and a worker not responding within the
+        timeout is left out of the merged result.
+        """
+
+        return Gateway(sockets, timeout).app()
+
     @property
     def middlewares(self) -> tuple[Middleware, ...]:
+        if self.fuse_middlewares:
+            return (fused_middleware,)
+
         return (
             task_tracker,
             request_inspector,
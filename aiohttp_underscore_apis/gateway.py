@@ -0,0 +1,257 @@
+import asyncio
+import json
+from collections.abc import Iterable, Sequence
+from enum import StrEnum
+from fnmatch import fnmatch
+from functools import partial
+from itertools import chain
+from typing import Any
+
+from aiohttp import ClientSession, ClientTimeout, UnixConnector, hdrs, web
+from webargs import fields
+from webargs.aiohttpparser import use_kwargs
+
+from aiohttp_underscore_apis.apis._cat.base import CatBase
+from aiohttp_underscore_apis.apis._cat.handlers import (
+    HOT_TASKS_INTERVAL,
+    CatHostRoutes,
+    CatHotTasks,
+    CatLoop,
+    CatRoutes,
+    CatTasks,
+)
+from aiohttp_underscore_apis.apis._cat.options import (
+    Header,
+    Help,
+    Order,
+    Sort,
+    TimeValue,
+    Verbose,
+)
+from aiohttp_underscore_apis.apis._routes.handlers import _response
+from aiohttp_underscore_apis.apis.common import Format, Pretty
+
+WORKER = "worker"
+SOCKET = "socket"
+FAILED_WORKERS_HEADER = "X-Failed-Workers"
+
+_CATS: dict[str, type[CatBase]] = {
+    "routes": CatRoutes,
+    "host/routes": CatHostRoutes,
+    "tasks": CatTasks,
+    "hot_tasks": CatHotTasks,
+    "loop": CatLoop,
+}
+
+
+class Gateway:
+    """Fan the underscore APIs out to the workers and merge the results
+
+    Every worker is expected to publish the underscore APIs on its own UNIX
+    domain socket, to which the gateway keeps a pool of keep-alive
+    connections. A worker failing to respond within the timeout is left out
+    of the merged result and reported in the X-Failed-Workers header.
+
+    The rows of the CAT APIs are concatenated with the worker column, then
+    sorted and projected as requested. The other APIs are merged into an
+    object keyed by worker, and the requests changing anything, e.g. settings
+    PUTs, are broadcast to all workers.
+    """
+
+    def __init__(self, sockets: Sequence[str], timeout: float = 1.0) -> None:
+        self.sockets = tuple(sockets)
+        self.timeout = timeout
+        self._sessions: dict[str, ClientSession] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.cleanup_ctx.append(self._connect)
+
+        routes = web.RouteTableDef()
+        routes_get = partial(routes.get, allow_head=False)
+
+        for name, cls in _CATS.items():
+            handler = self._cat_handler(cls)
+            routes_get(f"/_cat/{name}")(handler)
+            routes_get(f"/_cat/{name}/")(handler)
+            routes_get(f"/_cat/{name}/{{ids:[0-9]+(,[0-9]+)*}}")(handler)
+
+        routes.route("*", "/_routes{tail:(/.*)?}")(self._merge_handler())
+
+        app.add_routes(routes)
+        return app
+
+    async def _connect(self, app: web.Application):
+        timeout = ClientTimeout(total=self.timeout)
+        for socket in self.sockets:
+            self._sessions[socket] = ClientSession(
+                connector=UnixConnector(path=socket), timeout=timeout
+            )
+
+        yield
+
+        await asyncio.gather(*(s.close() for s in self._sessions.values()))
+        self._sessions.clear()
+
+    async def _call(
+        self,
+        socket: str,
+        request: web.Request,
+        path_qs: str,
+        body: bytes,
+        timeout: ClientTimeout,
+    ) -> tuple[int, Any]:
+        headers = {}
+        if content_type := request.headers.get(hdrs.CONTENT_TYPE):
+            headers[hdrs.CONTENT_TYPE] = content_type
+
+        async with self._sessions[socket].request(
+            request.method,
+            f"http://localhost{path_qs}",
+            data=body or None,
+            headers=headers,
+            timeout=timeout,
+        ) as response:
+            if response.status == 204:
+                return response.status, None
+
+            return response.status, await response.json(content_type=None)
+
+    async def _fan_out(
+        self, request: web.Request, path_qs: str, extra_time: float = 0.0
+    ) -> tuple[dict[str, tuple[int, Any]], dict[str, str]]:
+        """Return the responses of the workers and the errors of the others
+
+        The workers are given `extra_time` seconds on top of the timeout,
+        e.g. for an API taking samples over an interval.
+        """
+
+        timeout = ClientTimeout(total=self.timeout + extra_time)
+        body = await request.read()
+        results = await asyncio.gather(
+            *(
+                self._call(socket, request, path_qs, body, timeout)
+                for socket in self.sockets
+            ),
+            return_exceptions=True,
+        )
+
+        responses: dict[str, tuple[int, Any]] = {}
+        errors: dict[str, str] = {}
+        for socket, result in zip(self.sockets, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            elif isinstance(result, BaseException):
+                errors[socket] = repr(result)
+            else:
+                responses[socket] = result
+
+        return responses, errors
+
+    def _cat_handler(self, cls: type[CatBase]):
+        # The columns of the workers led by the column of the socket, which
+        # is named differently if the workers have a column of the same name
+        key = WORKER if WORKER not in cls.__members__.values() else SOCKET
+        columns = StrEnum(
+            cls.__name__,
+            [(key.upper(), key), *((c.name, c.value) for c in cls)],
+        )
+
+        # The hot tasks are sampled over the interval before the response
+        args = {
+            "help": Help(),
+            "v": Verbose(),
+            "s": Sort(columns),
+            "h": Header(columns),
+            "format": fields.Enum(Format, by_value=True),
+        }
+        default_interval = 0.0
+        if cls is CatHotTasks:
+            args["interval"] = TimeValue()
+            default_interval = HOT_TASKS_INTERVAL
+
+        @use_kwargs(args, location="querystring")
+        async def _handler(
+            request: web.Request,
+            *,
+            help: bool = False,
+            format: Format = Format.TEXT,
+            v: bool = False,
+            s: Sequence[tuple[StrEnum, Order]] = [],
+            h: Iterable[str] = (key, *cls.defaults()),
+            interval: float = default_interval,
+        ) -> web.Response:
+
+            if help:
+                return cls._help_response()
+
+            # All columns are fetched so that any of them can be sorted by
+            url = request.rel_url.update_query(format=Format.JSON.value, h="*")
+            responses, errors = await self._fan_out(
+                request, str(url), interval
+            )
+
+            table: list[dict[str, Any]] = []
+            for socket, (status, rows) in responses.items():
+                if status != 200:
+                    errors[socket] = json.dumps(rows)
+                    continue
+
+                table.extend({key: socket, **row} for row in rows)
+
+            headers = tuple(
+                chain.from_iterable(
+                    (column for column in columns if fnmatch(column, pattern))
+                    for pattern in h
+                )
+            )
+            response = cls.render(table, headers, s=s, format=format, v=v)
+            if errors:
+                response.headers[FAILED_WORKERS_HEADER] = ",".join(errors)
+            return response
+
+        return _handler
+
+    def _merge_handler(self):
+
+        @use_kwargs(
+            {
+                "format": fields.Enum(Format, by_value=True),
+                "pretty": Pretty(),
+            },
+            location="querystring",
+        )
+        async def _handler(
+            request: web.Request,
+            *,
+            format: Format = Format.JSON,
+            pretty: bool = False,
+        ) -> web.Response:
+
+            url = request.rel_url.update_query(format=Format.JSON.value)
+            url = url.without_query_params("pretty")
+            responses, errors = await self._fan_out(request, str(url))
+
+            if not errors and all(s == 204 for s, _ in responses.values()):
+                return web.Response(status=204)
+
+            merged: dict[str, Any] = {}
+            for socket, (status, body) in responses.items():
+                if status == 200:
+                    merged[socket] = body
+                elif body is None:
+                    merged[socket] = {"status": status}
+                else:
+                    merged[socket] = {"status": status, "body": body}
+
+            for socket, error in errors.items():
+                merged[socket] = {"error": error}
+
+            response = _response(merged, [], format, pretty)
+            if not any(status < 400 for status, _ in responses.values()):
+                response.set_status(502)
+            if errors:
+                response.headers[FAILED_WORKERS_HEADER] = ",".join(errors)
+            return response
+
+        return _handler
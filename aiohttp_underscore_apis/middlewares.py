@@ -1,45 +1,282 @@
-from collections import ChainMap
+from asyncio import CancelledError, timeout
+from functools import partial
+from math import ceil
 from time import perf_counter
 
-from aiohttp import web
+from aiohttp import hdrs, web
 
+from aiohttp_underscore_apis.admission import ConcurrencyLimiter
+from aiohttp_underscore_apis.cache import CapturedResponse
 from aiohttp_underscore_apis.context import Context
+from aiohttp_underscore_apis.settings import Preempt, RouteSettings
+from aiohttp_underscore_apis.stats import Outcomes, RouteStats, Throughput
+
+_TOO_MANY_REQUESTS = Preempt(
+    status=503, reason=None, body=b"Too many concurrent requests"
+)
+_OVERLOADED = Preempt(status=503, reason=None, body=b"Route is overloaded")
+_CIRCUIT_OPEN = Preempt(
+    status=503, reason=None, body=b"Circuit breaker is open"
+)
+_CACHEABLE_METHODS = frozenset((hdrs.METH_GET, hdrs.METH_HEAD))
+
+
+async def _intercept(
+    request: web.Request,
+    handler,
+    route_settings: RouteSettings,
+    route_stats: RouteStats,
+):
+    if route_settings.preempt is not None:
+        return route_settings.preempt.response()
+
+    if (breaker := route_settings.circuit_breaker) is None:
+        return await _deadline(request, handler, route_settings, route_stats)
+
+    if (probe := breaker.allow()) is None:
+        route_stats.counter.short_circuited += 1
+        return _CIRCUIT_OPEN.response()
+
+    failed: bool | None = None  # Stays None if cancelled
+    start = perf_counter()
+    try:
+        response = await _deadline(
+            request, handler, route_settings, route_stats
+        )
+    except web.HTTPException as e:
+        failed = e.status >= 500
+        raise
+    except Exception:
+        failed = True
+        raise
+    else:
+        failed = response.status >= 500
+        return response
+    finally:
+        if failed is None:
+            breaker.cancel(probe)
+        else:
+            if breaker.latency is not None:
+                failed = failed or perf_counter() - start > breaker.latency
+            breaker.record(probe, failed)
+
+
+async def _deadline(
+    request: web.Request,
+    handler,
+    route_settings: RouteSettings,
+    route_stats: RouteStats,
+):
+    if (request_timeout := route_settings.timeout) is None:
+        return await _cache(request, handler, route_settings, route_stats)
+
+    deadline = timeout(request_timeout.seconds)
+    try:
+        async with deadline:
+            return await _cache(request, handler, route_settings, route_stats)
+    except TimeoutError:
+        if not deadline.expired():
+            raise
+
+        route_stats.counter.timeouts += 1
+        return request_timeout.expired.response()
+
+
+async def _cache(
+    request: web.Request,
+    handler,
+    route_settings: RouteSettings,
+    route_stats: RouteStats,
+):
+    cache = route_settings.cache
+    if cache is None or request.method not in _CACHEABLE_METHODS:
+        return await _coalesce(request, handler, route_settings, route_stats)
+
+    key = cache.key(request)
+    if (response := cache.get(key)) is not None:
+        return response
+
+    response = await _coalesce(request, handler, route_settings, route_stats)
+    if response.status == 200:
+        if (captured := CapturedResponse.capture(response)) is not None:
+            cache.put(key, captured)
+
+    return response
+
+
+async def _coalesce(
+    request: web.Request,
+    handler,
+    route_settings: RouteSettings,
+    route_stats: RouteStats,
+):
+    flights = route_settings.coalesce
+    if flights is None or request.method not in _CACHEABLE_METHODS:
+        return await _admit(request, handler, route_settings, route_stats)
+
+    cache = route_settings.cache
+    return await flights.run(
+        flights.key(request, cache.vary if cache is not None else ()),
+        partial(_admit, request, handler, route_settings, route_stats),
+    )
+
+
+async def _admit(
+    request: web.Request,
+    handler,
+    route_settings: RouteSettings,
+    route_stats: RouteStats,
+):
+    if route_settings.rate_limit is not None:
+        if retry_after := route_settings.rate_limit.try_acquire():
+            route_stats.counter.throttled += 1
+            return web.Response(
+                status=429,
+                headers={"Retry-After": str(ceil(retry_after))},
+                text="Too many requests",
+            )
+
+    limiter = route_settings.concurrency
+    if (shedder := route_settings.shedding) is None:
+        return await _limit(request, handler, limiter, route_stats)
+
+    if shedder.should_shed():
+        route_stats.counter.shed += 1
+        return _OVERLOADED.response()
+
+    # The latency includes the time spent waiting for admission
+    start = perf_counter()
+    try:
+        return await _limit(request, handler, limiter, route_stats)
+    finally:
+        shedder.observe(perf_counter() - start)
+
+
+async def _limit(
+    request: web.Request,
+    handler,
+    limiter: ConcurrencyLimiter | None,
+    route_stats: RouteStats,
+):
+    if limiter is None:
+        return await handler(request)
+
+    if not limiter.try_acquire():
+        route_stats.counter.queued += 1
+        try:
+            admitted = await limiter.wait()
+        finally:
+            route_stats.counter.queued -= 1
+
+        if not admitted:
+            route_stats.counter.rejected += 1
+            return _TOO_MANY_REQUESTS.response()
+
+    try:
+        return await handler(request)
+    finally:
+        limiter.release()
+
+
+def _bytes_in(request: web.Request) -> int:
+    if (content_length := request.content_length) is not None:
+        return content_length
+
+    # The bytes of the chunked body read so far
+    return request.content.total_bytes
+
+
+def _count_bytes_out(request: web.Request, throughput: Throughput) -> bool:
+    """Have the writer count the body bytes as it sends them
+
+    The writer sends the body of the response only after the handler returns
+    unless streamed by the handler, and even then, aiohttp finishes it unless
+    the handler does. Counted at the writer, the bytes are of the body alone,
+    excluding the headers and the chunk framing, whichever the case is.
+    Return False if the writer, i.e. aiohttp, doesn't support it.
+    """
+
+    writer = request.writer
+    if not hasattr(writer, "on_body_write"):
+        return False
+
+    writer.on_body_write = lambda size, _: throughput.record(0, size)
+    return True
+
+
+def _bytes_out(response: web.StreamResponse | None) -> int:
+    """Return the estimate of the body bytes if not counted at the writer"""
+
+    if response is None:
+        return 0
+
+    # Only the bytes written by the handler itself, including the headers and
+    # the chunk framing, are known of a response streamed by the handler.
+    if response.prepared:
+        return response.body_length
+
+    return response.content_length or 0
 
 
 @web.middleware
 async def request_inspector(request: web.Request, handler):
-    ctx = Context.get_from(request.app)
-    route = request.match_info.route
-    route_stats = ctx.route_stats[id(route)]
+    registry = Context.get_from(request.app).registry
+    slot = registry.slot_of(request.match_info.route)
+    if slot is None:
+        return await handler(request)
 
+    route_stats = registry.stats[slot]
+    every = registry.settings[slot].sample_every
+
+    counted = _count_bytes_out(request, route_stats.throughput)
     route_stats.counter.active += 1
     route_stats.counter.total += 1
 
-    start = perf_counter()
+    # Only 1 in `every` requests is timed and stands for `every` requests
+    start = perf_counter() if not route_stats.counter.total % every else None
+    response: web.StreamResponse | None = None
+    outcome: int | None = None
     try:
-        return await handler(request)
+        response = await handler(request)
+    except web.HTTPException as e:
+        response = e
+        route_stats.counter.http_exceptions += 1
+        outcome = Outcomes.of_status(e.status)
+        raise
+    except CancelledError:
+        outcome = Outcomes.CANCELLED
+        raise
+    except Exception:
+        outcome = Outcomes.UNHANDLED
+        raise
+    else:
+        outcome = Outcomes.of_status(response.status)
+        return response
     finally:
-        duration = perf_counter() - start
-        route_stats.time_avg.record(duration)
+        # The clock is read once for the duration and all the time windows
+        now = perf_counter()
+        if outcome is not None:
+            route_stats.outcomes.record(outcome, now)
+        if start is not None:
+            route_stats.record(now - start, every, now)
+        route_stats.throughput.record(
+            _bytes_in(request), 0 if counted else _bytes_out(response), now
+        )
         route_stats.counter.active -= 1
 
 
 @web.middleware
 async def request_interceptor(request: web.Request, handler):
-    ctx = Context.get_from(request.app)
-    route = request.match_info.route
-    route_settings = ctx.route_settings[id(route)]
+    registry = Context.get_from(request.app).registry
+    slot = registry.slot_of(request.match_info.route)
+    if slot is None:
+        return await handler(request)
 
-    preempt = ChainMap(
-        route_settings.transient.get("preempt", {}),
-        route_settings.defaults["preempt"],
-    )
+    route_settings = registry.settings[slot]
 
-    if preempt["status"] is not None:
-        return web.Response(
-            status=preempt["status"],
-            reason=preempt["reason"],
-            text=preempt["text"],
+    if route_settings.intercepts:
+        return await _intercept(
+            request, handler, route_settings, registry.stats[slot]
         )
 
     return await handler(request)
@@ -47,14 +284,83 @@ async def request_interceptor(request: web.Request, handler):
 
 @web.middleware
 async def task_tracker(request: web.Request, handler):
-    ctx = Context.get_from(request.app)
-    route = request.match_info.route
-    task_refs = ctx.task_refs[id(route)]
+    registry = Context.get_from(request.app).registry
+    slot = registry.slot_of(request.match_info.route)
+    if slot is None:
+        return await handler(request)
 
     if request.task is not None:
-        task_refs.add(request.task)
+        registry.track(slot, request.task, perf_counter())
     try:
         return await handler(request)
     finally:
         if request.task is not None:
-            task_refs.discard(request.task)
+            registry.untrack(request.task)
+
+
+@web.middleware
+async def fused_middleware(request: web.Request, handler):
+    """Do what task_tracker, request_inspector and request_interceptor do
+
+    The context and the slot of the route are resolved only once and the
+    request goes through a single middleware frame instead of three.
+    """
+
+    registry = Context.get_from(request.app).registry
+    slot = registry.slot_of(request.match_info.route)
+    if slot is None:
+        return await handler(request)
+
+    route_stats = registry.stats[slot]
+    route_settings = registry.settings[slot]
+
+    # The start time of the task also serves as the start of the duration
+    now = perf_counter()
+    task = request.task
+    if task is not None:
+        registry.track(slot, task, now)
+
+    every = route_settings.sample_every
+
+    counted = _count_bytes_out(request, route_stats.throughput)
+    route_stats.counter.active += 1
+    route_stats.counter.total += 1
+
+    start = now if not route_stats.counter.total % every else None
+    response: web.StreamResponse | None = None
+    outcome: int | None = None
+    try:
+        if route_settings.intercepts:
+            response = await _intercept(
+                request, handler, route_settings, route_stats
+            )
+        else:
+            response = await handler(request)
+    except web.HTTPException as e:
+        response = e
+        route_stats.counter.http_exceptions += 1
+        outcome = Outcomes.of_status(e.status)
+        raise
+    except CancelledError:
+        outcome = Outcomes.CANCELLED
+        raise
+    except Exception:
+        outcome = Outcomes.UNHANDLED
+        raise
+    else:
+        outcome = Outcomes.of_status(response.status)
+        return response
+    finally:
+        # The clock is read once for the duration and all the time windows
+        now = perf_counter()
+        if outcome is not None:
+            route_stats.outcomes.record(outcome, now)
+        if start is not None:
+            route_stats.record(now - start, every, now)
+        route_stats.throughput.record(
+            _bytes_in(request), 0 if counted else _bytes_out(response), now
+        )
+        route_stats.counter.active -= 1
+
+        if task is not None:
+            registry.untrack(task)
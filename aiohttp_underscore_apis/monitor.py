@@ -0,0 +1,128 @@
+import sys
+import traceback
+from asyncio import AbstractEventLoop, TimerHandle, get_running_loop
+from collections import deque
+from dataclasses import dataclass
+from threading import Event, Thread, get_ident
+from time import monotonic, time
+
+from aiohttp import web
+
+from aiohttp_underscore_apis.stats import LatencySketch, TimeAverage
+
+
+@dataclass
+class BlockingEvent:
+    """Stack of the loop thread captured while the loop was blocked"""
+
+    at: float  # Wall-clock time of the capture
+    blocked: float  # Seconds the loop had been blocked for at the capture
+    stack: list[str]
+    lag: float | None = None  # Lag measured once the loop resumed
+
+
+class LoopMonitor:
+    """Scheduling lag of the loop and a watchdog of the blocking calls
+
+    A callback scheduled every `interval` seconds measures how late the loop
+    runs it, which is the time the loop was kept from serving anything else.
+    A daemon thread checks that the callback keeps running, and if it has
+    been late by more than `threshold` seconds, captures the stack of the
+    loop thread, i.e. what is blocking the loop, into a ring buffer of the
+    last `max_events` blocking events.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        max_events: int = 100,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.time_avg = TimeAverage()
+        self.latency = LatencySketch()
+        self.max_lag = 0.0
+        self.events: deque[BlockingEvent] = deque(maxlen=max_events)
+        self.blocked = 0  # Number of blocking events in total
+        self._loop: AbstractEventLoop | None = None
+        self._handle: TimerHandle | None = None
+        self._expected = 0.0
+        self._beat = 0.0
+        self._captured = 0.0
+        self._pending: BlockingEvent | None = None
+        self._thread_id = 0
+        self._stopping = Event()
+        self._watchdog: Thread | None = None
+
+    def start(self) -> None:
+        self._loop = get_running_loop()
+        self._thread_id = get_ident()
+        self._beat = monotonic()
+        self._schedule()
+
+        self._stopping.clear()
+        self._watchdog = Thread(
+            target=self._watch, name="aiohttp-underscore-apis", daemon=True
+        )
+        self._watchdog.start()
+
+    async def on_startup(self, app: web.Application) -> None:
+        self.start()
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        self._stopping.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _schedule(self) -> None:
+        assert self._loop is not None
+        self._expected = self._loop.time() + self.interval
+        self._handle = self._loop.call_later(self.interval, self._tick)
+
+    def _tick(self) -> None:
+        assert self._loop is not None
+        lag = max(self._loop.time() - self._expected, 0.0)
+        self._beat = monotonic()
+
+        self.time_avg.record(lag)
+        self.latency.record(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+        if (event := self._pending) is not None:
+            self._pending = None
+            event.lag = lag
+
+        self._schedule()
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self.threshold / 2):
+            beat = self._beat
+            blocked = monotonic() - beat - self.interval
+            if blocked <= self.threshold or beat == self._captured:
+                continue
+
+            self._captured = beat  # Captured only once per blocking
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+
+            event = BlockingEvent(
+                at=time(),
+                blocked=blocked,
+                stack=traceback.format_stack(frame),
+            )
+            del frame
+
+            self.events.append(event)
+            self.blocked += 1
+            self._pending = event
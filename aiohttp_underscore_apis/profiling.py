@@ -0,0 +1,106 @@
+from asyncio import AbstractEventLoop, Task
+from collections.abc import Coroutine
+from time import perf_counter
+from typing import Any, Callable
+
+TaskFactory = Callable[..., "Task[Any]"]
+
+
+class TimedCoroutine(Coroutine):
+    """Coroutine timing the steps the task takes to drive the wrapped one
+
+    Every step of a task is a call of `send()` or `throw()` of its coroutine,
+    hence the time spent in them is the time the task holds the loop.
+    """
+
+    def __init__(self, coro: Coroutine) -> None:
+        self._coro = coro
+        self.__name__ = getattr(coro, "__name__", type(coro).__name__)
+        self.__qualname__ = getattr(
+            coro, "__qualname__", type(coro).__qualname__
+        )
+        self.steps = 0
+        self.time = 0.0
+        self.longest = 0.0
+
+    def _record(self, duration: float) -> None:
+        self.steps += 1
+        self.time += duration
+        if duration > self.longest:
+            self.longest = duration
+
+    def send(self, value: Any) -> Any:
+        start = perf_counter()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._record(perf_counter() - start)
+
+    def throw(self, *args: Any) -> Any:
+        start = perf_counter()
+        try:
+            return self._coro.throw(*args)
+        finally:
+            self._record(perf_counter() - start)
+
+    def close(self) -> None:
+        self._coro.close()
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    # Delegated so that the stack and the repr of the task are still of the
+    # wrapped coroutine.
+    @property
+    def cr_frame(self):
+        return getattr(self._coro, "cr_frame", None)
+
+    @property
+    def cr_await(self):
+        return getattr(self._coro, "cr_await", None)
+
+    @property
+    def cr_code(self):
+        return getattr(self._coro, "cr_code", None)
+
+    @property
+    def cr_running(self) -> bool:
+        return getattr(self._coro, "cr_running", False)
+
+
+class TimingTaskFactory:
+    """Task factory wrapping the coroutines of the tasks in TimedCoroutine
+
+    The task factory previously set to the loop, if any, is called with the
+    wrapped coroutines to create the tasks.
+    """
+
+    def __init__(self, previous: TaskFactory | None = None) -> None:
+        self.previous = previous
+
+    def __call__(
+        self, loop: AbstractEventLoop, coro: Coroutine, **kwargs: Any
+    ) -> "Task[Any]":
+        timed = TimedCoroutine(coro)
+        if self.previous is None:
+            return Task(timed, loop=loop, **kwargs)
+        return self.previous(loop, timed, **kwargs)
+
+    @classmethod
+    def install(cls, loop: AbstractEventLoop) -> "TimingTaskFactory":
+        factory = cls(loop.get_task_factory())
+        loop.set_task_factory(factory)
+        return factory
+
+    def uninstall(self, loop: AbstractEventLoop) -> None:
+        if loop.get_task_factory() is self:
+            loop.set_task_factory(self.previous)
+
+    @staticmethod
+    def timing_of(task: "Task[Any]") -> TimedCoroutine | None:
+        coro = task.get_coro()
+        return coro if isinstance(coro, TimedCoroutine) else None
+
+    @classmethod
+    def installed(cls, loop: AbstractEventLoop) -> bool:
+        return isinstance(loop.get_task_factory(), cls)
@@ -0,0 +1,102 @@
+from asyncio import Task
+from collections.abc import Container, Iterable, Mapping
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from aiohttp import web
+from aiohttp.web_urldispatcher import AbstractRoute
+
+from aiohttp_underscore_apis.cache import CacheBudget
+from aiohttp_underscore_apis.settings import (
+    DEFAULT_CACHE_MAX_BYTES,
+    RouteSettings,
+)
+from aiohttp_underscore_apis.stats import RouteStats
+
+
+class RouteRegistry:
+    """Dense slots of the routes of the core app
+
+    Every route is given a slot, i.e. an index into the preallocated lists of
+    stats and settings, once the core app is frozen. The slot also serves as
+    the route ID, which is stable across the processes serving the same app.
+
+    The tasks serving requests are kept in a single side table along with
+    their slots and start times, which costs one insertion per request. The
+    tasks of a slot are derived from it only when asked for.
+
+    The given defaults override the default settings of every route, and
+    the response caches of all routes share the given cache budget.
+    """
+
+    def __init__(
+        self,
+        defaults: Mapping[str, Mapping[str, Any]] = {},
+        cache_budget: CacheBudget | None = None,
+    ) -> None:
+        self.defaults = defaults
+        self.cache_budget = cache_budget or CacheBudget(
+            DEFAULT_CACHE_MAX_BYTES
+        )
+        self.routes: list[AbstractRoute] = []
+        self.stats: list[RouteStats] = []
+        self.settings: list[RouteSettings] = []
+        self.tasks: WeakKeyDictionary[Task, tuple[int, float]] = (
+            WeakKeyDictionary()
+        )
+        self._slots: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def __contains__(self, slot: object) -> bool:
+        return isinstance(slot, int) and 0 <= slot < len(self.routes)
+
+    def register(self, routes: Iterable[AbstractRoute]) -> None:
+        routes = [route for route in routes if id(route) not in self._slots]
+
+        self._slots.update(
+            (id(route), slot)
+            for slot, route in enumerate(routes, start=len(self.routes))
+        )
+        self.routes.extend(routes)
+        self.stats.extend(RouteStats() for _ in routes)
+        self.settings.extend(
+            RouteSettings.with_defaults(
+                self.defaults, cache_budget=self.cache_budget
+            )
+            for _ in routes
+        )
+
+    def slot_of(self, route: AbstractRoute) -> int | None:
+        """Return the slot of the route or None if it isn't registered"""
+
+        return self._slots.get(id(route))
+
+    def track(self, slot: int, task: Task, started: float) -> None:
+        """Track the task serving a request since the perf_counter() time"""
+
+        self.tasks[task] = (slot, started)
+
+    def untrack(self, task: Task) -> None:
+        self.tasks.pop(task, None)
+
+    def tasks_of(self, slots: Container[int]) -> list[Task]:
+        """Return the tasks serving requests of the slots"""
+
+        return [
+            task for task, (slot, _) in self.tasks.items() if slot in slots
+        ]
+
+    def oldest_started(self) -> dict[int, float]:
+        """Return the start time of the oldest request in flight per slot"""
+
+        oldest: dict[int, float] = {}
+        for slot, started in self.tasks.values():
+            if started < oldest.get(slot, float("inf")):
+                oldest[slot] = started
+
+        return oldest
+
+    async def on_startup(self, app: web.Application) -> None:
+        self.register(app.router.routes())
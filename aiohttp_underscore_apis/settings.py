@@ -1,8 +1,26 @@
+from collections import ChainMap
+from collections.abc import Mapping
 from dataclasses import dataclass, field
+from functools import partial
 from typing import Any
 
+from aiohttp import web
 from marshmallow import Schema, fields
-from marshmallow.validate import Range
+from marshmallow.validate import OneOf, Range
+
+from aiohttp_underscore_apis.admission import (
+    CircuitBreaker,
+    ConcurrencyLimiter,
+    LoadShedder,
+    TokenBucket,
+)
+from aiohttp_underscore_apis.cache import (
+    CacheBudget,
+    ResponseCache,
+    SingleFlight,
+)
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024**2
 
 
 class PreemptSchema(Schema):
@@ -11,8 +29,84 @@ class PreemptSchema(Schema):
     text = fields.String(allow_none=True)
 
 
+class SamplingSchema(Schema):
+    every = fields.Integer(allow_none=True, validate=Range(min=1))
+
+
+class ConcurrencySchema(Schema):
+    max_active = fields.Integer(allow_none=True, validate=Range(min=1))
+    max_queue = fields.Integer(allow_none=True, validate=Range(min=0))
+    queue_timeout = fields.Float(allow_none=True, validate=Range(min=0))
+
+
+class RateLimitSchema(Schema):
+    rate = fields.Float(
+        allow_none=True, validate=Range(min=0, min_inclusive=False)
+    )
+    burst = fields.Float(allow_none=True, validate=Range(min=1))
+
+
+class AdaptiveSheddingSchema(Schema):
+    target = fields.Float(
+        allow_none=True, validate=Range(min=0, min_inclusive=False)
+    )
+    interval = fields.Float(
+        allow_none=True, validate=Range(min=0, min_inclusive=False)
+    )
+    step = fields.Float(
+        allow_none=True, validate=Range(min=0, max=1, min_inclusive=False)
+    )
+    max_drop_rate = fields.Float(
+        allow_none=True, validate=Range(min=0, max=1, min_inclusive=False)
+    )
+
+
+class CacheSchema(Schema):
+    ttl = fields.Float(
+        allow_none=True, validate=Range(min=0, min_inclusive=False)
+    )
+    max_entries = fields.Integer(allow_none=True, validate=Range(min=1))
+    vary = fields.List(fields.String(), allow_none=True)
+
+
+class TimeoutSchema(Schema):
+    seconds = fields.Float(
+        allow_none=True, validate=Range(min=0, min_inclusive=False)
+    )
+    status = fields.Integer(allow_none=True, validate=OneOf((503, 504)))
+
+
+class CoalesceSchema(Schema):
+    enabled = fields.Boolean(allow_none=True)
+
+
+class CircuitBreakerSchema(Schema):
+    error_rate = fields.Float(
+        allow_none=True, validate=Range(min=0, max=1, min_inclusive=False)
+    )
+    latency = fields.Float(
+        allow_none=True, validate=Range(min=0, min_inclusive=False)
+    )
+    min_requests = fields.Integer(allow_none=True, validate=Range(min=1))
+    window = fields.Float(
+        allow_none=True, validate=Range(min=0, min_inclusive=False)
+    )
+    open_duration = fields.Float(
+        allow_none=True, validate=Range(min=0, min_inclusive=False)
+    )
+    half_open_probes = fields.Integer(allow_none=True, validate=Range(min=1))
+
+
 class SettingsSchema(Schema):
     preempt = fields.Nested(PreemptSchema, required=False)
+    sampling = fields.Nested(SamplingSchema, required=False)
+    concurrency = fields.Nested(ConcurrencySchema, required=False)
+    rate_limit = fields.Nested(RateLimitSchema, required=False)
+    adaptive_shedding = fields.Nested(AdaptiveSheddingSchema, required=False)
+    cache = fields.Nested(CacheSchema, required=False)
+    coalesce = fields.Nested(CoalesceSchema, required=False)
+    timeout = fields.Nested(TimeoutSchema, required=False)
+    circuit_breaker = fields.Nested(CircuitBreakerSchema, required=False)
 
 
 class RouteSettingsSchema(Schema):
@@ -26,10 +120,235 @@ def _defaults() -> dict[str, Any]:
             "reason": None,
             "text": None,
         },
+        "sampling": {
+            "every": 1,
+        },
+        "concurrency": {
+            "max_active": None,
+            "max_queue": 0,
+            "queue_timeout": None,
+        },
+        "rate_limit": {
+            "rate": None,
+            "burst": None,
+        },
+        "adaptive_shedding": {
+            "target": None,
+            "interval": 1.0,
+            "step": 0.1,
+            "max_drop_rate": 0.9,
+        },
+        "cache": {
+            "ttl": None,
+            "max_entries": 1000,
+            "vary": [],
+        },
+        "coalesce": {
+            "enabled": False,
+        },
+        "timeout": {
+            "seconds": None,
+            "status": 504,
+        },
+        "circuit_breaker": {
+            "error_rate": None,
+            "latency": None,
+            "min_requests": 20,
+            "window": 10.0,
+            "open_duration": 30.0,
+            "half_open_probes": 1,
+        },
     }
 
 
 @dataclass(frozen=True)
+class Preempt:
+    """Template of the response returned instead of calling the handler"""
+
+    status: int
+    reason: str | None
+    body: bytes | None
+
+    @classmethod
+    def compile(cls, settings: Mapping[str, Any]) -> "Preempt | None":
+        if settings["status"] is None:
+            return None
+
+        text = settings["text"]
+        return cls(
+            status=settings["status"],
+            reason=settings["reason"],
+            body=None if text is None else text.encode(),
+        )
+
+    def response(self) -> web.Response:
+        if self.body is None:
+            return web.Response(status=self.status, reason=self.reason)
+
+        return web.Response(
+            status=self.status,
+            reason=self.reason,
+            body=self.body,
+            content_type="text/plain",
+            charset="utf-8",
+        )
+
+
+@dataclass(frozen=True)
+class Timeout:
+    """Deadline of a request and the response returned once it has passed"""
+
+    seconds: float
+    expired: Preempt
+
+    @classmethod
+    def compile(cls, settings: Mapping[str, Any]) -> "Timeout | None":
+        if settings["seconds"] is None:
+            return None
+
+        return cls(
+            seconds=settings["seconds"],
+            expired=Preempt(
+                status=settings["status"],
+                reason=None,
+                body=b"Request timed out",
+            ),
+        )
+
+
+@dataclass
 class RouteSettings:
     transient: dict[str, Any] = field(default_factory=dict)
     defaults: dict[str, Any] = field(default_factory=_defaults)
+    cache_budget: CacheBudget = field(
+        default_factory=partial(CacheBudget, DEFAULT_CACHE_MAX_BYTES),
+        repr=False,
+    )
+
+    # Compiled from the settings above so that the middlewares don't need to
+    # resolve them on every request. None means that there is nothing to do.
+    preempt: Preempt | None = field(default=None, init=False)
+    sample_every: int = field(default=1, init=False)
+    concurrency: ConcurrencyLimiter | None = field(default=None, init=False)
+    rate_limit: TokenBucket | None = field(default=None, init=False)
+    shedding: LoadShedder | None = field(default=None, init=False)
+    cache: ResponseCache | None = field(default=None, init=False)
+    coalesce: SingleFlight | None = field(default=None, init=False)
+    timeout: Timeout | None = field(default=None, init=False)
+    circuit_breaker: CircuitBreaker | None = field(default=None, init=False)
+
+    # Whether or not the interceptor has anything to do
+    intercepts: bool = field(default=False, init=False)
+
+    # The limiter, the bucket, the shedder and the breaker outlive the settings
+    # so that they keep track of the requests admitted before the settings
+    # were changed.
+    _limiter: ConcurrencyLimiter = field(
+        default_factory=ConcurrencyLimiter, init=False, repr=False
+    )
+    _bucket: TokenBucket = field(
+        default_factory=TokenBucket, init=False, repr=False
+    )
+    _shedder: LoadShedder = field(
+        default_factory=LoadShedder, init=False, repr=False
+    )
+    _breaker: CircuitBreaker = field(
+        default_factory=CircuitBreaker, init=False, repr=False
+    )
+    response_cache: ResponseCache = field(init=False, repr=False)
+    single_flight: SingleFlight = field(
+        default_factory=SingleFlight, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        self.response_cache = ResponseCache(self.cache_budget)
+        self.compile()
+
+    @classmethod
+    def with_defaults(
+        cls, overrides: Mapping[str, Mapping[str, Any]], **kwargs: Any
+    ) -> "RouteSettings":
+        defaults = _defaults()
+        for name, settings in overrides.items():
+            defaults[name].update(settings)
+
+        return cls(defaults=defaults, **kwargs)
+
+    def update(self, transient: Mapping[str, Any]) -> None:
+        for name, settings in transient.items():
+            if not settings:
+                continue
+
+            # Merged into the settings in effect, and nulled ones are removed
+            section = self.transient.setdefault(name, {})
+            for key, value in settings.items():
+                if value is None:
+                    section.pop(key, None)
+                else:
+                    section[key] = value
+
+            if not section:
+                self.transient.pop(name)
+
+        self.compile()
+
+    def _effective(self, name: str) -> Mapping[str, Any]:
+        return ChainMap(self.transient.get(name, {}), self.defaults[name])
+
+    def compile(self) -> None:
+        self.preempt = Preempt.compile(self._effective("preempt"))
+        self.sample_every = self._effective("sampling")["every"]
+
+        concurrency = self._effective("concurrency")
+        if concurrency["max_active"] is None:
+            self.concurrency = None
+        else:
+            self._limiter.configure(**concurrency)
+            self.concurrency = self._limiter
+
+        rate_limit = self._effective("rate_limit")
+        if rate_limit["rate"] is None:
+            self.rate_limit = None
+        else:
+            self._bucket.configure(**rate_limit)
+            self.rate_limit = self._bucket
+
+        shedding = self._effective("adaptive_shedding")
+        if shedding["target"] is None:
+            self.shedding = None
+        else:
+            self._shedder.configure(**shedding)
+            self.shedding = self._shedder
+
+        cache = self._effective("cache")
+        if cache["ttl"] is None:
+            self.response_cache.clear()
+            self.cache = None
+        else:
+            self.response_cache.configure(**cache)
+            self.cache = self.response_cache
+
+        if self._effective("coalesce")["enabled"]:
+            self.coalesce = self.single_flight
+        else:
+            self.coalesce = None
+
+        self.timeout = Timeout.compile(self._effective("timeout"))
+
+        circuit_breaker = self._effective("circuit_breaker")
+        if circuit_breaker["error_rate"] is None:
+            self.circuit_breaker = None
+        else:
+            self._breaker.configure(**circuit_breaker)
+            self.circuit_breaker = self._breaker
+
+        self.intercepts = (
+            self.preempt is not None
+            or self.timeout is not None
+            or self.circuit_breaker is not None
+            or self.concurrency is not None
+            or self.rate_limit is not None
+            or self.shedding is not None
+            or self.cache is not None
+            or self.coalesce is not None
+        )
@@ -0,0 +1,493 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+from array import array
+from asyncio import TimerHandle, get_running_loop
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from itertools import islice
+from time import sleep, time
+from typing import Any
+
+from aiohttp import web
+from aiohttp.web_urldispatcher import AbstractRoute
+
+from aiohttp_underscore_apis.registry import RouteRegistry
+from aiohttp_underscore_apis.stats import (
+    Counter,
+    Histogram,
+    Outcomes,
+    RouteStats,
+)
+
+COUNTER_FIELDS = tuple(f.name for f in fields(Counter))
+
+# Header of the region of a worker: pid (0 if unclaimed), time of publishing
+_WORKER = struct.Struct("<qd")
+# Sequence number of a record, which is odd while the record is being written
+_SEQ = struct.Struct("<q")
+# Counters, outcomes, bytes in/out, then count, sum, max and bins of latency
+_DATA = struct.Struct(
+    f"<{len(COUNTER_FIELDS) + len(Outcomes.labels) + 3}qdd{Histogram.size}Q"
+)
+_RECORD_SIZE = -(-(_SEQ.size + _DATA.size) // 8) * 8
+
+# Attempts to read a consistent record before giving up on it
+_READ_ATTEMPTS = 100
+
+
+@dataclass
+class SharedRouteStats:
+    """Totals of a route published by one or more workers"""
+
+    counter: Counter = field(default_factory=Counter)
+    outcomes: list[int] = field(
+        default_factory=lambda: [0] * len(Outcomes.labels)
+    )
+    bytes_in: int = 0
+    bytes_out: int = 0
+    latency: Histogram = field(default_factory=lambda: Histogram("Q"))
+
+    @classmethod
+    def of(cls, stats: RouteStats) -> "SharedRouteStats":
+        shared = cls(
+            counter=Counter(
+                *(getattr(stats.counter, name) for name in COUNTER_FIELDS)
+            ),
+            outcomes=list(stats.outcomes.totals),
+            bytes_in=stats.throughput.total_in,
+            bytes_out=stats.throughput.total_out,
+        )
+        shared.latency.merge(stats.lifetime)
+        return shared
+
+    def merge(self, other: "SharedRouteStats") -> None:
+        for name in COUNTER_FIELDS:
+            setattr(
+                self.counter,
+                name,
+                getattr(self.counter, name) + getattr(other.counter, name),
+            )
+        for index, total in enumerate(other.outcomes):
+            self.outcomes[index] += total
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.latency.merge(other.latency)
+
+
+@dataclass(frozen=True)
+class WorkerStats:
+    pid: int
+    published_at: float
+    routes: list[SharedRouteStats | None]
+
+
+def host_totals(
+    workers: list[WorkerStats], routes: int
+) -> list[SharedRouteStats]:
+    """Sum up the stats of the routes over the workers"""
+
+    totals = [SharedRouteStats() for _ in range(routes)]
+    for worker in workers:
+        for total, stats in zip(totals, worker.routes):
+            if stats is not None:
+                total.merge(stats)
+
+    return totals
+
+
+class SharedStats:
+    """Totals of the route stats shared among the workers on the same host
+
+    The memory-mapped file at the path is divided into one region per worker
+    and each region into one record per route slot, which is stable across
+    the workers serving the same app. Every worker claims a free region when
+    it starts and is the single writer of it, so no lock is needed. Instead,
+    each record has a sequence number that is odd while being written, and
+    the readers retry until they read the same even number before and after
+    the record. A reader yields the CPU between its attempts so that the
+    writer can finish, and counts the records given up on in `torn_reads`.
+
+    Only the totals and the lifetime latency histograms are shared, and they
+    are published every `interval` seconds rather than on every request so
+    that the requests don't pay for it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_workers: int = 64,
+        max_routes: int = 1024,
+        interval: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.max_workers = max_workers
+        self.max_routes = max_routes
+        self.interval = interval
+        self.worker: int | None = None
+        self.torn_reads = 0
+        self._region_size = _WORKER.size + max_routes * _RECORD_SIZE
+        self._mmap: mmap.mmap | None = None
+        self._published: list[tuple[int, ...]] = []
+        self._registry: RouteRegistry | None = None
+        self._handle: TimerHandle | None = None
+
+    def open(self) -> None:
+        """Map the file and claim the region of a worker no longer alive"""
+
+        size = self.max_workers * self._region_size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+
+            for worker in range(self.max_workers):
+                offset = worker * self._region_size
+                pid, _ = _WORKER.unpack_from(self._mmap, offset)
+                if not pid or not _is_alive(pid):
+                    break
+            else:
+                raise RuntimeError(f"No free region in {self.path}")
+
+            end = offset + self._region_size
+            self._mmap[offset:end] = bytes(self._region_size)
+            _WORKER.pack_into(self._mmap, offset, os.getpid(), time())
+            self.worker = worker
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def close(self) -> None:
+        self.stop()
+        if self._mmap is not None:
+            if self.worker is not None:
+                offset = self.worker * self._region_size
+                _WORKER.pack_into(self._mmap, offset, 0, time())
+                self.worker = None
+            self._mmap.close()
+            self._mmap = None
+
+    def bind(self, registry: RouteRegistry) -> None:
+        self._registry = registry
+
+    def start(self) -> None:
+        """Publish the stats of the bound registry periodically on the loop"""
+
+        if self._mmap is None:
+            self.open()
+
+        self._schedule()
+
+    async def on_startup(self, app: web.Application) -> None:
+        self.start()
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        self.close()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self) -> None:
+        self._handle = get_running_loop().call_later(self.interval, self._tick)
+
+    def _tick(self) -> None:
+        try:
+            if self._registry is not None:
+                self.publish(self._registry)
+        finally:
+            self._schedule()
+
+    def publish(self, registry: RouteRegistry) -> None:
+        """Write the records of the routes changed since the last time"""
+
+        if self._mmap is None or self.worker is None:
+            return
+
+        region = self.worker * self._region_size
+        routes = min(len(registry), self.max_routes)
+        self._published.extend(
+            () for _ in range(routes - len(self._published))
+        )
+
+        for slot in range(routes):
+            stats = registry.stats[slot]
+            counter = stats.counter
+            fingerprint = (
+                counter.total,
+                counter.active,
+                counter.queued,
+                stats.lifetime.count,
+                stats.throughput.total_out,
+            )
+            if self._published[slot] == fingerprint:
+                continue
+            self._published[slot] = fingerprint
+
+            offset = region + _WORKER.size + slot * _RECORD_SIZE
+            (seq,) = _SEQ.unpack_from(self._mmap, offset)
+            _SEQ.pack_into(self._mmap, offset, seq + 1)
+            _DATA.pack_into(
+                self._mmap,
+                offset + _SEQ.size,
+                *(getattr(counter, name) for name in COUNTER_FIELDS),
+                *stats.outcomes.totals,
+                stats.throughput.total_in,
+                stats.throughput.total_out,
+                stats.lifetime.count,
+                stats.lifetime.sum,
+                stats.lifetime.max,
+                *stats.lifetime.bins,
+            )
+            _SEQ.pack_into(self._mmap, offset, seq + 2)
+
+        _WORKER.pack_into(self._mmap, region, os.getpid(), time())
+
+    def read(self, routes: int) -> list[WorkerStats]:
+        """Read the records of the given number of routes of every worker"""
+
+        if self._mmap is None:
+            return []
+
+        if self._registry is not None:
+            self.publish(self._registry)  # Let it see its latest stats
+
+        workers: list[WorkerStats] = []
+        for worker in range(self.max_workers):
+            region = worker * self._region_size
+            pid, published_at = _WORKER.unpack_from(self._mmap, region)
+            if not pid or not _is_alive(pid):
+                continue
+
+            workers.append(
+                WorkerStats(
+                    pid=pid,
+                    published_at=published_at,
+                    routes=[
+                        self._read_record(
+                            region + _WORKER.size + slot * _RECORD_SIZE
+                        )
+                        for slot in range(min(routes, self.max_routes))
+                    ],
+                )
+            )
+
+        return workers
+
+    def _read_record(self, offset: int) -> SharedRouteStats | None:
+        assert self._mmap is not None
+
+        for attempt in range(_READ_ATTEMPTS):
+            if attempt:
+                sleep(0)  # Yield to the writer in the middle of writing
+            (before,) = _SEQ.unpack_from(self._mmap, offset)
+            if before % 2:
+                continue
+            values = _DATA.unpack_from(self._mmap, offset + _SEQ.size)
+            (after,) = _SEQ.unpack_from(self._mmap, offset)
+            if before == after:
+                break
+        else:
+            self.torn_reads += 1
+            return None  # The writer may have died while writing
+
+        if not before:
+            return None  # Never published
+
+        unpacked = iter(values)
+        stats = SharedRouteStats(
+            counter=Counter(*islice(unpacked, len(COUNTER_FIELDS))),
+            outcomes=list(islice(unpacked, len(Outcomes.labels))),
+            bytes_in=next(unpacked),
+            bytes_out=next(unpacked),
+        )
+        latency = stats.latency
+        latency.count, latency.sum, latency.max = islice(unpacked, 3)
+        latency.bins = array("Q", unpacked)
+        return stats
+
+
+class SharedSettings:
+    """Transient settings of the routes replicated among the workers
+
+    The file at the path holds the version on its first line, which is bumped
+    on every change, followed by the transient settings of all routes in
+    JSON. The settings are keyed
+    by the method and the path of the route rather than by its slot, so that
+    they don't get applied to another route once the routes of the app
+    change, e.g. by a deployment, and the settings of the routes unknown to
+    a worker are left as they are. A worker changing the
+    settings brings itself up to date and writes the next version under the
+    lock of the `.lock` file next to it, then the other workers apply it
+    when they notice the file replaced or the version changed within
+    `interval` seconds. The file is replaced atomically, hence its readers
+    need no lock.
+
+    The file outlives the workers so that the respawned workers apply the
+    settings in effect. Remove the file to start afresh.
+    """
+
+    def __init__(self, path: str, interval: float = 0.01) -> None:
+        self.path = path
+        self.interval = interval
+        self.version = 0
+        self._routes: dict[str, dict[str, Any]] = {}
+        self._stat: tuple[int, ...] | None = None
+        self._registry: RouteRegistry | None = None
+        self._handle: TimerHandle | None = None
+
+    def bind(self, registry: RouteRegistry) -> None:
+        self._registry = registry
+
+    def start(self) -> None:
+        """Apply the changes of the settings periodically on the loop"""
+
+        self.sync()
+        self._schedule()
+
+    async def on_startup(self, app: web.Application) -> None:
+        self.start()
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        self.close()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def close(self) -> None:
+        self.stop()
+
+    def _schedule(self) -> None:
+        self._handle = get_running_loop().call_later(self.interval, self._tick)
+
+    def _tick(self) -> None:
+        self.sync()
+        self._schedule()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def sync(self) -> None:
+        """Apply the settings in the file if it has been replaced or changed
+
+        The version on the first line is checked as well as the stat of the
+        file, since a replacement of the same size within the resolution of
+        the timestamps may reuse the inode and leave the stat unchanged.
+        """
+
+        try:
+            with open(self.path) as file:
+                key = _stat_key(os.fstat(file.fileno()))
+                version = int(file.readline())
+                if key == self._stat and version == self.version:
+                    return
+
+                routes = json.load(file)
+        except FileNotFoundError:
+            return
+
+        self._stat = key
+        if version != self.version or routes != self._routes:
+            self._apply(routes)
+            self.version = version
+
+    def _apply(self, routes: dict[str, dict[str, Any]]) -> None:
+        self._routes = routes
+        if self._registry is None:
+            return
+
+        for route, settings in zip(
+            self._registry.routes, self._registry.settings
+        ):
+            transient = routes.get(route_key(route), {})
+            if settings.transient != transient:
+                settings.transient.clear()
+                settings.update(transient)
+
+    def update(
+        self, route_ids: Iterable[int], transient: Mapping[str, Any]
+    ) -> None:
+        """Change the settings of the routes and publish the next version"""
+
+        assert self._registry is not None
+
+        with self._locked():
+            self.sync()
+            for route_id in route_ids:
+                self._registry.settings[route_id].update(transient)
+
+            keys = [route_key(route) for route in self._registry.routes]
+            routes = {
+                key: settings
+                for key, settings in self._routes.items()
+                if key not in keys
+            }
+            routes.update(
+                (key, settings.transient)
+                for key, settings in zip(keys, self._registry.settings)
+                if settings.transient
+            )
+            version = self.version + 1
+            temp = f"{self.path}.{os.getpid()}"
+            with open(temp, "w") as file:
+                file.write(f"{version}\n")
+                json.dump(routes, file)
+            os.replace(temp, self.path)
+
+            self.version = version
+            self._routes = routes
+            self._stat = _stat_key(os.stat(self.path))
+
+
+def route_key(route: AbstractRoute) -> str:
+    """Return the method and the path of the route, e.g. `GET /foo/{id}`"""
+
+    path = "<unknown>" if route.resource is None else route.resource.canonical
+    return f"{route.method} {path}"
+
+
+def _stat_key(stat: os.stat_result) -> tuple[int, ...]:
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def read_workers(
+    shared: SharedStats | None, registry: RouteRegistry
+) -> list[WorkerStats]:
+    """Return the stats of every worker, or of this worker if not shared"""
+
+    if shared is None:
+        return [
+            WorkerStats(
+                pid=os.getpid(),
+                published_at=time(),
+                routes=list(map(SharedRouteStats.of, registry.stats)),
+            )
+        ]
+
+    return shared.read(len(registry))
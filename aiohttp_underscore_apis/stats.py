@@ -1,50 +1,372 @@
-from collections import deque
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass, field
-from time import time
+from math import ceil, log
+from time import monotonic, perf_counter
+from typing import Any, ClassVar
 
 
-class TimeAverage:
-    def __init__(self) -> None:
-        self._records: deque[tuple[float, float]] = deque()
+class TimeRing(ABC):
+    """Preallocated ring of fixed-width time buckets
 
-    def record(self, duration: float):
-        now = time()
-        self._records.append((now, duration))
-        self._cutoff(now - 15 * 60)
+    The ring covers the longest of the windows (1, 5 and 15 minutes), and
+    subclasses keep their aggregates per bucket so that the memory usage is
+    constant regardless of the request rate.
 
-    def _cutoff(self, earlier_than):
-        while self._records and self._records[0][0] < earlier_than:
-            self._records.popleft()
+    The time is of perf_counter(), so that a request can read the clock once
+    when it ends and pass the time as `now` to its duration and to every ring.
+    """
 
-    def calculate(self) -> tuple[float, float, float]:
-        now = time()
-        self._cutoff(now - 15 * 60)
+    windows: ClassVar[tuple[int, ...]] = (60, 300, 900)
 
-        avg_1m, avg_5m, avg_15m = 0 + 0j, 0 + 0j, 0 + 0j
-        ago_1m, ago_5m, ago_15m = now - 60, now - 300, now - 900
+    def __init__(self, resolution: int) -> None:
+        if self.windows[-1] % resolution:
+            raise ValueError(f"{resolution=} must divide {self.windows[-1]}")
 
-        for timestamp, duration in self._records:
-            if timestamp >= ago_1m:
-                avg_1m += duration + 1j
-            if timestamp >= ago_5m:
-                avg_5m += duration + 1j
-            if timestamp >= ago_15m:
-                avg_15m += duration + 1j
+        self._resolution = resolution
+        self._size = self.windows[-1] // resolution
+        self._epochs = array("q", [-1]) * self._size
+        # Time range of the current bucket, so that it is found by comparison
+        self._slot = 0
+        self._since = self._until = 0.0
 
-        return (
-            avg_1m.real / avg_1m.imag if avg_1m.imag else float("nan"),
-            avg_5m.real / avg_5m.imag if avg_5m.imag else float("nan"),
-            avg_15m.real / avg_15m.imag if avg_15m.imag else float("nan"),
-        )
+    @abstractmethod
+    def _reset(self, slot: int) -> None:
+        """Clear the aggregates of the slot about to be reused"""
+
+    def _current(self, now: float | None) -> int:
+        """Return the slot of the current time bucket, resetting it if stale"""
+
+        if now is None:
+            now = perf_counter()
+        if self._since <= now < self._until:
+            return self._slot
+
+        epoch = int(now) // self._resolution
+        slot = epoch % self._size
+
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._reset(slot)
+
+        self._slot = slot
+        self._since = epoch * self._resolution
+        self._until = self._since + self._resolution
+        return slot
+
+    def _iter_windows(self) -> Iterator[list[int]]:
+        """Yield the live slots newly covered by each window in turn"""
+
+        epoch = int(perf_counter()) // self._resolution
+
+        age = 0
+        for window in self.windows:
+            slots: list[int] = []
+            while age < window // self._resolution:
+                slot = (epoch - age) % self._size
+                if self._epochs[slot] == epoch - age:
+                    slots.append(slot)
+                age += 1
+
+            yield slots
+
+
+class TimeAverage(TimeRing):
+    """Average durations over the last 1, 5 and 15 minutes"""
+
+    def __init__(self, resolution: int = 5) -> None:
+        super().__init__(resolution)
+        self._sums = array("d", [0.0]) * self._size
+        self._counts = array("q", [0]) * self._size
+
+    def _reset(self, slot: int) -> None:
+        self._sums[slot] = 0.0
+        self._counts[slot] = 0
+
+    def record(
+        self, duration: float, weight: int = 1, now: float | None = None
+    ) -> None:
+        slot = self._current(now)
+        self._sums[slot] += duration * weight
+        self._counts[slot] += weight
+
+    def calculate(self) -> tuple[float, ...]:
+        averages: list[float] = []
+        total, count = 0.0, 0
+        for slots in self._iter_windows():
+            for slot in slots:
+                total += self._sums[slot]
+                count += self._counts[slot]
+
+            averages.append(total / count if count else float("nan"))
+
+        return tuple(averages)
+
+
+class Histogram:
+    """Log-bucketed histogram of durations like HDR Histogram or DDSketch
+
+    A duration is counted in the bin `ceil(log(duration / min_value, gamma))`
+    so that any quantile is estimated within the relative `accuracy`. The
+    bins are fixed, hence histograms can be merged by adding them up.
+
+    The bins are 32-bit by default, which is plenty for a time window. Pass
+    `typecode="Q"` for 64-bit bins if the histogram is never cleared.
+    """
+
+    accuracy: ClassVar[float] = 0.05
+    min_value: ClassVar[float] = 1e-5
+    max_value: ClassVar[float] = 1e2
+    gamma: ClassVar[float] = (1 + accuracy) / (1 - accuracy)
+    size: ClassVar[int] = ceil(log(max_value / min_value, gamma)) + 1
+    _scale: ClassVar[float] = 1 / log(gamma)
+    _offset: ClassVar[float] = log(min_value) * _scale
+
+    __slots__ = ("bins", "count", "sum", "max")
+
+    def __init__(self, typecode: str = "I") -> None:
+        self.bins = array(typecode, [0]) * self.size
+        self.count = 0
+        self.sum = 0.0
+        self.max = float("nan")
+
+    @classmethod
+    def index(cls, duration: float) -> int:
+        if duration <= cls.min_value:
+            return 0
+        index = ceil(log(duration) * cls._scale - cls._offset)
+        return index if index < cls.size else cls.size - 1
+
+    @classmethod
+    def value(cls, index: int) -> float:
+        """Return the representative duration of the given bin"""
+
+        if index == 0:
+            return cls.min_value
+        return cls.min_value * cls.gamma**index * 2 / (1 + cls.gamma)
+
+    def clear(self) -> None:
+        self.bins[:] = array(self.bins.typecode, [0]) * self.size
+        self.count = 0
+        self.sum = 0.0
+        self.max = float("nan")
+
+    def add(self, duration: float, weight: int = 1) -> None:
+        self.add_index(self.index(duration), duration, weight)
+
+    def add_index(self, index: int, duration: float, weight: int = 1) -> None:
+        """Add the duration already resolved to the bin of the index"""
+
+        self.bins[index] += weight
+        self.count += weight
+        self.sum += duration * weight
+        if not duration <= self.max:  # Also true if self.max is NaN
+            self.max = duration
+
+    def merge(self, other: "Histogram") -> None:
+        if not other.count:
+            return
+
+        for index, count in enumerate(other.bins):
+            if count:
+                self.bins[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        if not other.max <= self.max:
+            self.max = other.max
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return float("nan")
+
+        rank = q * (self.count - 1)
+        cumulative = 0
+        for index, count in enumerate(self.bins):
+            cumulative += count
+            if cumulative > rank:
+                return min(self.value(index), self.max)
+
+        return self.max
+
+
+class LatencySketch(TimeRing):
+    """Histograms of durations over the last 1, 5 and 15 minutes"""
+
+    def __init__(self, resolution: int = 30) -> None:
+        super().__init__(resolution)
+        self._histograms = [Histogram() for _ in range(self._size)]
+
+    def _reset(self, slot: int) -> None:
+        self._histograms[slot].clear()
+
+    def record(
+        self, duration: float, weight: int = 1, now: float | None = None
+    ) -> None:
+        self._histograms[self._current(now)].add(duration, weight)
+
+    def add_index(
+        self,
+        index: int,
+        duration: float,
+        weight: int = 1,
+        now: float | None = None,
+    ) -> None:
+        """Record the duration already resolved to the bin of the index"""
+
+        self._histograms[self._current(now)].add_index(index, duration, weight)
+
+    def calculate(self) -> tuple[Histogram, ...]:
+        histograms: list[Histogram] = []
+        merged = Histogram()
+        for slots in self._iter_windows():
+            for slot in slots:
+                merged.merge(self._histograms[slot])
+
+            histograms.append(Histogram())
+            histograms[-1].merge(merged)
+
+        return tuple(histograms)
+
+
+class Outcomes(TimeRing):
+    """Counts of the outcomes of requests in total and over time windows
+
+    The outcomes are the classes of the status code, the unhandled exceptions
+    and the cancellations. The counts are kept in flat integer arrays so that
+    recording an outcome allocates nothing.
+    """
+
+    labels: ClassVar[tuple[str, ...]] = (
+        "1xx",
+        "2xx",
+        "3xx",
+        "4xx",
+        "5xx",
+        "unhandled",
+        "cancelled",
+    )
+    UNHANDLED: ClassVar[int] = 5
+    CANCELLED: ClassVar[int] = 6
+
+    def __init__(self, resolution: int = 5) -> None:
+        super().__init__(resolution)
+        self.totals = array("q", [0]) * len(self.labels)
+        self._counts = array("q", [0]) * (self._size * len(self.labels))
+
+    @staticmethod
+    def of_status(status: int) -> int:
+        return min(max(status // 100, 1), 5) - 1
+
+    def _reset(self, slot: int) -> None:
+        start = slot * len(self.labels)
+        for index in range(start, start + len(self.labels)):
+            self._counts[index] = 0
+
+    def record(self, outcome: int, now: float | None = None) -> None:
+        self._counts[self._current(now) * len(self.labels) + outcome] += 1
+        self.totals[outcome] += 1
+
+    def calculate(self) -> tuple[tuple[float, ...], ...]:
+        """Return the rates per second of the outcomes over each window"""
+
+        rates: list[tuple[float, ...]] = []
+        counts = [0] * len(self.labels)
+        for window, slots in zip(self.windows, self._iter_windows()):
+            for slot in slots:
+                start = slot * len(self.labels)
+                for outcome in range(len(self.labels)):
+                    counts[outcome] += self._counts[start + outcome]
+
+            rates.append(tuple(count / window for count in counts))
+
+        return tuple(rates)
+
+
+class Throughput(TimeRing):
+    """Bytes received and sent in total and over time windows"""
+
+    def __init__(self, resolution: int = 5) -> None:
+        super().__init__(resolution)
+        self.total_in = 0
+        self.total_out = 0
+        self._in = array("q", [0]) * self._size
+        self._out = array("q", [0]) * self._size
+
+    def _reset(self, slot: int) -> None:
+        self._in[slot] = 0
+        self._out[slot] = 0
+
+    def record(
+        self, bytes_in: int, bytes_out: int, now: float | None = None
+    ) -> None:
+        slot = self._current(now)
+        self._in[slot] += bytes_in
+        self._out[slot] += bytes_out
+        self.total_in += bytes_in
+        self.total_out += bytes_out
+
+    def calculate(self) -> tuple[tuple[float, float], ...]:
+        """Return the bytes per second received and sent over each window"""
+
+        rates: list[tuple[float, float]] = []
+        bytes_in, bytes_out = 0, 0
+        for window, slots in zip(self.windows, self._iter_windows()):
+            for slot in slots:
+                bytes_in += self._in[slot]
+                bytes_out += self._out[slot]
+
+            rates.append((bytes_in / window, bytes_out / window))
+
+        return tuple(rates)
 
 
 @dataclass
 class Counter:
     active: int = 0
     total: int = 0
+    queued: int = 0
+    rejected: int = 0
+    throttled: int = 0
+    shed: int = 0
+    timeouts: int = 0
+    short_circuited: int = 0
+    http_exceptions: int = 0
 
 
 @dataclass(frozen=True)
 class RouteStats:
     counter: Counter = field(default_factory=Counter)
     time_avg: TimeAverage = field(default_factory=TimeAverage)
+    latency: LatencySketch = field(default_factory=LatencySketch)
+    outcomes: Outcomes = field(default_factory=Outcomes)
+    throughput: Throughput = field(default_factory=Throughput)
+    # Never reset unlike the latency above, i.e. a cumulative histogram
+    lifetime: Histogram = field(default_factory=lambda: Histogram("Q"))
+
+    def record(
+        self, duration: float, weight: int = 1, now: float | None = None
+    ) -> None:
+        """Record the duration of a request standing for `weight` requests"""
+
+        index = Histogram.index(duration)
+        self.time_avg.record(duration, weight, now)
+        self.latency.add_index(index, duration, weight, now)
+        self.lifetime.add_index(index, duration, weight)
+
+
+class StatsSnapshot:
+    """Stats rebuilt at most once per interval and shared between requests"""
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self._built_at = float("-inf")
+        self._stats: Any = None
+
+    def get(self, build: Callable[[], Any]) -> Any:
+        now = monotonic()
+        if now - self._built_at >= self.interval:
+            self._stats = build()
+            self._built_at = now
+
+        return self._stats
@@ -0,0 +1,195 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from aiohttp_underscore_apis.admission import (
+    BreakerState,
+    CircuitBreaker,
+    ConcurrencyLimiter,
+    LoadShedder,
+    TokenBucket,
+)
+
+
+class ConcurrencyLimiterTest(IsolatedAsyncioTestCase):
+    async def test_fifo(self):
+        limiter = ConcurrencyLimiter()
+        limiter.configure(max_active=1, max_queue=2, queue_timeout=None)
+
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+
+        first = asyncio.create_task(limiter.wait())
+        second = asyncio.create_task(limiter.wait())
+        await asyncio.sleep(0)
+        self.assertFalse(await limiter.wait())  # The queue is full
+
+        limiter.release()
+        self.assertTrue(await first)
+        self.assertFalse(second.done())
+
+        limiter.release()
+        self.assertTrue(await second)
+
+        limiter.release()
+        self.assertEqual(limiter.active, 0)
+
+    async def test_timeout(self):
+        limiter = ConcurrencyLimiter()
+        limiter.configure(max_active=1, max_queue=1, queue_timeout=0.01)
+
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(await limiter.wait())
+
+        limiter.release()
+        self.assertEqual(limiter.active, 0)
+
+    async def test_cancel(self):
+        limiter = ConcurrencyLimiter()
+        limiter.configure(max_active=1, max_queue=1, queue_timeout=None)
+
+        self.assertTrue(limiter.try_acquire())
+        waiter = asyncio.create_task(limiter.wait())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        limiter.release()  # Must skip the cancelled waiter
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+        self.assertEqual(limiter.active, 0)
+        self.assertTrue(limiter.try_acquire())
+
+    async def test_configure(self):
+        limiter = ConcurrencyLimiter()
+        limiter.configure(max_active=1, max_queue=1, queue_timeout=None)
+
+        self.assertTrue(limiter.try_acquire())
+        waiter = asyncio.create_task(limiter.wait())
+        await asyncio.sleep(0)
+
+        # Raising the limit admits the queued request
+        limiter.configure(max_active=2, max_queue=1, queue_timeout=None)
+        self.assertTrue(await waiter)
+        self.assertEqual(limiter.active, 2)
+
+
+class TokenBucketTest(TestCase):
+    def test_try_acquire(self):
+        with patch("aiohttp_underscore_apis.admission.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            bucket = TokenBucket()
+            bucket.configure(rate=2.0, burst=3.0)
+
+            for _ in range(3):
+                self.assertEqual(bucket.try_acquire(), 0.0)
+            self.assertEqual(bucket.try_acquire(), 0.5)
+
+            monotonic.return_value = 100.25
+            self.assertEqual(bucket.try_acquire(), 0.25)
+
+            monotonic.return_value = 100.5
+            self.assertEqual(bucket.try_acquire(), 0.0)
+            self.assertEqual(bucket.tokens, 0.0)
+
+            monotonic.return_value = 200.0
+            self.assertEqual(bucket.tokens, 3.0)
+
+    def test_default_burst(self):
+        bucket = TokenBucket()
+        bucket.configure(rate=0.5, burst=None)
+        self.assertEqual(bucket.burst, 1.0)
+
+
+class LoadShedderTest(TestCase):
+    def test_should_shed(self):
+        with patch("aiohttp_underscore_apis.admission.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            shedder = LoadShedder()
+            shedder.configure(
+                target=0.1, interval=1.0, step=0.25, max_drop_rate=0.5
+            )
+            self.assertFalse(shedder.should_shed())
+
+            # Even the minimum latency exceeds the target for 3 intervals
+            for now in (101.0, 102.0, 103.0):
+                shedder.observe(0.3)
+                shedder.observe(0.2)
+                monotonic.return_value = now
+                shedder.should_shed()
+
+            self.assertEqual(shedder.drop_rate, 0.5)
+            shed = [shedder.should_shed() for _ in range(10)]
+            self.assertEqual(shed.count(True), 5)
+
+            # The latency has recovered
+            shedder.observe(0.05)
+            monotonic.return_value = 104.0
+            shedder.should_shed()
+            self.assertEqual(shedder.drop_rate, 0.25)
+
+            for now in (105.0, 106.0, 107.0, 108.0, 109.0):
+                monotonic.return_value = now
+                shedder.should_shed()
+            self.assertEqual(shedder.drop_rate, 0.0)
+            self.assertFalse(any(shedder.should_shed() for _ in range(9)))
+
+
+class CircuitBreakerTest(TestCase):
+    def test_trip_and_recover(self):
+        with patch("aiohttp_underscore_apis.admission.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            breaker = CircuitBreaker()
+            breaker.configure(
+                error_rate=0.5,
+                latency=None,
+                min_requests=4,
+                window=10.0,
+                open_duration=30.0,
+                half_open_probes=2,
+            )
+
+            for failed in (True, False, True):
+                self.assertIs(breaker.allow(), False)
+                breaker.record(False, failed)
+            self.assertIs(breaker.state, BreakerState.CLOSED)
+
+            breaker.record(breaker.allow(), True)
+            self.assertIs(breaker.state, BreakerState.OPEN)
+            self.assertIsNone(breaker.allow())
+
+            # Half-open once the open duration has passed
+            monotonic.return_value = 130.0
+            self.assertIs(breaker.allow(), True)
+            self.assertIs(breaker.allow(), True)
+            self.assertIsNone(breaker.allow())
+            self.assertIs(breaker.state, BreakerState.HALF_OPEN)
+
+            breaker.record(True, True)
+            self.assertIs(breaker.state, BreakerState.OPEN)
+            self.assertEqual(breaker.trips, 2)
+
+            monotonic.return_value = 160.0
+            breaker.cancel(breaker.allow())
+            for _ in range(2):
+                breaker.record(breaker.allow(), False)
+            self.assertIs(breaker.state, BreakerState.CLOSED)
+
+    def test_window(self):
+        with patch("aiohttp_underscore_apis.admission.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            breaker = CircuitBreaker()
+            breaker.configure(
+                error_rate=0.5,
+                latency=None,
+                min_requests=2,
+                window=10.0,
+                open_duration=30.0,
+                half_open_probes=1,
+            )
+
+            breaker.record(False, True)
+            monotonic.return_value = 110.0
+            breaker.record(False, False)  # The failure above has expired
+            self.assertIs(breaker.state, BreakerState.CLOSED)
+            self.assertEqual(breaker.current_error_rate, 0.0)
@@ -0,0 +1,187 @@
+from asyncio import CancelledError, Event, create_task, gather, sleep
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_underscore_apis.cache import (
+    CacheBudget,
+    CapturedResponse,
+    ResponseCache,
+    SingleFlight,
+)
+
+
+def captured(text: str) -> CapturedResponse:
+    response = CapturedResponse.capture(web.Response(text=text))
+    assert response is not None
+    return response
+
+
+class CapturedResponseTest(TestCase):
+    def test_capture(self):
+        response = web.Response(
+            status=201, text="foo", headers={"X-Foo": "bar"}
+        )
+        response.set_cookie("session", "secret")
+
+        captured = CapturedResponse.capture(response)
+        assert captured is not None
+        self.assertEqual(captured.status, 201)
+        self.assertEqual(captured.body, b"foo")
+        self.assertNotIn("Set-Cookie", captured.headers)
+
+        replayed = captured.response()
+        self.assertEqual(replayed.status, 201)
+        self.assertEqual(replayed.text, "foo")
+        self.assertEqual(replayed.headers["X-Foo"], "bar")
+        self.assertEqual(replayed.content_type, "text/plain")
+
+    def test_capture_stream_response(self):
+        self.assertIsNone(CapturedResponse.capture(web.StreamResponse()))
+
+
+class ResponseCacheTest(TestCase):
+    def test_lru(self):
+        cache = ResponseCache(CacheBudget(max_bytes=1024))
+        cache.configure(ttl=60, max_entries=2, vary=[])
+
+        cache.put("a", captured("a"))
+        cache.put("b", captured("b"))
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", captured("c"))  # Evicts "b"
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").text, "a")
+        self.assertEqual(cache.get("c").text, "c")
+        self.assertEqual(
+            (cache.hits, cache.misses, cache.evictions), (3, 1, 1)
+        )
+
+    def test_ttl(self):
+        cache = ResponseCache(CacheBudget(max_bytes=1024))
+        cache.configure(ttl=10, max_entries=10, vary=[])
+
+        with patch("aiohttp_underscore_apis.cache.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            cache.put("a", captured("a"))
+
+            monotonic.return_value = 109.0
+            self.assertIsNotNone(cache.get("a"))
+
+            monotonic.return_value = 110.0
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(len(cache), 0)
+            self.assertEqual(cache.budget.used_bytes, 0)
+
+    def test_budget(self):
+        size = captured("a").size
+        budget = CacheBudget(max_bytes=size * 2)
+        cache1, cache2 = ResponseCache(budget), ResponseCache(budget)
+        cache1.configure(ttl=60, max_entries=10, vary=[])
+        cache2.configure(ttl=60, max_entries=10, vary=[])
+
+        cache1.put("a", captured("a"))
+        cache2.put("b", captured("b"))
+        cache1.get("a")
+        cache2.put("c", captured("c"))  # Evicts "b" of cache2
+
+        self.assertEqual((len(cache1), len(cache2)), (1, 1))
+        self.assertEqual(cache2.evictions, 1)
+        self.assertEqual(budget.used_bytes, size * 2)
+
+        cache1.clear()
+        cache2.clear()
+        self.assertEqual(budget.used_bytes, 0)
+
+
+class SingleFlightTest(IsolatedAsyncioTestCase):
+    async def test_share(self):
+        flights, release, calls = SingleFlight(), Event(), []
+
+        async def call():
+            calls.append(None)
+            await release.wait()
+            return web.Response(text="shared")
+
+        tasks = [create_task(flights.run("a", call)) for _ in range(3)]
+        await sleep(0)
+        release.set()
+
+        responses = await gather(*tasks)
+        self.assertEqual([r.text for r in responses], ["shared"] * 3)
+        self.assertEqual(len({id(r) for r in responses}), 3)
+        self.assertEqual((len(calls), flights.followers), (1, 2))
+        self.assertFalse(flights._flights)
+
+    async def test_exception(self):
+        flights, release = SingleFlight(), Event()
+
+        async def call():
+            await release.wait()
+            raise RuntimeError("boom")
+
+        tasks = [create_task(flights.run("a", call)) for _ in range(2)]
+        await sleep(0)
+        release.set()
+
+        leader, follower = await gather(*tasks, return_exceptions=True)
+        self.assertIsInstance(leader, RuntimeError)
+        self.assertIsInstance(follower, RuntimeError)
+        self.assertIsNot(follower, leader)
+        self.assertIs(follower.__cause__, leader)
+        self.assertEqual(follower.args, ("boom",))
+
+    async def test_exception_not_copyable(self):
+        class Error(Exception):
+            def __init__(self, a, b):
+                super().__init__(a)
+
+        flights, release = SingleFlight(), Event()
+
+        async def call():
+            await release.wait()
+            raise Error("a", "b")
+
+        tasks = [create_task(flights.run("a", call)) for _ in range(2)]
+        await sleep(0)
+        release.set()
+
+        leader, follower = await gather(*tasks, return_exceptions=True)
+        self.assertIsInstance(leader, Error)
+        self.assertIsInstance(follower, RuntimeError)
+        self.assertIs(follower.__cause__, leader)
+
+    def test_key(self):
+        def key(headers, vary=()):
+            request = make_mocked_request("GET", "/?a", headers=headers)
+            return SingleFlight.key(request, vary)
+
+        self.assertEqual(key({}), key({"X-Foo": "foo"}))
+        self.assertNotEqual(key({}), key({"Authorization": "Basic Zm9v"}))
+        self.assertNotEqual(key({}), key({"Cookie": "a=b"}))
+        self.assertNotEqual(
+            key({}, ["X-Foo"]), key({"X-Foo": "foo"}, ["X-Foo"])
+        )
+
+    async def test_leader_cancelled(self):
+        flights, release, calls = SingleFlight(), Event(), []
+
+        async def call():
+            calls.append(None)
+            await release.wait()
+            return web.Response(text=str(len(calls)))
+
+        leader = create_task(flights.run("a", call))
+        await sleep(0)
+        follower = create_task(flights.run("a", call))
+        await sleep(0)
+
+        leader.cancel()
+        with self.assertRaises(CancelledError):
+            await leader
+        release.set()
+
+        self.assertEqual((await follower).text, "2")
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,66 @@
+import os
+from functools import partial
+from tempfile import TemporaryDirectory
+from unittest import IsolatedAsyncioTestCase
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from aiohttp_underscore_apis import AiohttpUnderscoreApis
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response()
+
+
+class AiohttpUnderscoreApisTest(IsolatedAsyncioTestCase):
+    async def test_listener(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, "apis.sock")
+
+        # As in the README, where on_startup is frozen by the time the
+        # listener in the cleanup context runs
+        apis = AiohttpUnderscoreApis(
+            site_factories=[partial(web.UnixSite, path=path)]
+        )
+        app = web.Application(middlewares=apis.middlewares)
+        app.router.add_get("/", handler, allow_head=False)
+        app.cleanup_ctx.append(apis.listener)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+        await client.get("/")
+
+        connector = aiohttp.UnixConnector(path=path)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async with session.get(
+                "http://localhost/_cat/routes",
+                params={"format": "json", "h": "id,stats.req.total"},
+            ) as response:
+                self.assertEqual(response.status, 200)
+                self.assertEqual(
+                    await response.json(), [{"id": 0, "stats.req.total": 1}]
+                )
+
+    async def test_subapps(self):
+        apis = AiohttpUnderscoreApis()
+        app = web.Application(middlewares=apis.middlewares)
+        app.router.add_get("/", handler, allow_head=False)
+        for name, subapp in apis.init_subapps(app).items():
+            app.add_subapp(f"/{name}", subapp)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+        await client.get("/")
+
+        response = await client.get(
+            "/_cat/routes",
+            params={"format": "json", "h": "path,stats.req.total"},
+        )
+        self.assertIn(
+            {"path": "/", "stats.req.total": 1}, await response.json()
+        )
@@ -0,0 +1,127 @@
+import os
+import sys
+from functools import partial
+from tempfile import TemporaryDirectory
+from unittest import IsolatedAsyncioTestCase, skipIf
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from aiohttp_underscore_apis import AiohttpUnderscoreApis
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response()
+
+
+class GatewayTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+
+        self.sockets = []
+        for worker in range(2):
+            path = os.path.join(tmpdir.name, f"{worker}.sock")
+            self.sockets.append(path)
+
+            apis = AiohttpUnderscoreApis(
+                site_factories=[partial(web.UnixSite, path=path)]
+            )
+            app = web.Application(middlewares=apis.middlewares)
+            app.router.add_get("/", handler, allow_head=False)
+            app.cleanup_ctx.append(apis.listener)
+
+            client = TestClient(TestServer(app))
+            await client.start_server()
+            self.addAsyncCleanup(client.close)
+            for _ in range(worker + 1):
+                await client.get("/")
+
+        gateway = AiohttpUnderscoreApis.gateway(
+            [*self.sockets, os.path.join(tmpdir.name, "gone.sock")]
+        )
+        self.client = TestClient(TestServer(gateway))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_cat(self):
+        response = await self.client.get(
+            "/_cat/routes",
+            params={"format": "json", "h": "worker,id,stats.req.total"},
+        )
+        self.assertEqual(response.status, 200)
+        self.assertTrue(
+            response.headers["X-Failed-Workers"].endswith("gone.sock")
+        )
+        self.assertEqual(
+            await response.json(),
+            [
+                {"worker": self.sockets[0], "id": 0, "stats.req.total": 1},
+                {"worker": self.sockets[1], "id": 0, "stats.req.total": 2},
+            ],
+        )
+
+        # Sorted after the merge
+        response = await self.client.get(
+            "/_cat/routes",
+            params={
+                "format": "json",
+                "h": "worker",
+                "s": "stats.req.total:desc",
+            },
+        )
+        self.assertEqual(
+            await response.json(),
+            [{"worker": self.sockets[1]}, {"worker": self.sockets[0]}],
+        )
+
+    async def test_settings_broadcast(self):
+        response = await self.client.put(
+            "/_routes/0/settings",
+            json={"transient": {"concurrency": {"max_active": 3}}},
+        )
+        self.assertEqual(response.status, 200)
+
+        response = await self.client.get("/_routes/settings")
+        self.assertEqual(response.status, 200)
+        merged = await response.json()
+        for socket in self.sockets:
+            self.assertEqual(
+                merged[socket],
+                {"0": {"transient": {"concurrency": {"max_active": 3}}}},
+            )
+        self.assertIn("error", merged[response.headers["X-Failed-Workers"]])
+
+
+class GatewayHotTasksTest(IsolatedAsyncioTestCase):
+    @skipIf(
+        (3, 12) <= sys.version_info < (3, 14),
+        "aiohttp creates the request tasks bypassing the task factory",
+    )
+    async def test_interval_beyond_timeout(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, "0.sock")
+
+        apis = AiohttpUnderscoreApis(
+            site_factories=[partial(web.UnixSite, path=path)],
+            instrument_tasks=True,
+        )
+        app = web.Application(middlewares=apis.middlewares)
+        app.cleanup_ctx.append(apis.listener)
+        worker = TestClient(TestServer(app))
+        await worker.start_server()
+        self.addAsyncCleanup(worker.close)
+
+        client = TestClient(
+            TestServer(AiohttpUnderscoreApis.gateway([path], timeout=0.1))
+        )
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+
+        response = await client.get(
+            "/_cat/hot_tasks",
+            params={"format": "json", "h": "worker", "interval": "0.2s"},
+        )
+        self.assertEqual(response.status, 200)
+        self.assertNotIn("X-Failed-Workers", response.headers)
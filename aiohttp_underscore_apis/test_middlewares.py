@@ -0,0 +1,434 @@
+import asyncio
+from collections.abc import Iterable
+from dataclasses import asdict
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from aiohttp.typedefs import Handler
+
+from aiohttp_underscore_apis import AiohttpUnderscoreApis
+from aiohttp_underscore_apis.context import Context
+from aiohttp_underscore_apis.registry import RouteRegistry
+from aiohttp_underscore_apis.settings import RouteSettings
+from aiohttp_underscore_apis.stats import RouteStats
+
+BODY = b"x" * 10000
+SETUPS = ({"fuse_middlewares": False}, {"fuse_middlewares": True})
+
+
+async def plain(request: web.Request) -> web.Response:
+    return web.Response(body=BODY)
+
+
+async def streamed(request: web.Request) -> web.StreamResponse:
+    response = web.StreamResponse()
+    await response.prepare(request)
+    await response.write(BODY[:4000])
+    await response.write(BODY[4000:])
+    return response  # Finished by aiohttp
+
+
+async def finished(request: web.Request) -> web.StreamResponse:
+    response = web.StreamResponse()
+    await response.prepare(request)
+    await response.write(BODY[:4000])
+    await response.write_eof(BODY[4000:])
+    return response
+
+
+class MiddlewaresTestCase(IsolatedAsyncioTestCase):
+    async def client_of(
+        self, routes: Iterable[tuple[str, Handler]], **kwargs: Any
+    ) -> TestClient:
+        apis = AiohttpUnderscoreApis(**kwargs)
+        app = web.Application(middlewares=apis.middlewares)
+        for path, handler in routes:
+            app.router.add_get(path, handler, allow_head=False)
+        for name, subapp in apis.init_subapps(app).items():
+            app.add_subapp(f"/{name}", subapp)
+
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+        return client
+
+    @staticmethod
+    def registry_of(client: TestClient) -> RouteRegistry:
+        return Context.get_from(client.app).registry
+
+    async def route_of(
+        self, handler: Handler, transient: dict[str, Any], **kwargs: Any
+    ) -> tuple[TestClient, RouteStats, RouteSettings]:
+        """Return the client of the route configured with the settings"""
+
+        client = await self.client_of([("/", handler)], **kwargs)
+        registry = self.registry_of(client)
+        registry.settings[0].update(transient)
+        return client, registry.stats[0], registry.settings[0]
+
+
+class ThroughputTest(MiddlewaresTestCase):
+    async def test_bytes_out(self):
+        routes = [
+            ("/plain", plain),
+            ("/streamed", streamed),
+            ("/finished", finished),
+        ]
+        for fuse_middlewares in (False, True):
+            with self.subTest(fuse_middlewares=fuse_middlewares):
+                client = await self.client_of(
+                    routes, fuse_middlewares=fuse_middlewares
+                )
+                for path, _ in routes:
+                    response = await client.get(path)
+                    self.assertEqual(await response.read(), BODY)
+
+                registry = self.registry_of(client)
+                self.assertEqual(
+                    [
+                        registry.stats[slot].throughput.total_out
+                        for slot in range(len(routes))
+                    ],
+                    [len(BODY)] * len(routes),
+                )
+
+
+class FusedMiddlewareTest(MiddlewaresTestCase):
+    async def observe(self, fuse_middlewares: bool) -> list[Any]:
+        """Return what is observable of the requests through the setup"""
+
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow(request: web.Request) -> web.Response:
+            started.set()
+            await release.wait()
+            return web.Response()
+
+        async def missing(request: web.Request) -> web.Response:
+            raise web.HTTPNotFound()
+
+        client = await self.client_of(
+            [("/plain", plain), ("/slow", slow), ("/missing", missing)],
+            fuse_middlewares=fuse_middlewares,
+        )
+        registry = self.registry_of(client)
+        observed: list[Any] = []
+
+        async def get(path: str) -> None:
+            response = await client.get(path)
+            observed.append(
+                (path, response.status, response.reason, await response.read())
+            )
+
+        await get("/plain")
+        await get("/missing")
+
+        request = asyncio.create_task(get("/slow"))
+        await started.wait()
+        (task,) = registry.tasks_of({1})
+        observed.append(
+            (registry.stats[1].counter.active, registry.tasks[task][0])
+        )
+        release.set()
+        await request
+        observed.append(len(registry.tasks_of({1})))
+
+        registry.settings[0].update(
+            {"preempt": {"status": 503, "reason": "Down", "text": "Later"}}
+        )
+        await get("/plain")
+
+        for stats in registry.stats[:3]:
+            observed.append(
+                (
+                    asdict(stats.counter),
+                    list(stats.outcomes.totals),
+                    stats.lifetime.count,
+                    stats.throughput.total_out,
+                )
+            )
+
+        return observed
+
+    async def test_same_as_separate(self):
+        separate = await self.observe(fuse_middlewares=False)
+        fused = await self.observe(fuse_middlewares=True)
+
+        self.assertEqual(fused, separate)
+        self.assertIn(("/plain", 503, "Down", b"Later"), fused)
+        self.assertIn((1, 1), fused)
+
+
+class ConcurrencyTest(MiddlewaresTestCase):
+    async def test_queue_and_reject(self):
+        release = asyncio.Event()
+
+        async def slow(request: web.Request) -> web.Response:
+            await release.wait()
+            return web.Response(text="done")
+
+        for setup in SETUPS:
+            release.clear()
+            with self.subTest(**setup):
+                client, stats, settings = await self.route_of(
+                    slow,
+                    {"concurrency": {"max_active": 1, "max_queue": 1}},
+                    **setup,
+                )
+
+                active = asyncio.create_task(client.get("/"))
+                queued = asyncio.create_task(client.get("/"))
+                while not stats.counter.queued:
+                    await asyncio.sleep(0.001)
+
+                response = await client.get("/")
+                self.assertEqual(response.status, 503)
+                self.assertEqual(
+                    await response.text(), "Too many concurrent requests"
+                )
+                self.assertEqual(stats.counter.rejected, 1)
+
+                release.set()
+                for request in (active, queued):
+                    response = await request
+                    self.assertEqual(response.status, 200)
+                    self.assertEqual(await response.text(), "done")
+                self.assertEqual(stats.counter.queued, 0)
+                self.assertEqual(settings.concurrency.active, 0)
+
+
+class RateLimitTest(MiddlewaresTestCase):
+    async def test_throttle(self):
+        for setup in SETUPS:
+            with self.subTest(**setup):
+                client, stats, _ = await self.route_of(
+                    plain, {"rate_limit": {"rate": 0.5, "burst": 1}}, **setup
+                )
+
+                response = await client.get("/")
+                self.assertEqual(response.status, 200)
+
+                response = await client.get("/")
+                self.assertEqual(response.status, 429)
+                self.assertEqual(response.headers["Retry-After"], "2")
+                self.assertEqual(await response.text(), "Too many requests")
+                self.assertEqual(stats.counter.throttled, 1)
+
+
+class SheddingTest(MiddlewaresTestCase):
+    async def test_shed(self):
+        async def slow(request: web.Request) -> web.Response:
+            await asyncio.sleep(0.02)
+            return web.Response()
+
+        shedding = {"target": 0.001, "interval": 0.01, "step": 1.0}
+        for setup in SETUPS:
+            with self.subTest(**setup):
+                client, stats, settings = await self.route_of(
+                    slow, {"adaptive_shedding": shedding}, **setup
+                )
+
+                # Every request takes longer than an interval and the target
+                statuses = []
+                while 503 not in statuses and len(statuses) < 10:
+                    response = await client.get("/")
+                    statuses.append(response.status)
+
+                self.assertEqual(statuses[-1], 503)
+                self.assertEqual(await response.text(), "Route is overloaded")
+                self.assertEqual(stats.counter.shed, 1)
+                self.assertGreater(settings.shedding.drop_rate, 0)
+
+
+class CacheTest(MiddlewaresTestCase):
+    async def test_hit(self):
+        calls = 0
+
+        async def count(request: web.Request) -> web.Response:
+            nonlocal calls
+            calls += 1
+            return web.Response(text=f"{calls}", headers={"X-Foo": "foo"})
+
+        for setup in SETUPS:
+            calls = 0
+            with self.subTest(**setup):
+                client, _, settings = await self.route_of(
+                    count, {"cache": {"ttl": 60}}, **setup
+                )
+
+                for path, expected in (("/", "1"), ("/", "1"), ("/?a", "2")):
+                    response = await client.get(path)
+                    self.assertEqual(response.status, 200)
+                    self.assertEqual(await response.text(), expected)
+                    self.assertEqual(response.headers["X-Foo"], "foo")
+
+                self.assertEqual(calls, 2)
+                self.assertEqual(settings.response_cache.hits, 1)
+
+    async def test_credentials(self):
+        async def whoami(request: web.Request) -> web.Response:
+            return web.Response(text=request.headers.get("Authorization", ""))
+
+        for setup in SETUPS:
+            with self.subTest(**setup):
+                client, _, settings = await self.route_of(
+                    whoami, {"cache": {"ttl": 60}}, **setup
+                )
+
+                for user in ("Basic YQ==", "Basic Yg==", "Basic YQ=="):
+                    response = await client.get(
+                        "/", headers={"Authorization": user}
+                    )
+                    self.assertEqual(await response.text(), user)
+                self.assertEqual(settings.response_cache.hits, 1)
+                self.assertEqual(len(settings.response_cache), 2)
+
+
+class CoalesceTest(MiddlewaresTestCase):
+    async def test_followers(self):
+        release = asyncio.Event()
+        calls = 0
+
+        async def slow(request: web.Request) -> web.Response:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return web.Response(text=f"{calls}")
+
+        for setup in SETUPS:
+            release.clear()
+            calls = 0
+            with self.subTest(**setup):
+                client, _, settings = await self.route_of(
+                    slow, {"coalesce": {"enabled": True}}, **setup
+                )
+
+                requests = [
+                    asyncio.create_task(client.get("/")) for _ in range(3)
+                ]
+                while settings.single_flight.followers < 2:
+                    await asyncio.sleep(0.001)
+                release.set()
+
+                for request in requests:
+                    response = await request
+                    self.assertEqual(response.status, 200)
+                    self.assertEqual(await response.text(), "1")
+                self.assertEqual(calls, 1)
+
+    async def test_credentials(self):
+        release = asyncio.Event()
+
+        async def whoami(request: web.Request) -> web.Response:
+            await release.wait()
+            return web.Response(text=request.headers.get("Cookie", ""))
+
+        for setup in SETUPS:
+            release.clear()
+            with self.subTest(**setup):
+                client, _, settings = await self.route_of(
+                    whoami, {"coalesce": {"enabled": True}}, **setup
+                )
+
+                cookies = ["user=a", "user=b", "user=a"]
+                requests = [
+                    asyncio.create_task(
+                        client.get("/", headers={"Cookie": cookie})
+                    )
+                    for cookie in cookies
+                ]
+                while settings.single_flight.followers < 1:
+                    await asyncio.sleep(0.001)
+                release.set()
+
+                for request, cookie in zip(requests, cookies):
+                    response = await request
+                    self.assertEqual(await response.text(), cookie)
+                self.assertEqual(settings.single_flight.followers, 1)
+
+
+class TimeoutTest(MiddlewaresTestCase):
+    async def test_expire(self):
+        async def slow(request: web.Request) -> web.Response:
+            await asyncio.sleep(10)
+            return web.Response()
+
+        for setup in SETUPS:
+            with self.subTest(**setup):
+                client, stats, _ = await self.route_of(
+                    slow, {"timeout": {"seconds": 0.01}}, **setup
+                )
+
+                response = await client.get("/")
+                self.assertEqual(response.status, 504)
+                self.assertEqual(await response.text(), "Request timed out")
+                self.assertEqual(stats.counter.timeouts, 1)
+                self.assertEqual(stats.counter.active, 0)
+
+    async def test_cancellation_swallowed(self):
+        async def stubborn(request: web.Request) -> web.Response:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                pass
+            return web.Response(text="done")
+
+        cancelling = []
+
+        @web.middleware
+        async def outer(request: web.Request, handler: Handler):
+            response = await handler(request)
+            cancelling.append(asyncio.current_task().cancelling())
+            return response
+
+        for setup in SETUPS:
+            cancelling.clear()
+            with self.subTest(**setup):
+                apis = AiohttpUnderscoreApis(**setup)
+                app = web.Application(middlewares=[outer, *apis.middlewares])
+                app.router.add_get("/", stubborn, allow_head=False)
+                apis.init_subapps(app)
+
+                client = TestClient(TestServer(app))
+                await client.start_server()
+                self.addAsyncCleanup(client.close)
+                Context.get_from(app).registry.settings[0].update(
+                    {"timeout": {"seconds": 0.01}}
+                )
+
+                response = await client.get("/")
+                self.assertEqual(await response.text(), "done")
+                self.assertEqual(cancelling, [0])
+
+
+class CircuitBreakerTest(MiddlewaresTestCase):
+    async def test_short_circuit(self):
+        calls = 0
+
+        async def failing(request: web.Request) -> web.Response:
+            nonlocal calls
+            calls += 1
+            return web.Response(status=500)
+
+        breaker = {"error_rate": 0.5, "min_requests": 2}
+        for setup in SETUPS:
+            calls = 0
+            with self.subTest(**setup):
+                client, stats, settings = await self.route_of(
+                    failing, {"circuit_breaker": breaker}, **setup
+                )
+
+                for _ in range(2):
+                    response = await client.get("/")
+                    self.assertEqual(response.status, 500)
+                self.assertEqual(settings.circuit_breaker.state, "open")
+
+                response = await client.get("/")
+                self.assertEqual(response.status, 503)
+                self.assertEqual(
+                    await response.text(), "Circuit breaker is open"
+                )
+                self.assertEqual(stats.counter.short_circuited, 1)
+                self.assertEqual(calls, 2)
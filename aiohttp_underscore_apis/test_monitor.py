@@ -0,0 +1,39 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp_underscore_apis.monitor import LoopMonitor
+
+
+def block(duration: float) -> None:
+    time.sleep(duration)
+
+
+class LoopMonitorTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.monitor = LoopMonitor(interval=0.01, threshold=0.05)
+        self.monitor.start()
+        self.addCleanup(self.monitor.close)
+
+    async def test_blocking(self):
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.monitor.blocked, 0)
+
+        block(0.2)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(self.monitor.blocked, 1)
+        (event,) = self.monitor.events
+        self.assertIn("in block", event.stack[-1])
+        self.assertGreater(event.blocked, 0.05)
+        self.assertGreaterEqual(event.lag, 0.15)
+        self.assertGreaterEqual(self.monitor.max_lag, 0.15)
+        self.assertGreaterEqual(self.monitor.latency.calculate()[0].max, 0.15)
+
+    async def test_close(self):
+        self.monitor.close()
+        self.assertIsNone(self.monitor._watchdog)
+
+        block(0.1)
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.monitor.blocked, 0)
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp_underscore_apis.profiling import TimingTaskFactory
+
+
+async def hog(steps: int, duration: float) -> str:
+    for _ in range(steps - 1):
+        time.sleep(duration)
+        await asyncio.sleep(0)
+    return "done"
+
+
+async def fail() -> None:
+    raise ValueError
+
+
+class TimingTaskFactoryTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.loop = asyncio.get_running_loop()
+        self.factory = TimingTaskFactory.install(self.loop)
+        self.addCleanup(self.factory.uninstall, self.loop)
+
+    async def test_timing(self):
+        self.assertTrue(TimingTaskFactory.installed(self.loop))
+
+        task = asyncio.create_task(hog(3, 0.01))
+        self.assertEqual(await task, "done")
+
+        timing = TimingTaskFactory.timing_of(task)
+        self.assertEqual(timing.__qualname__, "hog")
+        self.assertEqual(timing.steps, 3)
+        self.assertGreaterEqual(timing.time, 0.02)
+        self.assertGreaterEqual(timing.longest, 0.01)
+        self.assertLess(timing.longest, timing.time)
+
+    async def test_exceptions(self):
+        with self.assertRaises(ValueError):
+            await asyncio.create_task(fail())
+
+        task = asyncio.create_task(asyncio.sleep(10))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(TimingTaskFactory.timing_of(task).steps, 2)
+
+    async def test_uninstall(self):
+        self.factory.uninstall(self.loop)
+        self.assertFalse(TimingTaskFactory.installed(self.loop))
+        self.assertIsNone(self.loop.get_task_factory())
+
+        task = asyncio.create_task(hog(1, 0.0))
+        self.assertIsNone(TimingTaskFactory.timing_of(task))
+        await task
@@ -0,0 +1,55 @@
+import asyncio
+from unittest import TestCase
+
+from aiohttp import web
+
+from aiohttp_underscore_apis.registry import RouteRegistry
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response()
+
+
+class RouteRegistryTest(TestCase):
+    def test_register(self):
+        app = web.Application()
+        foo = app.router.add_get("/foo", handler, allow_head=False)
+        bar = app.router.add_post("/bar", handler)
+
+        registry = RouteRegistry()
+        registry.register(app.router.routes())
+        registry.register(app.router.routes())  # Registered only once
+
+        self.assertEqual(len(registry), 2)
+        self.assertEqual(registry.slot_of(foo), 0)
+        self.assertEqual(registry.slot_of(bar), 1)
+        self.assertEqual(len(registry.stats), 2)
+        self.assertEqual(len(registry.settings), 2)
+
+        self.assertIn(1, registry)
+        self.assertNotIn(2, registry)
+        self.assertNotIn(-1, registry)
+
+        baz = app.router.add_put("/baz", handler)
+        self.assertIsNone(registry.slot_of(baz))
+
+    def test_track(self):
+        app = web.Application()
+        app.router.add_get("/foo", handler, allow_head=False)
+        registry = RouteRegistry()
+        registry.register(app.router.routes())
+
+        async def main():
+            task = asyncio.current_task()
+            registry.track(0, task, 100.0)
+            self.assertEqual(registry.tasks[task], (0, 100.0))
+            self.assertEqual(registry.tasks_of({0}), [task])
+            self.assertEqual(registry.tasks_of({1}), [])
+            self.assertEqual(registry.oldest_started(), {0: 100.0})
+
+            registry.untrack(task)
+            self.assertNotIn(task, registry.tasks)
+            self.assertEqual(registry.tasks_of({0}), [])
+            self.assertEqual(registry.oldest_started(), {})
+
+        asyncio.run(main())
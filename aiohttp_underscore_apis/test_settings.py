@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+from aiohttp_underscore_apis.settings import Preempt, RouteSettings
+
+
+class PreemptTest(TestCase):
+    def test_compile(self):
+        self.assertIsNone(
+            Preempt.compile({"status": None, "reason": "x", "text": "y"})
+        )
+
+        preempt = Preempt.compile(
+            {"status": 503, "reason": "Deactivated", "text": "Come back"}
+        )
+        self.assertEqual(preempt, Preempt(503, "Deactivated", b"Come back"))
+
+        response = preempt.response()
+        self.assertEqual(response.status, 503)
+        self.assertEqual(response.reason, "Deactivated")
+        self.assertEqual(response.body, b"Come back")
+        self.assertEqual(response.content_type, "text/plain")
+        self.assertEqual(response.charset, "utf-8")
+
+        # Every response is a fresh one made from the template
+        self.assertIsNot(preempt.response(), response)
+
+    def test_compile_without_text(self):
+        preempt = Preempt.compile(
+            {"status": 410, "reason": None, "text": None}
+        )
+
+        response = preempt.response()
+        self.assertEqual(response.status, 410)
+        self.assertEqual(response.reason, "Gone")
+        self.assertIsNone(response.body)
+
+
+class RouteSettingsTest(TestCase):
+    def test_update(self):
+        settings = RouteSettings()
+        self.assertIsNone(settings.preempt)
+        self.assertFalse(settings.intercepts)
+
+        settings.update({"preempt": {"status": 503, "text": "Down"}})
+        self.assertEqual(settings.preempt, Preempt(503, None, b"Down"))
+        self.assertTrue(settings.intercepts)
+        self.assertEqual(
+            settings.transient, {"preempt": {"status": 503, "text": "Down"}}
+        )
+
+        # Merged into the settings in effect
+        settings.update({"preempt": {"reason": "Deactivated"}})
+        self.assertEqual(
+            settings.preempt, Preempt(503, "Deactivated", b"Down")
+        )
+
+        # Nulling the status turns the preemption off, and nulling the rest
+        # drops the settings altogether
+        settings.update({"preempt": {"status": None}})
+        self.assertIsNone(settings.preempt)
+        self.assertFalse(settings.intercepts)
+
+        settings.update({"preempt": {"reason": None, "text": None}})
+        self.assertEqual(settings.transient, {})
+
+    def test_with_defaults(self):
+        settings = RouteSettings.with_defaults({"sampling": {"every": 10}})
+        self.assertEqual(settings.sample_every, 10)
+
+        settings.update({"sampling": {"every": 2}})
+        self.assertEqual(settings.sample_every, 2)
+
+        settings.update({"sampling": {"every": None}})
+        self.assertEqual(settings.sample_every, 10)
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import struct
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from aiohttp import web
+
+from aiohttp_underscore_apis.registry import RouteRegistry
+from aiohttp_underscore_apis.shared import (
+    SharedSettings,
+    SharedStats,
+    host_totals,
+)
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response()
+
+
+def registry_with(total: int, duration: float) -> RouteRegistry:
+    app = web.Application()
+    app.router.add_get("/foo", handler, allow_head=False)
+    app.router.add_get("/bar", handler, allow_head=False)
+
+    registry = RouteRegistry()
+    registry.register(app.router.routes())
+    registry.stats[0].counter.total = total
+    registry.stats[0].outcomes.record(1)
+    registry.stats[0].record(duration)
+    return registry
+
+
+class SharedStatsTest(TestCase):
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "stats")
+
+    def shared_stats(self) -> SharedStats:
+        shared = SharedStats(self.path, max_workers=4, max_routes=8)
+        shared.open()
+        self.addCleanup(shared.close)
+        return shared
+
+    def test_publish_and_read(self):
+        # Both workers live in this process, so they claim distinct regions
+        worker1, worker2 = self.shared_stats(), self.shared_stats()
+        self.assertEqual((worker1.worker, worker2.worker), (0, 1))
+
+        worker1.publish(registry_with(total=3, duration=0.1))
+        worker2.publish(registry_with(total=4, duration=1.0))
+
+        workers = worker1.read(routes=2)
+        self.assertEqual([w.pid for w in workers], [os.getpid()] * 2)
+        self.assertEqual([w.routes[0].counter.total for w in workers], [3, 4])
+
+        foo, bar = host_totals(workers, 2)
+        self.assertEqual(foo.counter.total, 7)
+        self.assertEqual(foo.outcomes[1], 2)
+        self.assertEqual(foo.latency.count, 2)
+        self.assertEqual(foo.latency.max, 1.0)
+        self.assertEqual(bar.counter.total, 0)
+
+    def test_close(self):
+        worker1, worker2 = self.shared_stats(), self.shared_stats()
+        worker1.close()
+
+        self.assertEqual(len(worker2.read(routes=2)), 1)
+        self.assertEqual(self.shared_stats().worker, 0)  # Reclaimed
+
+    def test_torn_record(self):
+        shared = self.shared_stats()
+        shared.publish(registry_with(total=1, duration=0.1))
+
+        # The writer died in the middle of writing the record
+        offset = shared._region_size * shared.worker + 16  # Past the header
+        shared._mmap[offset] += 1
+
+        with patch("aiohttp_underscore_apis.shared.sleep") as sleep:
+            (worker,) = shared.read(routes=2)
+        self.assertIsNone(worker.routes[0])
+        self.assertEqual(shared.torn_reads, 1)
+        self.assertEqual(sleep.call_count, 99)  # Between the attempts
+
+    def test_lifetime_beyond_32_bits(self):
+        shared = self.shared_stats()
+        registry = registry_with(total=1, duration=0.1)
+        registry.stats[0].lifetime.bins[0] = 2**32
+
+        shared.publish(registry)
+        (worker,) = shared.read(routes=2)
+        self.assertEqual(worker.routes[0].latency.bins[0], 2**32)
+
+    def test_tick_after_failure(self):
+        shared = self.shared_stats()
+        shared.bind(registry_with(total=1, duration=0.1))
+
+        async def tick():
+            with patch.object(shared, "publish", side_effect=struct.error):
+                with self.assertRaises(struct.error):
+                    shared._tick()
+            self.assertIsNotNone(shared._handle)  # Still scheduled
+            shared.stop()
+
+        asyncio.run(tick())
+
+
+class SharedSettingsTest(TestCase):
+    def setUp(self):
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "settings")
+
+    def shared_settings(self) -> SharedSettings:
+        shared = SharedSettings(self.path)
+        shared.bind(registry_with(total=0, duration=0.1))
+        shared.sync()
+        return shared
+
+    def test_update_and_sync(self):
+        worker1, worker2 = self.shared_settings(), self.shared_settings()
+
+        worker1.update([1], {"preempt": {"status": 503}})
+        self.assertEqual(worker1.version, 1)
+        self.assertEqual(worker1._registry.settings[1].preempt.status, 503)
+        self.assertIsNone(worker2._registry.settings[1].preempt)
+
+        worker2.sync()
+        self.assertEqual(worker2.version, 1)
+        self.assertEqual(worker2._registry.settings[1].preempt.status, 503)
+
+        # The other worker brings itself up to date before changing anything
+        worker2.update([0], {"concurrency": {"max_active": 1}})
+        worker1.sync()
+        for worker in (worker1, worker2):
+            self.assertEqual(worker.version, 2)
+            settings = worker._registry.settings
+            self.assertEqual(settings[0].concurrency.max_active, 1)
+            self.assertEqual(settings[1].preempt.status, 503)
+
+        # Nulling the settings is replicated as well
+        worker1.update([1], {"preempt": {"status": None}})
+        worker2.sync()
+        self.assertIsNone(worker2._registry.settings[1].preempt)
+        self.assertEqual(worker2._registry.settings[1].transient, {})
+
+    def test_same_stat(self):
+        worker1, worker2 = self.shared_settings(), self.shared_settings()
+        worker1.update([1], {"preempt": {"status": 503}})
+        stat = os.stat(self.path)
+
+        # Replaced with the same size, inode and timestamps
+        with (
+            patch("os.stat", return_value=stat),
+            patch("os.fstat", return_value=stat),
+        ):
+            worker2.sync()
+            self.assertEqual(worker2._registry.settings[1].preempt.status, 503)
+
+            worker1.update([1], {"preempt": {"status": 502}})
+            worker2.sync()
+            self.assertEqual(worker2.version, 2)
+            self.assertEqual(worker2._registry.settings[1].preempt.status, 502)
+
+    def test_changed_routes(self):
+        worker1 = self.shared_settings()
+        worker1.update([0], {"preempt": {"status": 503}})  # GET /foo
+
+        # Deployed with the routes reordered and added
+        app = web.Application()
+        for path in ("/baz", "/bar", "/foo"):
+            app.router.add_get(path, handler, allow_head=False)
+        registry = RouteRegistry()
+        registry.register(app.router.routes())
+        worker2 = SharedSettings(self.path)
+        worker2.bind(registry)
+        worker2.sync()
+
+        baz, bar, foo = registry.settings
+        self.assertIsNone(baz.preempt)
+        self.assertIsNone(bar.preempt)
+        self.assertEqual(foo.preempt.status, 503)
+
+        # The settings of the routes unknown to a worker are kept
+        worker2.update([0], {"preempt": {"status": 502}})
+        worker1.update([0], {"preempt": {"status": None}})
+        worker2.sync()
+        self.assertEqual(baz.preempt.status, 502)
+        self.assertIsNone(foo.preempt)
+
+    def test_respawned_worker(self):
+        self.shared_settings().update([0], {"preempt": {"status": 503}})
+
+        worker = self.shared_settings()
+        self.assertEqual(worker.version, 1)
+        self.assertEqual(worker._registry.settings[0].preempt.status, 503)
@@ -0,0 +1,236 @@
+from math import isnan
+from unittest import TestCase
+from unittest.mock import patch
+
+from aiohttp_underscore_apis.stats import (
+    Histogram,
+    LatencySketch,
+    Outcomes,
+    RouteStats,
+    StatsSnapshot,
+    Throughput,
+    TimeAverage,
+    TimeRing,
+)
+
+
+class TimeAverageTest(TestCase):
+    def test_calculate(self):
+        time_avg = TimeAverage()
+
+        with patch("aiohttp_underscore_apis.stats.perf_counter") as clock:
+            clock.return_value = 1000.0
+            self.assertTrue(all(map(isnan, time_avg.calculate())))
+
+            for now, duration in (
+                (100.0, 9.0),  # Too old to be taken into account
+                (200.0, 4.0),
+                (200.0, 2.0),
+                (800.0, 1.0),
+                (990.0, 0.5),
+                (1000.0, 1.5),
+            ):
+                clock.return_value = now
+                time_avg.record(duration)
+
+            self.assertEqual(time_avg.calculate(), (1.0, 1.0, 1.8))
+
+            clock.return_value = 2000.0
+            self.assertTrue(all(map(isnan, time_avg.calculate())))
+
+    def test_constant_memory(self):
+        time_avg = TimeAverage(resolution=60)
+
+        with patch("aiohttp_underscore_apis.stats.perf_counter") as clock:
+            for now in range(0, 3600, 7):
+                clock.return_value = float(now)
+                time_avg.record(1.0)
+
+        self.assertEqual(len(time_avg._counts), 15)
+        self.assertEqual(sum(time_avg._counts), 900 // 7 + 1)
+
+    def test_invalid_resolution(self):
+        with self.assertRaises(ValueError):
+            TimeAverage(resolution=7)
+
+    def test_abstract_ring(self):
+        with self.assertRaises(TypeError):
+            TimeRing(resolution=5)
+
+    def test_weighted_record(self):
+        time_avg = TimeAverage()
+
+        with patch("aiohttp_underscore_apis.stats.perf_counter") as clock:
+            clock.return_value = 1000.0
+            time_avg.record(1.0, weight=3)
+            time_avg.record(5.0)
+
+            self.assertEqual(time_avg.calculate(), (2.0, 2.0, 2.0))
+            self.assertEqual(sum(time_avg._counts), 4)
+
+
+class HistogramTest(TestCase):
+    def test_quantile(self):
+        histogram = Histogram()
+        self.assertTrue(isnan(histogram.quantile(0.5)))
+        self.assertTrue(isnan(histogram.max))
+
+        for i in range(1, 1001):
+            histogram.add(i / 1000)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertEqual(histogram.max, 1.0)
+        for q in (0.5, 0.9, 0.99):
+            self.assertAlmostEqual(
+                histogram.quantile(q), q, delta=q * Histogram.accuracy
+            )
+        self.assertEqual(histogram.quantile(1.0), 1.0)
+
+    def test_merge(self):
+        histogram1, histogram2 = Histogram(), Histogram()
+        histogram1.add(0.001)
+        histogram2.add(0.1)
+        histogram2.add(1000.0)  # Clamped into the last bin
+
+        histogram1.merge(histogram2)
+        self.assertEqual(histogram1.count, 3)
+        self.assertEqual(histogram1.max, 1000.0)
+        self.assertAlmostEqual(histogram1.sum, 1000.101)
+        self.assertEqual(sum(histogram1.bins), 3)
+        self.assertEqual(histogram1.bins[-1], 1)
+
+    def test_merge_empty(self):
+        histogram = Histogram()
+        histogram.add(0.1)
+
+        with patch.object(histogram, "bins") as bins:
+            histogram.merge(Histogram())
+            bins.__setitem__.assert_not_called()
+        self.assertEqual((histogram.count, histogram.max), (1, 0.1))
+
+    def test_bin_overflow(self):
+        histogram = Histogram()
+        histogram.bins[0] = 2**32 - 1
+        with self.assertRaises(OverflowError):
+            histogram.add(0.0)
+
+        histogram = Histogram("Q")
+        histogram.bins[0] = 2**32 - 1
+        histogram.add(0.0)
+        histogram.clear()
+        self.assertEqual(histogram.bins.typecode, "Q")
+
+
+class RouteStatsTest(TestCase):
+    def test_lifetime_beyond_32_bits(self):
+        stats = RouteStats()
+        index = Histogram.index(0.01)
+        stats.lifetime.bins[index] = 2**32 - 1
+
+        stats.record(0.01, weight=2)
+        self.assertEqual(stats.lifetime.bins[index], 2**32 + 1)
+
+    def test_record_once(self):
+        stats = RouteStats()
+
+        with (
+            patch("aiohttp_underscore_apis.stats.perf_counter") as clock,
+            patch.object(Histogram, "index", wraps=Histogram.index) as index,
+        ):
+            stats.record(0.01, now=1000.0)
+            clock.assert_not_called()
+            index.assert_called_once_with(0.01)
+
+            clock.return_value = 1000.0
+            self.assertEqual(stats.time_avg.calculate()[0], 0.01)
+            self.assertEqual(stats.latency.calculate()[0].count, 1)
+            self.assertEqual(stats.lifetime.count, 1)
+
+
+class LatencySketchTest(TestCase):
+    def test_calculate(self):
+        latency = LatencySketch()
+
+        with patch("aiohttp_underscore_apis.stats.perf_counter") as clock:
+            for now, duration in (
+                (100.0, 9.0),  # Too old to be taken into account
+                (200.0, 4.0),
+                (800.0, 1.0),
+                (990.0, 0.5),
+            ):
+                clock.return_value = now
+                latency.record(duration)
+
+            clock.return_value = 1000.0
+            self.assertSequenceEqual(
+                [(h.count, h.max) for h in latency.calculate()],
+                [(1, 0.5), (2, 1.0), (3, 4.0)],
+            )
+
+
+class OutcomesTest(TestCase):
+    def test_calculate(self):
+        outcomes = Outcomes()
+
+        with patch("aiohttp_underscore_apis.stats.perf_counter") as clock:
+            for now, outcome in (
+                (100.0, Outcomes.of_status(200)),
+                (400.0, Outcomes.of_status(503)),
+                (950.0, Outcomes.of_status(200)),
+                (970.0, Outcomes.of_status(600)),  # Clamped into 5xx
+                (990.0, Outcomes.CANCELLED),
+            ):
+                clock.return_value = now
+                outcomes.record(outcome)
+
+            clock.return_value = 1000.0
+            rates = outcomes.calculate()
+
+        self.assertSequenceEqual(outcomes.totals, [0, 2, 0, 0, 2, 0, 1])
+        self.assertSequenceEqual(
+            [
+                (r[1] * w, r[4] * w, r[6] * w)
+                for r, w in zip(rates, (60, 300, 900))
+            ],
+            [(1, 1, 1), (1, 1, 1), (1, 2, 1)],
+        )
+
+
+class ThroughputTest(TestCase):
+    def test_calculate(self):
+        throughput = Throughput()
+
+        with patch("aiohttp_underscore_apis.stats.perf_counter") as clock:
+            for now, bytes_in, bytes_out in (
+                (100.0, 900, 900),  # Too old to be taken into account
+                (400.0, 120, 3012),
+                (990.0, 60, 120),
+            ):
+                clock.return_value = now
+                throughput.record(bytes_in, bytes_out)
+
+            clock.return_value = 1000.0
+            self.assertEqual(
+                throughput.calculate(), ((1.0, 2.0), (0.2, 0.4), (0.2, 3.48))
+            )
+
+        self.assertEqual(
+            (throughput.total_in, throughput.total_out), (1080, 4032)
+        )
+
+
+class StatsSnapshotTest(TestCase):
+    def test_get(self):
+        snapshot = StatsSnapshot(interval=1.0)
+        builds = iter(range(10))
+
+        with patch("aiohttp_underscore_apis.stats.monotonic") as clock:
+            for now, expected in (
+                (100.0, 0),
+                (100.5, 0),
+                (101.0, 1),
+                (101.9, 1),
+                (105.0, 2),
+            ):
+                clock.return_value = now
+                self.assertEqual(snapshot.get(lambda: next(builds)), expected)
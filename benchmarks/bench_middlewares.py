@@ -0,0 +1,87 @@
+"""Benchmark the per-request overhead of the middlewares
+
+Usage: python -m benchmarks.bench_middlewares [--number N]
+
+It drives a mocked request through the middleware chain the same way as
+aiohttp does and reports the time per request of a bare app (no
+middlewares), the separate middlewares and the fused middleware, together
+with the overhead over the bare app in nanoseconds.
+"""
+
+import argparse
+import asyncio
+from functools import partial, update_wrapper
+from time import perf_counter_ns
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+from aiohttp.web_urldispatcher import UrlMappingMatchInfo
+
+from aiohttp_underscore_apis import AiohttpUnderscoreApis
+from aiohttp_underscore_apis.context import Context
+
+
+async def hello(request: web.Request) -> web.Response:
+    return web.Response(text="hello")
+
+
+def make_chain(middlewares, handler):
+    for middleware in reversed(middlewares):
+        handler = update_wrapper(partial(middleware, handler=handler), handler)
+    return handler
+
+
+async def bench(apis: AiohttpUnderscoreApis | None, number: int) -> float:
+    app = web.Application()
+    route = app.router.add_get("/hello", hello)
+
+    middlewares = ()
+    registry = None
+    if apis is not None:
+        apis.init_subapps(app)
+        middlewares = apis.middlewares
+        # Registered as on the startup, which the app never goes through here
+        registry = Context.get_from(app).registry
+        registry.register(app.router.routes())
+
+    request = make_mocked_request("GET", "/hello", app=app)
+    match_info = UrlMappingMatchInfo({}, route)
+    match_info.add_app(app)
+    request._match_info = match_info
+
+    chain = make_chain(middlewares, route.handler)
+
+    for _ in range(number // 10):  # Warm up
+        await chain(request)
+
+    start = perf_counter_ns()
+    for _ in range(number):
+        await chain(request)
+    elapsed = (perf_counter_ns() - start) / number
+
+    # Make sure that the requests went through the instrumentation
+    if registry is not None:
+        total = registry.stats[registry.slot_of(route)].counter.total
+        assert total == number + number // 10, total
+
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    bare = await bench(None, args.number)
+    print(f"{'setup':<12} {'ns/req':>8} {'overhead ns':>12}")
+    print(f"{'bare':<12} {bare:>8.0f} {0:>12.0f}")
+    for name, apis in (
+        ("separate", AiohttpUnderscoreApis()),
+        ("fused", AiohttpUnderscoreApis(fuse_middlewares=True)),
+    ):
+        elapsed = await bench(apis, args.number)
+        print(f"{name:<12} {elapsed:>8.0f} {elapsed - bare:>12.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
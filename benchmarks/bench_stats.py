@@ -0,0 +1,107 @@
+"""Benchmark stats.TimeAverage at various request rates
+
+Usage: python -m benchmarks.bench_stats [--seconds N] [RATE ...]
+
+For each request rate, it simulates N seconds of traffic against a single
+TimeAverage with a fake clock and reports the cost of record() and
+calculate(), the size of the TimeAverage, the RSS of the process and how
+much the RSS grew during the simulation. Each rate runs in a fresh
+subprocess so that the RSS high-water mark of one rate doesn't carry over
+to the next.
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+from timeit import timeit
+from unittest.mock import patch
+
+from aiohttp_underscore_apis import stats
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def maxrss_kib() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def bench(rate: int, seconds: int) -> dict[str, float]:
+    baseline = maxrss_kib()
+    clock = FakeClock()
+    with patch.object(stats, "perf_counter", clock):
+        time_avg = stats.TimeAverage()
+        record = time_avg.record
+
+        elapsed = 0.0
+        for second in range(seconds):
+            clock.now = float(second)
+            elapsed += timeit(lambda: record(0.001), number=rate)
+
+        size = sum(map(sys.getsizeof, (time_avg, *vars(time_avg).values())))
+
+        number = 1000
+        calculate = timeit(time_avg.calculate, number=number) / number
+
+    maxrss = maxrss_kib()
+    return {
+        "rate": rate,
+        "record_ns": elapsed / (rate * seconds) * 1e9,
+        "calculate_us": calculate * 1e6,
+        "size_kib": size / 1024,
+        "maxrss_mib": maxrss / 1024,
+        "rss_growth_kib": maxrss - baseline,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "rates", nargs="*", type=int, default=[1_000, 10_000, 100_000]
+    )
+    args = parser.parse_args()
+
+    if args.json:  # In the subprocess of a single rate
+        (rate,) = args.rates
+        json.dump(bench(rate, args.seconds), sys.stdout)
+        return
+
+    print(
+        f"{'req/s':>8} {'record ns/op':>13} {'calculate us':>13}"
+        f" {'size KiB':>9} {'maxrss MiB':>11} {'RSS growth KiB':>15}"
+    )
+    for rate in args.rates:
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_stats",
+                "--json",
+                "--seconds",
+                str(args.seconds),
+                str(rate),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output)
+        print(
+            f"{result['rate']:>8} {result['record_ns']:>13.1f}"
+            f" {result['calculate_us']:>13.1f} {result['size_kib']:>9.1f}"
+            f" {result['maxrss_mib']:>11.1f}"
+            f" {result['rss_growth_kib']:>15}"
+        )
+
+
+if __name__ == "__main__":
+    main()